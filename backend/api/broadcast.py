@@ -0,0 +1,157 @@
+"""
+Batched sending of websocket events to Users and Teams
+
+Views used to send every event down the channel layer as soon as they made it, one blocking round trip each, which adds
+up for views that send an event per Team or per BIS List in a loop.
+Instead, events are collected for the whole request by BroadcastMiddleware. Identical events for the same group are
+only sent once, and everything is sent together once the view has returned a successful response, in a single trip
+into the event loop with every group_send running concurrently. Requests that fail with a server error send nothing.
+
+Events are only collected once the transaction they were sent in commits, so nothing is sent for changes that were
+rolled back. Events sent outside of a request, like from Celery tasks, are sent as soon as their transaction commits.
+"""
+# stdlib
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+# lib
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+CHANNEL_LAYER = get_channel_layer()
+LOGGER = logging.getLogger(__name__)
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class _Batch:
+    """
+    The events collected so far, keyed by their group and content so duplicates are dropped
+    """
+    __slots__ = ('events', 'closed', 'dropped', 'scheduled')
+
+    def __init__(self):
+        self.events: Dict[Tuple[str, str], Event] = {}
+        self.closed = False
+        self.dropped = False
+        self.scheduled = False
+
+    def add(self, group: str, event: Dict[str, Any]):
+        if self.dropped:
+            return
+        self.events.setdefault((group, json.dumps(event, sort_keys=True, default=str)), (group, event))
+        if self.closed and not self.scheduled:
+            # A transaction committed after the batch was closed, so its events need another flush
+            self._schedule()
+
+    def close(self):
+        """
+        End the batch, sending everything collected once any transaction still open commits
+        """
+        self.closed = True
+        self._schedule()
+
+    def drop(self):
+        """
+        End the batch without sending anything, including events from transactions that are still open
+        """
+        self.closed = self.dropped = True
+        self.events = {}
+
+    def _schedule(self):
+        self.scheduled = True
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        self.scheduled = False
+        events, self.events = list(self.events.values()), {}
+        _send_all(events)
+
+
+_batch: ContextVar[Optional[_Batch]] = ContextVar('broadcast_batch', default=None)
+
+
+def _send_all(events: List[Event]):
+    """
+    Send every event to the channel layer at once, in one trip into the event loop.
+    Failures are logged rather than raised, as the changes the events are about have already been committed.
+    """
+    if CHANNEL_LAYER is None or len(events) == 0:
+        return
+
+    async def send():
+        return await asyncio.gather(
+            *(CHANNEL_LAYER.group_send(group, event) for group, event in events),
+            return_exceptions=True,
+        )
+
+    for (group, event), result in zip(events, async_to_sync(send)()):
+        if isinstance(result, Exception):
+            LOGGER.error(f'Could not send {event} to {group}: {result!r}')
+
+
+def send(group: str, event: Dict[str, Any]):
+    """
+    Send an event to a group once the current transaction commits, as part of the current batch if there is one
+    """
+    if CHANNEL_LAYER is None:
+        return
+
+    pending = _batch.get()
+    if pending is None:
+        transaction.on_commit(lambda: _send_all([(group, event)]))
+    else:
+        transaction.on_commit(lambda: pending.add(group, event))
+
+
+def send_to_user(user_id: Any, event: Dict[str, Any]):
+    send(f'user-updates-{user_id}', event)
+
+
+def send_to_team(team_id: Any, event: Dict[str, Any]):
+    send(f'team-updates-{team_id}', event)
+
+
+@contextmanager
+def batch() -> Iterator[None]:
+    """
+    Collect every event sent inside the block, and send them all together when it ends
+    """
+    pending = _Batch()
+    token = _batch.set(pending)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        pending.close()
+
+
+class BroadcastMiddleware:
+    """
+    Batch every event sent while handling a request, sending them once the view has returned.
+    Nothing is sent if the view raised an exception or returned a server error.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pending = _Batch()
+        token = _batch.set(pending)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            pending.drop()
+            raise
+        finally:
+            _batch.reset(token)
+
+        if response.status_code >= 500:
+            pending.drop()
+        else:
+            pending.close()
+        return response
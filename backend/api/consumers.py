@@ -96,6 +96,17 @@ class UpdatesConsumer(WebsocketConsumer):
         }
         self.send(text_data=json.dumps(payload))
 
+    def solver(self, event):
+        """
+        Tell the Loot page that a background Loot Solver run has finished
+        """
+        payload = {
+            'model': 'solver',
+            'jobId': event['job_id'],
+            'reloadUrls': [f'/team/{event["id"]}/loot/'],
+        }
+        self.send(text_data=json.dumps(payload))
+
     def team(self, event):
         """
         Send payload informing person of Team updates
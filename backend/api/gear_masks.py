@@ -0,0 +1,120 @@
+"""
+Bitmask evaluation of BIS Lists against a Tier
+
+Every BIS List is reduced to a handful of integers with one bit per gear slot, marking which slots hold the Tier's raid or
+tome gear as their BIS and current items, and which slots already have their BIS item equipped.
+Working out what a list still needs is then a few bitwise operations per list instead of an attribute lookup and name
+comparison for every slot.
+
+Classification only needs the Gear ids stored on the lists, so none of the Gear itself has to be loaded.
+The LootRequirement rows that back the Loot page and Loot Solver are generated from these masks.
+"""
+# stdlib
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+# The bit for each slot is its position in this list
+SLOTS = [
+    'mainhand',
+    'offhand',
+    'head',
+    'body',
+    'hands',
+    'legs',
+    'feet',
+    'earrings',
+    'necklace',
+    'bracelet',
+    'left_ring',
+    'right_ring',
+]
+BITS = {slot: 1 << index for index, slot in enumerate(SLOTS)}
+
+
+def mask(slots: Iterable[str]) -> int:
+    """
+    Build a mask with the bits for the given slots set
+    """
+    value = 0
+    for slot in slots:
+        value |= BITS[slot]
+    return value
+
+
+ARMOUR = mask(['head', 'body', 'hands', 'legs', 'feet'])
+ACCESSORIES = mask(['earrings', 'necklace', 'bracelet', 'left_ring', 'right_ring'])
+RINGS = mask(['left_ring', 'right_ring'])
+ALL = mask(SLOTS)
+
+
+class GearMasks(NamedTuple):
+    raid_bis: int
+    raid_current: int
+    tome_bis: int
+    tome_current: int
+    equipped: int
+
+    @property
+    def raid_needed(self) -> int:
+        """
+        Slots with a raid BIS item that isn't currently worn.
+        The ring slots are only needed if neither ring is currently from the raid, as one raid ring drops for either.
+        """
+        needed = self.raid_bis & ~self.raid_current
+        if self.raid_current & RINGS:
+            needed &= ~RINGS
+        return needed
+
+    @property
+    def tome_needed(self) -> int:
+        """
+        Slots with a tome BIS item that isn't currently worn
+        """
+        return self.tome_bis & ~self.tome_current
+
+    @property
+    def armour_augments(self) -> int:
+        return bin(self.tome_needed & ARMOUR).count('1')
+
+    @property
+    def accessory_augments(self) -> int:
+        return bin(self.tome_needed & ACCESSORIES).count('1')
+
+
+def gear_ids(bis_list, prefix: str) -> List[int]:
+    """
+    Get the Gear ids for every slot of one side ('bis' or 'current') of a BIS List, in SLOTS order
+    """
+    return [getattr(bis_list, f'{prefix}_{slot}_id') for slot in SLOTS]
+
+
+def build(bis_list, raid_ids: Set[int], tome_ids: Set[int]) -> GearMasks:
+    """
+    Build the masks for a single BIS List, given the ids of the Gear that count as raid and tome gear for the Tier
+    """
+    raid_bis = raid_current = tome_bis = tome_current = equipped = 0
+    for bit, bis, current in zip(BITS.values(), gear_ids(bis_list, 'bis'), gear_ids(bis_list, 'current')):
+        if bis in raid_ids:
+            raid_bis |= bit
+        elif bis in tome_ids:
+            tome_bis |= bit
+        if current in raid_ids:
+            raid_current |= bit
+        elif current in tome_ids:
+            tome_current |= bit
+        if bis == current:
+            equipped |= bit
+    return GearMasks(raid_bis, raid_current, tome_bis, tome_current, equipped)
+
+
+def build_all(bis_lists: Iterable, raid_ids: Set[int], tome_ids: Set[int]) -> Dict[int, GearMasks]:
+    """
+    Build the masks for every given BIS List, keyed by the list's id
+    """
+    return {bis_list.id: build(bis_list, raid_ids, tome_ids) for bis_list in bis_lists}
+
+
+def slots_in(value: int) -> List[str]:
+    """
+    Get the names of the slots set in a mask, in SLOTS order
+    """
+    return [slot for slot, bit in BITS.items() if value & bit]
@@ -0,0 +1,184 @@
+"""
+Compare generating LootRequirement rows from gear_masks against the old per attribute comparisons.
+
+Uses synthetic, unsaved Teams so it doesn't touch the database.
+"""
+# stdlib
+import random
+from time import perf_counter
+from typing import Dict, List, Tuple
+# lib
+from django.core.management.base import BaseCommand, CommandError
+# local
+from api import gear_masks
+from api.models import BISList, Gear, LootRequirement, TeamMember, Tier
+from api.solver import synthetic
+
+RAID_NAME = 'Raid'
+TOME_NAME = 'Tome'
+REQUIREMENT_SLOTS = gear_masks.mask(LootRequirement.SLOTS)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the bitmask loot requirement generation against the per attribute version it replaced'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, nargs='+', default=[8, 24, 100], help='Team sizes to benchmark.')
+        parser.add_argument('--lists', type=int, default=3, help='Number of BIS Lists owned by each Member.')
+        parser.add_argument('--repeat', type=int, default=20, help='Number of times to run each version.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for generating the synthetic BIS Lists.')
+
+    @staticmethod
+    def _per_attribute_rows(member: TeamMember, bis_list: BISList, tier: Tier) -> List[LootRequirement]:
+        """
+        The original row generation, comparing the names of the Gear in each slot one at a time
+        """
+        rings_missing = all(
+            getattr(bis_list, f'current_{ring}').name != tier.raid_gear_name
+            for ring in ['left_ring', 'right_ring']
+        )
+
+        rows = []
+        for position, slot in enumerate(LootRequirement.SLOTS):
+            bis = getattr(bis_list, f'bis_{slot}')
+            current = getattr(bis_list, f'current_{slot}')
+
+            item = ''
+            outstanding = False
+            if bis.name == tier.raid_gear_name:
+                source = LootRequirement.RAID
+                item = slot if '_ring' not in slot else 'ring'
+                outstanding = rings_missing if item == 'ring' else current.name != tier.raid_gear_name
+            elif bis.name == tier.tome_gear_name:
+                source = LootRequirement.TOME
+                if slot in LootRequirement.ARMOUR:
+                    item = 'tome-armour-augment'
+                elif slot in LootRequirement.ACCESSORIES:
+                    item = 'tome-accessory-augment'
+                outstanding = item != '' and current.name != tier.tome_gear_name
+            else:
+                source = LootRequirement.OTHER
+
+            rows.append(LootRequirement(
+                bis_equipped=bis.id == current.id,
+                bis_list=bis_list,
+                current_gear=current,
+                item=item,
+                member=member,
+                need=bis_list.id == member.bis_list_id,
+                outstanding=outstanding,
+                position=position,
+                slot=slot,
+                source=source,
+                team_id=member.team_id,
+            ))
+        return rows
+
+    @staticmethod
+    def _per_attribute_evaluation(bis_list: BISList, tier: Tier) -> Tuple[List[str], int, int]:
+        """
+        The original checks on their own, without building any rows;
+        the raid slots still needed, and the number of armour and accessory augments needed
+        """
+        rings_missing = all(
+            getattr(bis_list, f'current_{ring}').name != tier.raid_gear_name
+            for ring in ['left_ring', 'right_ring']
+        )
+        raid = []
+        armour = accessories = 0
+        for slot in LootRequirement.SLOTS:
+            bis = getattr(bis_list, f'bis_{slot}')
+            current = getattr(bis_list, f'current_{slot}')
+            if bis.name == tier.raid_gear_name:
+                if rings_missing if '_ring' in slot else current.name != tier.raid_gear_name:
+                    raid.append(slot)
+            elif bis.name == tier.tome_gear_name and current.name != tier.tome_gear_name:
+                if slot in LootRequirement.ARMOUR:
+                    armour += 1
+                elif slot in LootRequirement.ACCESSORIES:
+                    accessories += 1
+        return raid, armour, accessories
+
+    @staticmethod
+    def _mask_evaluation(bis_list: BISList, gear_ids: Tuple) -> Tuple[List[str], int, int]:
+        masks = gear_masks.build(bis_list, *gear_ids)
+        raid = gear_masks.slots_in(masks.raid_needed & REQUIREMENT_SLOTS)
+        return raid, masks.armour_augments, masks.accessory_augments
+
+    @staticmethod
+    def _mask_rows(member: TeamMember, bis_list: BISList, gear_ids: Tuple) -> List[LootRequirement]:
+        return LootRequirement.build(member, bis_list, gear_masks.build(bis_list, *gear_ids))
+
+    @staticmethod
+    def _make_team(size: int, lists: int, gear: List[Gear], rng: random.Random) -> Dict[TeamMember, List[BISList]]:
+        """
+        Create an unsaved Team of the given size, where each Member has the given number of randomly filled BIS Lists
+        """
+        team = {}
+        list_id = 0
+        for member_id, member_lists in enumerate(synthetic.bis_lists(size, lists, gear, rng)):
+            bis_lists = []
+            for fields in member_lists:
+                list_id += 1
+                bis_lists.append(BISList(id=list_id, **fields))
+            member = TeamMember(id=member_id, bis_list_id=bis_lists[0].id, team_id='benchmark')
+            team[member] = bis_lists
+        return team
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        tier = Tier(raid_gear_name=RAID_NAME, tome_gear_name=TOME_NAME)
+        gear = [
+            Gear(id=1, name=RAID_NAME, item_level=600),
+            Gear(id=2, name=RAID_NAME, item_level=605),
+            Gear(id=3, name=TOME_NAME, item_level=600),
+            Gear(id=4, name='Crafted', item_level=590),
+            Gear(id=5, name='Other', item_level=580),
+        ]
+        gear_ids = ({1, 2}, {3})
+
+        for size in options['members']:
+            team = self._make_team(size, options['lists'], gear, rng)
+            self.stdout.write(f'{size} members, {size * options["lists"]} lists')
+
+            evaluation = self._time(options['repeat'], {
+                'per attribute': lambda: [self._per_attribute_evaluation(bis, tier) for lists in team.values() for bis in lists],
+                'gear masks': lambda: [self._mask_evaluation(bis, gear_ids) for lists in team.values() for bis in lists],
+            })
+            rows = self._time(options['repeat'], {
+                'per attribute': lambda: [
+                    (row.bis_list.id, row.slot, row.source, row.item, row.outstanding, row.bis_equipped, row.need)
+                    for member, lists in team.items() for bis in lists for row in self._per_attribute_rows(member, bis, tier)
+                ],
+                'gear masks': lambda: [
+                    (row.bis_list.id, row.slot, row.source, row.item, row.outstanding, row.bis_equipped, row.need)
+                    for member, lists in team.items() for bis in lists for row in self._mask_rows(member, bis, gear_ids)
+                ],
+            })
+            self._report('evaluation', evaluation)
+            self._report('rows', rows)
+
+    def _time(self, repeat: int, versions: Dict) -> Dict[str, float]:
+        """
+        Time each version of the same work, making sure they all produce the same result
+        """
+        timings = {}
+        results = []
+        for name, version in versions.items():
+            start = perf_counter()
+            for _ in range(repeat):
+                result = version()
+            timings[name] = (perf_counter() - start) / repeat
+            results.append(result)
+
+        if any(result != results[0] for result in results):
+            raise CommandError('Versions produced different results')
+        return timings
+
+    def _report(self, label: str, timings: Dict[str, float]):
+        baseline = timings['per attribute']
+        summary = ', '.join(
+            f'{name}: {seconds * 1000:.2f}ms ({baseline / seconds:.2f}x)'
+            for name, seconds in timings.items()
+        )
+        self.stdout.write(f'\t{label}: {summary}')
@@ -0,0 +1,172 @@
+"""
+Benchmark each floor of the Loot Solver over synthetic Teams.
+
+Teams of each size get Loot histories of each length, with a spread of job mixes, raid and tome BIS mixes and greed
+settings, see api.solver.synthetic.
+Every floor is timed on its own for every Team, reporting the p50 and p95 times and the peak memory allocated per
+solve. Results can be saved to a JSON baseline, and compared against one saved by an earlier commit.
+With --checkpoints, each Team already has checkpoints for all but its last clear, like a Team that has just recorded a
+new week, so only the latest clear is replayed.
+--kernel picks the implementation of the handout simulation, see api.solver.core.KERNELS.
+"""
+# stdlib
+import json
+import pickle
+import tracemalloc
+from statistics import quantiles
+from time import perf_counter
+from typing import Callable, Dict, List
+# lib
+from django.core.management.base import BaseCommand, CommandError
+# local
+from api.solver import core, FloorCheckpoints, History, SolverInputs, synthetic
+
+METRICS = ['p50', 'p95', 'peak']
+
+
+def floors(kernel: str) -> Dict[str, Callable[[SolverInputs], object]]:
+    """
+    The functions behind each floor of the solver output, simulating handouts with the given kernel
+    """
+    return {
+        **{
+            floor: lambda inputs, floor=floor: core.floor_handouts(
+                floor, inputs.requirements, inputs.history, inputs.id_order, inputs.non_loot_gear, inputs.greedy, kernel=kernel,
+            )
+            for floor in core.FLOORS
+        },
+        'fourth_floor': lambda inputs: core.fourth_floor_data(inputs.history, len(inputs.id_order), inputs.non_loot_gear),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark each floor of the Loot Solver over synthetic Teams, optionally saving or comparing JSON baselines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, nargs='+', default=[8, 16, 24], help='Team sizes to benchmark.')
+        parser.add_argument('--weeks', type=int, nargs='+', default=[0, 10, 20], help='Weeks of Loot history to generate.')
+        parser.add_argument('--teams', type=int, default=12, help='Number of synthetic Teams for each size and history.')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of times to time each floor for each Team.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for generating the synthetic Teams.')
+        parser.add_argument('--kernel', choices=core.KERNELS, default=core.DEFAULT_KERNEL, help='Handout simulation to run.')
+        parser.add_argument(
+            '--checkpoints',
+            action='store_true',
+            help='Solve each Team from checkpoints taken before its last clear, instead of replaying its whole history.',
+        )
+        parser.add_argument('--save', help='Write the results to this JSON file, to use as a baseline later.')
+        parser.add_argument('--compare', help='Compare the results against a baseline JSON file written by --save.')
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            help='Fail if any p95 time is more than this many percent slower than the baseline given by --compare.',
+        )
+
+    @staticmethod
+    def _measure(solve: Callable, teams: List[SolverInputs], repeat: int) -> Dict[str, float]:
+        """
+        Time every run of a floor, then measure peak allocations in a separate pass so tracing doesn't skew the times.
+        Times are in milliseconds and allocations in KiB.
+        """
+        times = []
+        for inputs in teams:
+            for _ in range(repeat):
+                start = perf_counter()
+                solve(inputs)
+                times.append((perf_counter() - start) * 1000)
+
+        peaks = []
+        tracemalloc.start()
+        try:
+            for inputs in teams:
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                solve(inputs)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+
+        if len(times) > 1:
+            percentiles = quantiles(times, n=100, method='inclusive')
+            p50, p95 = percentiles[49], percentiles[94]
+        else:
+            p50 = p95 = times[0]
+        return {'p50': p50, 'p95': p95, 'peak': max(peaks) / 1024}
+
+    @staticmethod
+    def _checkpointed(floor: str, teams: List[SolverInputs], kernel: str) -> Callable[[SolverInputs], object]:
+        """
+        Take checkpoints of a floor for every Team without its last clear, and solve the floor starting from them.
+        Checkpoints are pickled like they are in the cache, so every run starts from a fresh copy.
+        """
+        slots, _ = core.FLOORS[floor]
+        saved = {}
+        for inputs in teams:
+            checkpoints = FloorCheckpoints()
+            if len(inputs.history) > 0:
+                last_clear = inputs.history.obtained[-1]
+                earlier = History.from_rows(entry for entry in inputs.history if entry.obtained.toordinal() < last_clear)
+                core.floor_data(inputs.requirements, earlier, slots, inputs.id_order, inputs.non_loot_gear, checkpoints)
+            saved[id(inputs)] = pickle.dumps(checkpoints)
+
+        return lambda inputs: core.floor_handouts(
+            floor,
+            inputs.requirements,
+            inputs.history,
+            inputs.id_order,
+            inputs.non_loot_gear,
+            inputs.greedy,
+            pickle.loads(saved[id(inputs)]),
+            kernel,
+        )
+
+    def handle(self, *args, **options):
+        if options['max_regression'] is not None and options['compare'] is None:
+            raise CommandError('--max-regression needs a baseline to compare against, given by --compare')
+
+        baseline = None
+        if options['compare'] is not None:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['results']
+
+        generated = synthetic.teams(options['members'], options['weeks'], options['teams'], options['seed'])
+        results: Dict[str, Dict[str, Dict[str, float]]] = {}
+        regressions = []
+        for (size, weeks), teams in generated.items():
+            key = f'{size} members, {weeks} weeks'
+            solvers = floors(options['kernel'])
+            if options['checkpoints']:
+                solvers.update({floor: self._checkpointed(floor, teams, options['kernel']) for floor in core.FLOORS})
+            results[key] = {floor: self._measure(solve, teams, options['repeat']) for floor, solve in solvers.items()}
+            self.stdout.write(key)
+            for floor, metrics in results[key].items():
+                previous = (baseline or {}).get(key, {}).get(floor)
+                self.stdout.write(f'\t{floor}: {self._format(metrics, previous)}')
+                if previous is not None and options['max_regression'] is not None:
+                    if metrics['p95'] > previous['p95'] * (1 + options['max_regression'] / 100):
+                        regressions.append(f'{key} {floor}')
+
+        if options['save'] is not None:
+            with open(options['save'], 'w') as f:
+                json.dump({
+                    'options': {name: options[name] for name in ['members', 'weeks', 'teams', 'repeat', 'seed', 'checkpoints', 'kernel']},
+                    'results': results,
+                }, f, indent=2, sort_keys=True)
+            self.stdout.write(f'Saved results to {options["save"]}')
+
+        if len(regressions) > 0:
+            raise CommandError(f'p95 regressed by more than {options["max_regression"]}% for: {", ".join(regressions)}')
+
+    @staticmethod
+    def _format(metrics: Dict[str, float], previous: Dict[str, float] = None) -> str:
+        """
+        Format a floor's results, with the change from the baseline alongside each metric when there is one
+        """
+        units = {'p50': 'ms', 'p95': 'ms', 'peak': 'KiB'}
+        parts = []
+        for metric in METRICS:
+            part = f'{metric} {metrics[metric]:.3f}{units[metric]}'
+            if previous is not None and previous.get(metric):
+                part += f' ({(metrics[metric] / previous[metric] - 1) * 100:+.1f}%)'
+            parts.append(part)
+        return ', '.join(parts)
@@ -0,0 +1,65 @@
+"""
+Measure the memory the Loot Solver allocates per solve, using tracemalloc.
+
+Every floor of a set of synthetic Teams, see api.solver.synthetic, is solved both greedy and not, reporting the mean
+and max peak of memory allocated by a single solve. The command fails if solving ever changes the requirements that
+were passed in, as the simulation undoes its changes instead of working on copies.
+"""
+# stdlib
+import tracemalloc
+from copy import deepcopy
+from typing import Dict, List
+# lib
+from django.core.management.base import BaseCommand, CommandError
+# local
+from api.solver import core, SolverInputs, synthetic
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the memory allocated by each Loot Solver solve, checking the passed requirements are left alone'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, nargs='+', default=[8, 24, 100], help='Team sizes to benchmark.')
+        parser.add_argument('--weeks', type=int, default=10, help='Weeks of Loot history to generate for each Team.')
+        parser.add_argument('--teams', type=int, default=20, help='Number of synthetic Teams to run for each size.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for generating the synthetic Teams.')
+
+    @staticmethod
+    def _run(teams: List[SolverInputs]) -> Dict[str, int]:
+        """
+        Solve every floor for every Team, both greedy and not.
+        Returns the mean and max peak of memory allocated by a single solve, in bytes.
+        """
+        peaks = []
+        tracemalloc.start()
+        try:
+            for inputs in teams:
+                for slots, tokens in core.FLOORS.values():
+                    for greedy in [False, True]:
+                        tracemalloc.reset_peak()
+                        baseline, _ = tracemalloc.get_traced_memory()
+                        weeks, brackets, floor_requirements = core.floor_data(
+                            inputs.requirements, inputs.history, slots, inputs.id_order, inputs.non_loot_gear,
+                        )
+                        core.handout_data(slots, floor_requirements, brackets, tokens, weeks, greedy)
+                        _, peak = tracemalloc.get_traced_memory()
+                        peaks.append(peak - baseline)
+        finally:
+            tracemalloc.stop()
+        return {'mean': sum(peaks) // len(peaks), 'max': max(peaks)}
+
+    def handle(self, *args, **options):
+        generated = synthetic.teams(options['members'], [options['weeks']], options['teams'], options['seed'])
+        for (size, _), teams in generated.items():
+            original = deepcopy([inputs.requirements for inputs in teams])
+            # Solve once up front so one off allocations, like import time caches, aren't counted
+            self._run(teams[:1])
+            peaks = self._run(teams)
+
+            if [inputs.requirements for inputs in teams] != original:
+                raise CommandError(f'Solving changed the passed requirements for a Team of {size} Members')
+
+            self.stdout.write(
+                f'{size} members, {options["teams"]} teams, peak allocated per solve: '
+                f'{peaks["mean"] / 1024:.1f}KiB mean / {peaks["max"] / 1024:.1f}KiB max',
+            )
@@ -0,0 +1,101 @@
+"""
+Time the Loot Solver's PriorityBrackets on the cases from test_loot_solver, checking they hand out the same loot.
+
+The cases are recorded in api/tests/fixtures/solver_cases.json with the output each test expects.
+Full solves are stored as solver fixtures, see api.solver.fixture, and timed per phase: building the brackets and
+replaying the history in `floor_data`, then simulating the handouts with `handout_data`.
+The handout cases are timed in `handout_data` alone, starting from the brackets given in the test.
+The command fails if any kernel's output ever differs from the recorded output.
+"""
+# stdlib
+import json
+import os
+from collections import defaultdict
+from time import perf_counter
+from typing import Any, Dict, List
+# lib
+from django.core.management.base import BaseCommand, CommandError
+# local
+from api.solver import core, fixture
+
+CASES = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'fixtures', 'solver_cases.json')
+
+
+class Command(BaseCommand):
+    help = 'Time the Loot Solver brackets on the recorded test_loot_solver cases, failing if any output differs'
+    # The cases need no database, so there's nothing for the system checks to check
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cases', default=CASES, help='JSON file of recorded cases to run.')
+        parser.add_argument('--repeat', type=int, default=100, help='Number of times to run each case with each kernel.')
+        parser.add_argument(
+            '--kernel',
+            choices=core.KERNELS,
+            nargs='+',
+            default=core.KERNELS,
+            help='Handout simulations to time. The output of every one given must match the recorded output.',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        try:
+            with open(options['cases']) as f:
+                cases = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read solver cases: {e}')
+
+        for kernel in options['kernel']:
+            times: Dict[str, List[float]] = defaultdict(list)
+            for case in cases['solves']:
+                self._solve_case(case, kernel, options['repeat'], times)
+            for case in cases['handouts']:
+                self._handout_case(case, kernel, options['repeat'], times)
+
+            self.stdout.write(
+                f'{kernel}, {len(cases["solves"])} solves and {len(cases["handouts"])} handouts, '
+                f'{options["repeat"]} runs each',
+            )
+            for name, durations in times.items():
+                self.stdout.write(f'\t{name}: mean {sum(durations) / len(durations):.1f}us, max {max(durations):.1f}us')
+
+    @staticmethod
+    def _solve_case(case: Dict[str, Any], kernel: str, repeat: int, times: Dict[str, List[float]]):
+        """
+        Run every floor of a recorded solve, timing the bracket setup and the handouts separately
+        """
+        inputs = fixture.load(case['fixture'])
+        for _ in range(repeat):
+            payload = {}
+            for floor, (slots, tokens) in core.FLOORS.items():
+                start = perf_counter()
+                weeks, brackets, floor_requirements = core.floor_data(
+                    inputs.requirements, inputs.history, slots, inputs.id_order, inputs.non_loot_gear,
+                )
+                middle = perf_counter()
+                payload[floor] = core.handout_data(slots, floor_requirements, brackets, tokens, weeks, inputs.greedy, kernel)
+                end = perf_counter()
+                times['floor_data'].append((middle - start) * 1e6)
+                times['handout_data'].append((end - middle) * 1e6)
+            payload['fourth_floor'] = core.fourth_floor_data(inputs.history, len(inputs.id_order), inputs.non_loot_gear)
+
+        if payload != case['expected']:
+            raise CommandError(f'The {kernel} kernel gave a different output to the recorded one for {case["name"]}')
+
+    @staticmethod
+    def _handout_case(case: Dict[str, Any], kernel: str, repeat: int, times: Dict[str, List[float]]):
+        """
+        Run a recorded handout simulation from the brackets the test starts with
+        """
+        brackets = {int(priority): members for priority, members in case['prio_brackets'].items()}
+        for _ in range(repeat):
+            start = perf_counter()
+            handouts = core.handout_data(
+                case['slots'], case['requirements'], brackets, case['weeks_per_token'], case['weeks'], case['greedy'], kernel,
+            )
+            times['handout_data'].append((perf_counter() - start) * 1e6)
+
+        if handouts != case['expected']:
+            raise CommandError(f'The {kernel} kernel gave a different output to the recorded one for {case["name"]}')
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import LootRequirement, Team
+
+# Fields that are compared between the stored and the freshly generated rows
+FIELDS = ['bis_equipped', 'current_gear_id', 'item', 'need', 'outstanding', 'position', 'source', 'team_id']
+
+
+class Command(BaseCommand):
+    help = 'Check that the stored LootRequirement rows match what would be generated from the current BIS Lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rebuild the rows for any Team that is out of date.')
+
+    def handle(self, *args, **options):
+        stale = []
+        for team in Team.objects.all():
+            members = team.members.all()
+            expected = {
+                (row.member_id, row.bis_list_id, row.slot): row
+                for row in LootRequirement.generate(members.select_related('team'))
+            }
+            stored = {
+                (row.member_id, row.bis_list_id, row.slot): row
+                for row in LootRequirement.objects.filter(member__in=members)
+            }
+
+            problems = [f'missing {key}' for key in expected.keys() - stored.keys()]
+            problems += [f'unexpected {key}' for key in stored.keys() - expected.keys()]
+            for key in expected.keys() & stored.keys():
+                for field in FIELDS:
+                    if getattr(expected[key], field) != getattr(stored[key], field):
+                        problems.append(f'{key} has {field}={getattr(stored[key], field)!r}, expected {getattr(expected[key], field)!r}')
+
+            if len(problems) > 0:
+                stale.append(team)
+                self.stderr.write(f'{team} has {len(problems)} inconsistent loot requirements')
+                for problem in problems:
+                    self.stderr.write(f'\t{problem}')
+
+        if len(stale) == 0:
+            self.stdout.write(self.style.SUCCESS('All loot requirements are consistent'))
+            return
+
+        if options['fix']:
+            for team in stale:
+                self.stdout.write(f'Rebuilding loot requirements for {team}')
+                LootRequirement.rebuild(team.members.all())
+            return
+
+        raise CommandError(f'{len(stale)} Team(s) have inconsistent loot requirements, run with --fix to rebuild them')
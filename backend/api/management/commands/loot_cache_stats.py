@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api import prewarm, response_cache
+
+
+class Command(BaseCommand):
+    help = 'Print the hit and miss counts of the Loot and Solver response cache, and the progress of the latest warm up for each region'
+
+    def handle(self, *args, **options):
+        for kind, counts in response_cache.stats().items():
+            total = counts['hits'] + counts['misses']
+            rate = counts['hits'] / total * 100 if total > 0 else 0
+            self.stdout.write(f'{kind}: {counts["hits"]} hits, {counts["misses"]} misses ({rate:.1f}% hit rate)')
+
+        for region in settings.LOOT_PREWARM_REGIONS:
+            run = prewarm.progress(region)
+            if len(run) == 0:
+                self.stdout.write(f'prewarm {region}: not run recently')
+                continue
+            self.stdout.write(
+                f'prewarm {region}: started {run["started"]}, {run["chunks_done"]}/{run["chunks"]} chunks, '
+                f'{run["warmed"]}/{run["teams"]} Teams warmed ({run["built"]} payloads built, {run["failed"]} failed)',
+            )
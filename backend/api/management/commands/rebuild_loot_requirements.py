@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from api.models import LootRequirement, Team
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the stored LootRequirement rows for every Team, or only the Teams with the given IDs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('team_ids', nargs='*', help='IDs of the Teams to rebuild. Rebuilds every Team if omitted.')
+
+    def handle(self, *args, **options):
+        teams = Team.objects.all()
+        if options['team_ids']:
+            teams = teams.filter(pk__in=options['team_ids'])
+
+        for team in teams:
+            self.stdout.write(f'Rebuilding loot requirements for {team}')
+            LootRequirement.rebuild(team.members.all())
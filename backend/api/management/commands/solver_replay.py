@@ -0,0 +1,125 @@
+"""
+Export a Team's Loot Solver inputs to a JSON fixture, and replay fixtures under the profiler.
+
+`solver_replay fixture.json --export TEAM_ID` reads the Team's inputs from the database and writes them to the fixture,
+with anonymized Member ids, see api.solver.fixture.
+`solver_replay fixture.json` solves the fixture --repeat times without touching the database, reporting the mean and
+max time of each phase. Giving several --kernel values runs each of them and fails if their output ever differs, and
+--profile writes a cProfile of the replays to a pstats file and prints the slowest functions.
+"""
+# stdlib
+import cProfile
+import json
+import os
+import pstats
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional
+# lib
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+# local
+from api.models import Team
+from api.solver import core, fixture
+from api.views import LootSolver
+
+
+class Command(BaseCommand):
+    help = 'Export a Team\'s Loot Solver inputs to a JSON fixture, or replay a fixture with per-phase timings'
+    # Replaying needs no database, so there's nothing for the system checks to check
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture', help='JSON fixture to write to with --export, or to replay.')
+        parser.add_argument('--export', metavar='TEAM_ID', help='Write the inputs of this Team to the fixture instead of replaying.')
+        parser.add_argument('--greedy', action='store_true', help='Export the inputs for the greedy version of the solver.')
+        parser.add_argument('--repeat', type=int, default=10, help='Number of times to solve the fixture with each kernel.')
+        parser.add_argument(
+            '--kernel',
+            choices=core.KERNELS,
+            nargs='+',
+            default=[core.DEFAULT_KERNEL],
+            help='Handout simulations to replay with. The output of every one given must match.',
+        )
+        parser.add_argument('--profile', help='Write a cProfile of the replays to this pstats file, suffixed by kernel.')
+        parser.add_argument('--top', type=int, default=15, help='Number of functions to print from the profile.')
+
+    def handle(self, *args, **options):
+        if options['export'] is not None:
+            self._export(options['export'], options['fixture'], options['greedy'])
+            return
+
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        try:
+            with open(options['fixture']) as f:
+                inputs = fixture.load(json.load(f))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read solver fixture: {e}')
+
+        self.stdout.write(
+            f'{len(inputs.id_order)} members, {len(inputs.history)} history rows, '
+            f'{"greedy" if inputs.greedy else "standard"} solver',
+        )
+        outputs = {}
+        for kernel in options['kernel']:
+            profile_path = None
+            if options['profile'] is not None:
+                root, ext = os.path.splitext(options['profile'])
+                profile_path = f'{root}-{kernel}{ext or ".pstats"}'
+            outputs[kernel] = self._replay(inputs, kernel, options['repeat'], profile_path, options['top'])
+
+        expected_kernel, *others = options['kernel']
+        for kernel in others:
+            if outputs[kernel] != outputs[expected_kernel]:
+                raise CommandError(f'The {kernel} kernel gave a different output to the {expected_kernel} kernel')
+
+    def _export(self, team_id: str, path: str, greedy: bool):
+        """
+        Read the Team's current solver inputs and write them to the fixture
+        """
+        try:
+            team = Team.objects.get(pk=team_id)
+        except (Team.DoesNotExist, ValidationError):
+            raise CommandError(f'Team {team_id} does not exist')
+
+        data = fixture.dump(LootSolver._get_inputs(team, greedy), team.solver_sort_overrides)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+        self.stdout.write(f'Wrote {len(data["id_order"])} members and {len(data["history"])} history rows to {path}')
+
+    def _replay(self, inputs: core.SolverInputs, kernel: str, repeat: int, profile_path: Optional[str], top: int) -> core.Payload:
+        """
+        Solve the inputs `repeat` times with the kernel, printing the time taken by each phase.
+        Returns the output of the last solve.
+        """
+        times: Dict[str, List[float]] = defaultdict(list)
+
+        @contextmanager
+        def phase(name: str) -> Iterator[None]:
+            start = perf_counter()
+            try:
+                yield
+            finally:
+                times[name].append((perf_counter() - start) * 1000)
+
+        profiler = cProfile.Profile() if profile_path is not None else None
+        for _ in range(repeat):
+            if profiler is not None:
+                profiler.enable()
+            with phase('total'):
+                payload = core.solve(inputs, kernel=kernel, phase=phase)
+            if profiler is not None:
+                profiler.disable()
+
+        self.stdout.write(f'{kernel}, {repeat} runs')
+        for name, durations in times.items():
+            self.stdout.write(f'\t{name}: mean {sum(durations) / len(durations):.2f}ms, max {max(durations):.2f}ms')
+
+        if profiler is not None:
+            profiler.dump_stats(profile_path)
+            self.stdout.write(f'Profile written to {profile_path}')
+            pstats.Stats(profiler, stream=self.stdout).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        return payload
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:09
+
+import auto_prefetch
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.manager
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_add_greedability_setting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LootRequirement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bis_equipped', models.BooleanField()),
+                ('item', models.CharField(blank=True, max_length=32)),
+                ('need', models.BooleanField()),
+                ('outstanding', models.BooleanField()),
+                ('position', models.PositiveSmallIntegerField()),
+                ('slot', models.CharField(max_length=16)),
+                ('source', models.CharField(choices=[('raid', 'Raid'), ('tome', 'Tome'), ('other', 'Other')], max_length=5)),
+                ('bis_list', auto_prefetch.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loot_requirements', to='api.bislist')),
+                ('current_gear', auto_prefetch.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.gear')),
+                ('member', auto_prefetch.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loot_requirements', to='api.teammember')),
+                ('team', auto_prefetch.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loot_requirements', to='api.team')),
+            ],
+            options={
+                'ordering': ['member_id', 'bis_list_id', 'position'],
+                'abstract': False,
+                'base_manager_name': 'prefetch_manager',
+                'unique_together': {('member', 'bis_list', 'slot')},
+            },
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('prefetch_manager', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_loot_requirements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_team_data_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loot',
+            index=models.Index(fields=['team', 'tier', '-obtained', '-id'], name='loot_history_idx'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+from django.db import migrations
+
+# A frozen copy of the row generation in api.models.loot_requirement and api.gear_masks at the time of this migration,
+# so later changes to either don't change what this migration writes
+SLOTS = [
+    'mainhand',
+    'head',
+    'body',
+    'hands',
+    'legs',
+    'feet',
+    'earrings',
+    'necklace',
+    'bracelet',
+    'left_ring',
+    'right_ring',
+]
+ARMOUR = {'head', 'body', 'hands', 'legs', 'feet'}
+ACCESSORIES = {'earrings', 'necklace', 'bracelet', 'left_ring', 'right_ring'}
+RINGS = {'left_ring', 'right_ring'}
+
+
+def build_rows(LootRequirement, member, bis_list, raid_ids, tome_ids):
+    """
+    Generate the (unsaved) rows for a Member and BIS List, given the ids of the Tier's raid and tome Gear
+    """
+    bis = {slot: getattr(bis_list, f'bis_{slot}_id') for slot in SLOTS}
+    current = {slot: getattr(bis_list, f'current_{slot}_id') for slot in SLOTS}
+    # One raid ring drops for either slot, so neither is needed if a raid ring is already worn
+    raid_ring_worn = any(current[slot] in raid_ids for slot in RINGS)
+
+    rows = []
+    for position, slot in enumerate(SLOTS):
+        item = ''
+        outstanding = False
+        if bis[slot] in raid_ids:
+            source = 'raid'
+            item = slot if slot not in RINGS else 'ring'
+            outstanding = current[slot] not in raid_ids and not (slot in RINGS and raid_ring_worn)
+        elif bis[slot] in tome_ids:
+            source = 'tome'
+            if slot in ARMOUR:
+                item = 'tome-armour-augment'
+            elif slot in ACCESSORIES:
+                item = 'tome-accessory-augment'
+            outstanding = item != '' and current[slot] not in tome_ids
+        else:
+            source = 'other'
+
+        rows.append(LootRequirement(
+            bis_equipped=bis[slot] == current[slot],
+            bis_list=bis_list,
+            current_gear_id=current[slot],
+            item=item,
+            member=member,
+            need=bis_list.id == member.bis_list_id,
+            outstanding=outstanding,
+            position=position,
+            slot=slot,
+            source=source,
+            team_id=member.team_id,
+        ))
+    return rows
+
+
+def backfill_loot_requirements(apps, schema_editor):
+    """
+    Fill the LootRequirement rows for every existing Team, the same way LootRequirement.rebuild did when this was written
+    """
+    BISList = apps.get_model('api', 'BISList')
+    Gear = apps.get_model('api', 'Gear')
+    LootRequirement = apps.get_model('api', 'LootRequirement')
+    TeamMember = apps.get_model('api', 'TeamMember')
+    Tier = apps.get_model('api', 'Tier')
+
+    # The raid and tome Gear of every Tier
+    tiers = list(Tier.objects.all())
+    names = {tier.raid_gear_name for tier in tiers} | {tier.tome_gear_name for tier in tiers}
+    ids_by_name = {}
+    for gear_id, name in Gear.objects.filter(name__in=names).values_list('id', 'name'):
+        ids_by_name.setdefault(name, set()).add(gear_id)
+    gear_ids = {
+        tier.id: (ids_by_name.get(tier.raid_gear_name, set()), ids_by_name.get(tier.tome_gear_name, set()))
+        for tier in tiers
+    }
+
+    LootRequirement.objects.all().delete()
+    for team_id in TeamMember.objects.values_list('team_id', flat=True).distinct():
+        members = list(TeamMember.objects.filter(team_id=team_id).select_related('team'))
+        lists_by_owner = {}
+        for bis_list in BISList.objects.filter(owner_id__in={member.character_id for member in members}):
+            lists_by_owner.setdefault(bis_list.owner_id, []).append(bis_list)
+
+        rows = []
+        for member in members:
+            raid_ids, tome_ids = gear_ids[member.team.tier_id]
+            for bis_list in lists_by_owner.get(member.character_id, []):
+                rows.extend(build_rows(LootRequirement, member, bis_list, raid_ids, tome_ids))
+        LootRequirement.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_loot_history_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_loot_requirements, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ from .character import Character
 from .gear import Gear
 from .job import Job
 from .loot import Loot
+from .loot_requirement import LootRequirement
 from .notification import Notification
 from .settings import Settings
 from .team import Team
@@ -19,6 +20,7 @@ __all__ = [
     'Job',
 
     'Loot',
+    'LootRequirement',
 
     'Notification',
 
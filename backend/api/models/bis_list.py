@@ -3,14 +3,43 @@ The main class of the system;
 
 Links together characters, jobs and gear into a single list
 """
-from typing import List
+from typing import Iterable, List
 import auto_prefetch
 from django.db import models
 from django.db.models import Q
 from django.dispatch import receiver
+from api import gear_masks
+from .gear import Gear
 
 
 class BISList(auto_prefetch.Model):
+    GEAR_FIELDS = [
+        'bis_body',
+        'bis_bracelet',
+        'bis_earrings',
+        'bis_feet',
+        'bis_hands',
+        'bis_head',
+        'bis_left_ring',
+        'bis_legs',
+        'bis_mainhand',
+        'bis_necklace',
+        'bis_offhand',
+        'bis_right_ring',
+        'current_body',
+        'current_bracelet',
+        'current_earrings',
+        'current_feet',
+        'current_hands',
+        'current_head',
+        'current_left_ring',
+        'current_legs',
+        'current_mainhand',
+        'current_necklace',
+        'current_offhand',
+        'current_right_ring',
+    ]
+
     bis_body = auto_prefetch.ForeignKey('Gear', on_delete=models.CASCADE, related_name='bis_body_set')
     bis_bracelet = auto_prefetch.ForeignKey('Gear', on_delete=models.CASCADE, related_name='bis_bracelet_set')
     bis_earrings = auto_prefetch.ForeignKey('Gear', on_delete=models.CASCADE, related_name='bis_earrings_set')
@@ -76,14 +105,11 @@ class BISList(auto_prefetch.Model):
     def _check_augments(self, gear_name: str, slots: List[str]) -> int:
         """
         Check through slots, see how many of them need augmenting
+        Compares Gear ids through gear_masks, so the Gear for each slot doesn't need to be loaded.
         """
-        needed = 0
-        for slot in slots:
-            current = getattr(self, f'current_{slot}')
-            bis = getattr(self, f'bis_{slot}')
-            if bis.name == gear_name and current.name != gear_name:
-                needed += 1
-        return needed
+        gear_ids = set(Gear.objects.filter(name=gear_name).values_list('id', flat=True))
+        masks = gear_masks.build(self, set(), gear_ids)
+        return bin(masks.tome_needed & gear_masks.mask(slots)).count('1')
 
     def sync(self, to_sync: 'BISList'):
         """
@@ -103,6 +129,19 @@ class BISList(auto_prefetch.Model):
         self.current_right_ring = to_sync.current_right_ring
         self.save()
 
+    @staticmethod
+    def prefetch_gear(bis_lists: Iterable['BISList']):
+        """
+        Load every piece of Gear referenced by the given BIS Lists in one query, and cache them on the lists.
+        Much cheaper than joining the Gear table once per slot when a lot of lists are needed at once.
+        """
+        bis_lists = list(bis_lists)
+        ids = {getattr(bis, f'{field}_id') for bis in bis_lists for field in BISList.GEAR_FIELDS}
+        gear = Gear.objects.in_bulk(ids)
+        for bis in bis_lists:
+            for field in BISList.GEAR_FIELDS:
+                setattr(bis, field, gear[getattr(bis, f'{field}_id')])
+
     @property
     def item_level(self):
         """
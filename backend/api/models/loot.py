@@ -25,3 +25,7 @@ class Loot(auto_prefetch.Model):
 
     class Meta(auto_prefetch.Model.Meta):
         ordering = ['-obtained', '-id']
+        indexes = [
+            # Matches the ordering for paginating a Team's history in a Tier
+            models.Index(fields=['team', 'tier', '-obtained', '-id'], name='loot_history_idx'),
+        ]
@@ -0,0 +1,199 @@
+"""
+Denormalized store of what every Team Member needs from raid drops, per BIS List and slot.
+
+One row exists for each (Member, BIS List of the Member's Character, gear slot) combination.
+Rows are rebuilt whenever a BIS List, Team Member or Team is saved, so the Loot page and Loot Solver can read them
+directly instead of comparing every slot of every BIS List against the Tier on each request.
+The rows themselves are generated from the bitmasks in api.gear_masks, so generating them doesn't need to load any Gear.
+"""
+# stdlib
+from typing import Dict, Iterable, List, Set, Tuple
+# lib
+import auto_prefetch
+from django.db import models, transaction
+from django.dispatch import receiver
+# local
+from api import gear_masks
+from .bis_list import BISList
+from .gear import Gear
+from .team import Team
+from .team_member import TeamMember
+from .tier import Tier
+
+
+class LootRequirement(auto_prefetch.Model):
+    # Offhand is skipped as it is always handed out alongside the mainhand
+    SLOTS = [
+        'mainhand',
+        'head',
+        'body',
+        'hands',
+        'legs',
+        'feet',
+        'earrings',
+        'necklace',
+        'bracelet',
+        'left_ring',
+        'right_ring',
+    ]
+    ARMOUR = {'head', 'body', 'hands', 'legs', 'feet'}
+    ACCESSORIES = {'earrings', 'necklace', 'bracelet', 'left_ring', 'right_ring'}
+
+    RAID = 'raid'
+    TOME = 'tome'
+    OTHER = 'other'
+    SOURCES = (
+        (RAID, 'Raid'),
+        (TOME, 'Tome'),
+        (OTHER, 'Other'),
+    )
+
+    bis_equipped = models.BooleanField()
+    bis_list = auto_prefetch.ForeignKey('BISList', on_delete=models.CASCADE, related_name='loot_requirements')
+    current_gear = auto_prefetch.ForeignKey('Gear', on_delete=models.CASCADE, related_name='+')
+    # The Loot item that fills this requirement ('ring', 'tome-armour-augment', etc), blank if it isn't from the raid
+    item = models.CharField(max_length=32, blank=True)
+    member = auto_prefetch.ForeignKey('TeamMember', on_delete=models.CASCADE, related_name='loot_requirements')
+    # True if this row belongs to the BIS List the Member is using in the Team
+    need = models.BooleanField()
+    # True if the item is still required to complete the BIS List
+    outstanding = models.BooleanField()
+    position = models.PositiveSmallIntegerField()
+    slot = models.CharField(max_length=16)
+    source = models.CharField(max_length=5, choices=SOURCES)
+    team = auto_prefetch.ForeignKey('Team', on_delete=models.CASCADE, related_name='loot_requirements')
+
+    class Meta(auto_prefetch.Model.Meta):
+        ordering = ['member_id', 'bis_list_id', 'position']
+        unique_together = ['member', 'bis_list', 'slot']
+
+    def __str__(self) -> str:
+        return f'{self.slot} ({self.source}) for {self.bis_list_id}, member {self.member_id} of {self.team_id}'
+
+    @staticmethod
+    def build(member: TeamMember, bis_list: BISList, masks: gear_masks.GearMasks) -> List['LootRequirement']:
+        """
+        Generate the (unsaved) rows for the given Member and BIS List, from the masks of the BIS List for the Team's Tier.
+        """
+        rows = []
+        for position, slot in enumerate(LootRequirement.SLOTS):
+            bit = gear_masks.BITS[slot]
+
+            item = ''
+            outstanding = False
+            if masks.raid_bis & bit:
+                source = LootRequirement.RAID
+                item = slot if '_ring' not in slot else 'ring'
+                outstanding = bool(masks.raid_needed & bit)
+            elif masks.tome_bis & bit:
+                source = LootRequirement.TOME
+                if bit & gear_masks.ARMOUR:
+                    item = 'tome-armour-augment'
+                elif bit & gear_masks.ACCESSORIES:
+                    item = 'tome-accessory-augment'
+                outstanding = item != '' and bool(masks.tome_needed & bit)
+            else:
+                source = LootRequirement.OTHER
+
+            rows.append(LootRequirement(
+                bis_equipped=bool(masks.equipped & bit),
+                bis_list=bis_list,
+                current_gear_id=getattr(bis_list, f'current_{slot}_id'),
+                item=item,
+                member=member,
+                need=bis_list.id == member.bis_list_id,
+                outstanding=outstanding,
+                position=position,
+                slot=slot,
+                source=source,
+                team_id=member.team_id,
+            ))
+        return rows
+
+    @staticmethod
+    def tier_gear_ids(tiers: Iterable[Tier]) -> Dict[int, Tuple[Set[int], Set[int]]]:
+        """
+        Find the ids of the Gear counting as raid and tome gear for each of the given Tiers, in a single query.
+        """
+        tiers = list(tiers)
+        names = {tier.raid_gear_name for tier in tiers} | {tier.tome_gear_name for tier in tiers}
+        ids_by_name: Dict[str, Set[int]] = {}
+        for gear_id, name in Gear.objects.filter(name__in=names).values_list('id', 'name'):
+            ids_by_name.setdefault(name, set()).add(gear_id)
+
+        return {
+            tier.id: (ids_by_name.get(tier.raid_gear_name, set()), ids_by_name.get(tier.tome_gear_name, set()))
+            for tier in tiers
+        }
+
+    @staticmethod
+    def generate(members: Iterable[TeamMember], bis_list_ids: Iterable[int] = None) -> List['LootRequirement']:
+        """
+        Generate the full set of (unsaved) rows for the given Members.
+        If `bis_list_ids` is given, only those BIS Lists will be checked.
+        """
+        members = list(members)
+        lists = BISList.objects.filter(owner_id__in={member.character_id for member in members})
+        if bis_list_ids is not None:
+            lists = lists.filter(pk__in=bis_list_ids)
+
+        lists_by_owner: Dict[int, List[BISList]] = {}
+        for bis_list in lists:
+            lists_by_owner.setdefault(bis_list.owner_id, []).append(bis_list)
+        tiers = Tier.objects.in_bulk({member.team.tier_id for member in members})
+        gear_ids = LootRequirement.tier_gear_ids(tiers.values())
+
+        # Masks only depend on the list and Tier, and Members of different Teams can share both
+        masks: Dict[Tuple[int, int], gear_masks.GearMasks] = {}
+        rows = []
+        for member in members:
+            tier_id = member.team.tier_id
+            for bis_list in lists_by_owner.get(member.character_id, []):
+                key = (bis_list.id, tier_id)
+                if key not in masks:
+                    masks[key] = gear_masks.build(bis_list, *gear_ids[tier_id])
+                rows.extend(LootRequirement.build(member, bis_list, masks[key]))
+        return rows
+
+    @staticmethod
+    def rebuild(members: models.QuerySet, bis_list_ids: Iterable[int] = None):
+        """
+        Replace the stored rows for the given Members with freshly generated ones.
+        If `bis_list_ids` is given, only the rows for those BIS Lists are replaced.
+        """
+        members = list(members.select_related('team'))
+        existing = LootRequirement.objects.filter(member__in=members)
+        if bis_list_ids is not None:
+            bis_list_ids = list(bis_list_ids)
+            existing = existing.filter(bis_list_id__in=bis_list_ids)
+
+        with transaction.atomic():
+            existing.delete()
+            LootRequirement.objects.bulk_create(LootRequirement.generate(members, bis_list_ids))
+
+
+@receiver(models.signals.post_save, sender=BISList)
+def bis_list_requirements(sender, instance: BISList, **kwargs):
+    """
+    Rebuild the requirements for a saved BIS List in every Team its owner is a Member of.
+    This also covers Loot being recorded, as the Loot views update the BIS List that received the item.
+    """
+    LootRequirement.rebuild(TeamMember.objects.filter(character_id=instance.owner_id), [instance.pk])
+
+
+@receiver(models.signals.post_save, sender=TeamMember)
+def team_member_requirements(sender, instance: TeamMember, **kwargs):
+    """
+    Rebuild the requirements for a Member whenever they are added or change which BIS List they are using.
+    """
+    LootRequirement.rebuild(TeamMember.objects.filter(pk=instance.pk))
+
+
+@receiver(models.signals.post_save, sender=Team)
+def team_requirements(sender, instance: Team, created: bool, update_fields=None, **kwargs):
+    """
+    Rebuild the requirements for a whole Team, as changing its Tier changes what counts as raid and tome gear.
+    """
+    if created or (update_fields is not None and 'tier' not in update_fields):
+        return
+    LootRequirement.rebuild(instance.members.all())
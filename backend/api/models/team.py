@@ -5,18 +5,25 @@ Model for managing the Teams in the system
 import string
 import uuid
 from random import choice
+from typing import Iterable
 # lib
 import auto_prefetch
 from django.db import models
+from django.dispatch import receiver
 # local
 from api import notifier
+from .bis_list import BISList
 from .character import Character
+from .loot import Loot
+from .team_member import TeamMember
 
 CHARS = string.ascii_letters + string.digits
 CODE_LEN = 32
 
 
 class Team(auto_prefetch.Model):
+    # Bumped whenever anything shown on the Team, Loot or Solver pages changes, and used to build ETags for them
+    data_version = models.PositiveIntegerField(default=0)
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     invite_code = models.CharField(max_length=CODE_LEN)
     name = models.CharField(max_length=64)
@@ -27,6 +34,34 @@ class Team(auto_prefetch.Model):
     def __str__(self):
         return f'Team {self.name} @ {self.tier.name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the Tier the Team was loaded with, so saving can tell if it changed
+        instance._saved_tier_id = dict(zip(field_names, values)).get('tier_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Never write data_version from an instance, as it may have been bumped since the instance was loaded.
+        The Tier is only written if it changed, as changing it rebuilds the requirements of the whole Team.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            tier_changed = self.tier_id != getattr(self, '_saved_tier_id', None)
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'data_version' and (field.name != 'tier' or tier_changed)
+            ]
+        super().save(*args, **kwargs)
+        self._saved_tier_id = self.tier_id
+
+    @staticmethod
+    def bump_version(teams: Iterable['Team']):
+        """
+        Increase the data_version of the given Teams (or Team IDs), invalidating any ETags that clients hold for them.
+        """
+        Team.objects.filter(pk__in=teams).update(data_version=models.F('data_version') + 1)
+
     def disband(self):
         """
         Disband the Team.
@@ -104,3 +139,41 @@ class Team(auto_prefetch.Model):
         else:
             notifier.team_leave(char_member)
         char_member.delete()
+
+
+@receiver(models.signals.post_save, sender=Team)
+def team_version(sender, instance: Team, created: bool, **kwargs):
+    """
+    Changing the Team's own details (name, tier, solver sort order, etc) changes every page for it.
+    """
+    if not created:
+        Team.bump_version([instance.pk])
+
+
+@receiver(models.signals.post_save, sender=TeamMember)
+@receiver(models.signals.post_delete, sender=TeamMember)
+@receiver(models.signals.post_save, sender=Loot)
+@receiver(models.signals.post_delete, sender=Loot)
+def team_child_version(sender, instance, **kwargs):
+    """
+    Membership and Loot changes only affect the one Team they belong to.
+    """
+    if instance.team_id is not None:
+        Team.bump_version([instance.team_id])
+
+
+@receiver(models.signals.post_save, sender=BISList)
+@receiver(models.signals.post_delete, sender=BISList)
+def bis_list_version(sender, instance: BISList, **kwargs):
+    """
+    A BIS List is shown in every Team its owner is a Member of, whether or not it is the list used for that Team.
+    """
+    Team.bump_version(TeamMember.objects.filter(character_id=instance.owner_id).values('team_id'))
+
+
+@receiver(models.signals.post_save, sender=Character)
+def character_version(sender, instance: Character, **kwargs):
+    """
+    Character details such as names and aliases are shown in every Team they are a Member of.
+    """
+    Team.bump_version(TeamMember.objects.filter(character=instance).values('team_id'))
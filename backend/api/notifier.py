@@ -6,15 +6,11 @@ Also will handle sending info to websockets when we get there
 """
 # stdlib
 from __future__ import annotations
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
 # lib
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.contrib.auth.models import User
 # local
-from . import models
-
-CHANNEL_LAYER = get_channel_layer()
+from . import broadcast, models
 
 
 def _create_notif(user: Optional[User], text: str, link: str, type: str):
@@ -40,16 +36,61 @@ def _create_notif(user: Optional[User], text: str, link: str, type: str):
 
     # If we make it to this point, create the object and then push updates down the web socket
     models.Notification.objects.create(user=user, text=text, link=link, type=type)
-    if CHANNEL_LAYER is not None:
-        async_to_sync(CHANNEL_LAYER.group_send)(f'user-updates-{user.id}', {'type': 'notification'})
+    broadcast.send_to_user(user.id, {'type': 'notification'})
 
 
-def loot_tracker_update(bis: models.BISList, team: models.Team):
+def _create_notifs(notifications: List[Tuple[Optional[User], str, str, str]]):
+    """
+    Batch version of _create_notif, taking (user, text, link, type) tuples.
+    Runs the same checks, but saves every Notification in one query and sends one websocket message per User.
+    """
+    wanted = []
+    for user, text, link, type in notifications:
+        if user is None:
+            continue
+        try:
+            send = user.settings.notifications[type]
+        except (AttributeError, models.Settings.DoesNotExist, KeyError):
+            send = True
+        if send:
+            wanted.append((user, text, link, type))
+
+    if len(wanted) == 0:
+        return
+
+    # Same deduping as above, for the whole batch at once and also within the batch itself
+    seen = set(models.Notification.objects.filter(
+        user__in={user for user, *_ in wanted},
+        type__in={type for *_, type in wanted},
+        read=False,
+    ).values_list('user_id', 'text', 'link', 'type'))
+
+    objs = []
+    for user, text, link, type in wanted:
+        key = (user.id, text, link, type)
+        if key in seen:
+            continue
+        seen.add(key)
+        objs.append(models.Notification(user=user, text=text, link=link, type=type))
+
+    models.Notification.objects.bulk_create(objs)
+    for user_id in {obj.user_id for obj in objs}:
+        broadcast.send_to_user(user_id, {'type': 'notification'})
+
+
+def _loot_tracker_notif(bis: models.BISList, team: models.Team) -> Tuple[Optional[User], str, str, str]:
     char = bis.owner
     text = f'"{char}"\'s BIS List "{bis}" was updated via "{team.name}"\'s Loot Tracker!'
     link = f'/characters/{char.id}/bis_list/{bis.id}/'
-    user = char.user
-    _create_notif(user, text, link, 'loot_tracker_update')
+    return char.user, text, link, 'loot_tracker_update'
+
+
+def loot_tracker_update(bis: models.BISList, team: models.Team):
+    _create_notif(*_loot_tracker_notif(bis, team))
+
+
+def loot_tracker_updates(bis_lists: Iterable[models.BISList], team: models.Team):
+    _create_notifs([_loot_tracker_notif(bis, team) for bis in bis_lists])
 
 
 def team_disband(team: models.Team):
@@ -0,0 +1,88 @@
+"""
+Warming the Loot and Solver caches after the weekly reset
+
+Right after reset, every static opens the Loot page and the Loot Solver at once.
+For each region in settings.LOOT_PREWARM_REGIONS, a scheduled task builds and caches those payloads for every Team in
+the current Tier ahead of time, so the first request of the week is a cache hit.
+
+Teams belong to the region of their leader's data centre. Teams whose data centre isn't in any region are warmed with
+every region, which only costs a cache lookup for the ones already warmed.
+Progress of the latest run for each region is kept in the default cache, like the response cache.
+"""
+# stdlib
+import re
+from typing import Any, Dict, List
+# lib
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+# local
+from .models import TeamMember, Tier
+
+PREFIX = 'loot-prewarm'
+COUNTERS = ['chunks_done', 'warmed', 'built', 'failed']
+# Worlds are stored as "World (Data Centre)"
+DATA_CENTRE_PATTERN = re.compile(r'\((\w+)\)')
+
+
+def region_teams(region: str) -> List[str]:
+    """
+    Get the ids of every Team in the current Tier that belongs to the given region, or to no region at all
+    """
+    tier = Tier.objects.first()
+    if tier is None:
+        return []
+
+    known = {
+        data_centre: name
+        for name, config in settings.LOOT_PREWARM_REGIONS.items()
+        for data_centre in config['data_centres']
+    }
+    team_ids = []
+    leaders = TeamMember.objects.filter(lead=True, team__tier=tier).values_list('team_id', 'character__world')
+    for team_id, world in leaders.order_by('team_id'):
+        found = DATA_CENTRE_PATTERN.search(world)
+        if known.get(found.group(1) if found else None, region) == region:
+            team_ids.append(str(team_id))
+    return team_ids
+
+
+def chunks(team_ids: List[str]) -> List[List[str]]:
+    size = settings.LOOT_PREWARM_CHUNK_SIZE
+    return [team_ids[index:index + size] for index in range(0, len(team_ids), size)]
+
+
+def _key(region: str, name: str = 'run') -> str:
+    return f'{PREFIX}:{region}:{name}'
+
+
+def start(region: str, teams: int, chunk_count: int):
+    """
+    Record the start of a run for the region, resetting the progress of the last one
+    """
+    timeout = settings.LOOT_PREWARM_TTL
+    cache.set(_key(region), {'started': timezone.now().isoformat(), 'teams': teams, 'chunks': chunk_count}, timeout=timeout)
+    cache.set_many({_key(region, counter): 0 for counter in COUNTERS}, timeout=timeout)
+
+
+def record(region: str, warmed: int, built: int, failed: int):
+    """
+    Record a finished chunk of a run; how many Teams were warmed, how many payloads had to be built, and how many Teams failed
+    """
+    for counter, amount in [('chunks_done', 1), ('warmed', warmed), ('built', built), ('failed', failed)]:
+        try:
+            cache.incr(_key(region, counter), amount)
+        except ValueError:  # pragma: no cover
+            # The run expired before this chunk finished, there's nothing left to record against
+            pass
+
+
+def progress(region: str) -> Dict[str, Any]:
+    """
+    Get the progress of the latest run for the region, or an empty dict if it hasn't run recently
+    """
+    run = cache.get(_key(region))
+    if run is None:
+        return {}
+    counters = cache.get_many([_key(region, counter) for counter in COUNTERS])
+    return {**run, **{counter: counters.get(_key(region, counter), 0) for counter in COUNTERS}}
@@ -0,0 +1,87 @@
+"""
+Timing and profiling for slow requests, used by the Loot Solver
+
+Timings measure how long each phase of a request takes and how many queries it makes, and turn them into a
+Server-Timing header that shows up in the browser's network tools.
+Staff can also ask for a full cProfile of a request, which is written as a pstats file to
+settings.LOOT_SOLVER_PROFILE_DIR, to open with `python -m pstats` or snakeviz later.
+"""
+# stdlib
+import cProfile
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, Optional, Tuple
+# lib
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.request import Request
+
+
+class Timings:
+    """
+    How long each phase took in milliseconds and how many queries it made, in the order the phases started
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, Tuple[float, int]] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time the code inside the block and count its queries, adding to anything already recorded under the name
+        """
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        duration, total = self.phases.setdefault(name, (0.0, 0))
+        start = perf_counter()
+        try:
+            with connection.execute_wrapper(count):
+                yield
+        finally:
+            self.phases[name] = (duration + (perf_counter() - start) * 1000, total + queries)
+
+    def header(self) -> str:
+        """
+        Build the value of a Server-Timing header with a metric for each phase
+        """
+        return ', '.join(
+            f'{name};dur={duration:.2f};desc="{queries} queries"'
+            for name, (duration, queries) in self.phases.items()
+        )
+
+
+def profile_requested(request: Request) -> bool:
+    """
+    Check if a request asked for a profile with `profile=1`, which is only allowed for staff and only when profiles have
+    somewhere to go
+    """
+    return (
+        request.query_params.get('profile') == '1'
+        and request.user.is_staff
+        and settings.LOOT_SOLVER_PROFILE_DIR is not None
+    )
+
+
+@contextmanager
+def profile(name: str) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Profile the code inside the block, writing the stats to a file in LOOT_SOLVER_PROFILE_DIR named after `name`.
+    Yields a dict whose 'file' is set to the name of the file once the block finishes.
+    """
+    result: Dict[str, Optional[str]] = {'file': None}
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        os.makedirs(settings.LOOT_SOLVER_PROFILE_DIR, exist_ok=True)
+        result['file'] = f'{name}-{timezone.now().strftime("%Y%m%dT%H%M%S%f")}.pstats'
+        profiler.dump_stats(os.path.join(settings.LOOT_SOLVER_PROFILE_DIR, result['file']))
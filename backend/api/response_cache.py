@@ -0,0 +1,155 @@
+"""
+Cache for the rendered Loot page and Loot Solver payloads of a Team
+
+Payloads are stored per Team alongside the Team's data_version, so a cached payload is only ever served for the exact
+version of the data it was built from.
+Entries are also deleted whenever updates are pushed to the Team's websocket group, so stale payloads don't sit around until they expire.
+
+Some payloads are also stored against a fingerprint of the inputs they were built from instead of a Team and version.
+Those are shared between every Team and version that ends up with the same inputs, and expire on their own.
+
+Uses the default cache, which is Redis in deployed environments and local memory in tests.
+"""
+# stdlib
+from typing import Any, Callable, Dict, Iterable, Optional
+# lib
+from django.conf import settings
+from django.core.cache import cache
+# local
+from . import models
+
+# Each kind of payload, mapped to the variants of it that are stored per Team
+KINDS = {
+    'loot': [
+        f'{history}:{fight}'
+        for history in ['all', 'latest', 'none']
+        for fight in ['all', 'first', 'second', 'third', 'fourth']
+    ],
+    'solver': ['greedy', 'standard'],
+}
+# Kinds of payload that are stored by fingerprint
+SHARED_KINDS = ['solver_inputs', 'solver_projection', 'solver_floor_projection']
+PREFIX = 'loot-cache'
+
+
+def _key(team_id: Any, kind: str, variant: str) -> str:
+    return f'{PREFIX}:{team_id}:{kind}:{variant}'
+
+
+def _count(kind: str, result: str):
+    """
+    Increase the hit or miss counter for the given kind of payload
+    """
+    key = f'{PREFIX}:stats:{kind}:{result}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:  # pragma: no cover
+        # Evicted between the add and the incr, losing one count isn't a big deal
+        pass
+
+
+def get_or_build(team: models.Team, kind: str, build: Callable[[], Dict], variant: str) -> Dict:
+    """
+    Return the cached payload of the given kind for the Team's current data_version, calling `build` to create it on a miss.
+    """
+    key = _key(team.pk, kind, variant)
+    cached: Optional[Dict] = cache.get(key)
+    if cached is not None and cached['version'] == team.data_version:
+        _count(kind, 'hits')
+        return cached['payload']
+
+    _count(kind, 'misses')
+    payload = build()
+    cache.set(key, {'version': team.data_version, 'payload': payload}, timeout=settings.LOOT_CACHE_TTL)
+    return payload
+
+
+def warm(team: models.Team, kind: str, build: Callable[[], Dict], variant: str, timeout: int) -> bool:
+    """
+    Make sure the payload of the given kind is cached for the Team's current data_version for at least `timeout` seconds,
+    building it only if it isn't already there. Doesn't count towards the hit and miss counts.
+    Returns True if the payload had to be built.
+    """
+    key = _key(team.pk, kind, variant)
+    cached: Optional[Dict] = cache.get(key)
+    if cached is not None and cached['version'] == team.data_version:
+        cache.touch(key, timeout)
+        return False
+
+    cache.set(key, {'version': team.data_version, 'payload': build()}, timeout=timeout)
+    return True
+
+
+def _shared_key(kind: str, fingerprint: str) -> str:
+    return f'{PREFIX}:shared:{kind}:{fingerprint}'
+
+
+def get_shared(kind: str, fingerprint: str) -> Optional[Dict]:
+    """
+    Return the cached payload of the given kind built from inputs with the given fingerprint, or None on a miss
+    """
+    cached: Optional[Dict] = cache.get(_shared_key(kind, fingerprint))
+    _count(kind, 'misses' if cached is None else 'hits')
+    return cached
+
+
+def set_shared(kind: str, fingerprint: str, payload: Dict):
+    cache.set(_shared_key(kind, fingerprint), payload, timeout=settings.LOOT_CACHE_TTL)
+
+
+class SharedMemo:
+    """
+    Dict-like access to the shared payloads of one kind, for code that memoizes its own intermediate results
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    def get(self, fingerprint: str) -> Optional[Any]:
+        return get_shared(self.kind, fingerprint)
+
+    def __setitem__(self, fingerprint: str, payload: Any):
+        set_shared(self.kind, fingerprint, payload)
+
+
+def get_or_build_shared(kind: str, fingerprint: str, build: Callable[[], Dict]) -> Dict:
+    """
+    Return the cached payload of the given kind built from inputs with the given fingerprint, calling `build` to create it on a miss.
+    """
+    cached = get_shared(kind, fingerprint)
+    if cached is not None:
+        return cached
+
+    payload = build()
+    set_shared(kind, fingerprint, payload)
+    return payload
+
+
+def invalidate(team_ids: Iterable[Any]):
+    """
+    Remove every cached payload for the given Teams
+    """
+    keys = [
+        _key(team_id, kind, variant)
+        for team_id in team_ids
+        for kind, variants in KINDS.items()
+        for variant in variants
+    ]
+    cache.delete_many(keys)
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """
+    Get the hit and miss counts for each kind of payload
+    """
+    keys = {
+        f'{PREFIX}:stats:{kind}:{result}': (kind, result)
+        for kind in [*KINDS, *SHARED_KINDS]
+        for result in ['hits', 'misses']
+    }
+    values = cache.get_many(keys.keys())
+    counts = {kind: {'hits': 0, 'misses': 0} for kind in [*KINDS, *SHARED_KINDS]}
+    for key, (kind, result) in keys.items():
+        counts[kind][result] = values.get(key, 0)
+    return counts
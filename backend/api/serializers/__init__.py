@@ -2,7 +2,13 @@ from .bis_list import BISListSerializer, BISListModifySerializer
 from .character import CharacterCollectionSerializer, CharacterDetailsSerializer, CharacterUpdateSerializer
 from .gear import GearSerializer
 from .job import JobSerializer
-from .loot import LootSerializer, LootCreateSerializer, LootCreateWithBISSerializer
+from .loot import (
+    LootSerializer,
+    LootClearSerializer,
+    LootCreateSerializer,
+    LootCreateWithBISSerializer,
+    LootSolverWhatIfSerializer,
+)
 from .notification import NotificationSerializer
 from .plugin import PluginImportSerializer, PluginImportResponseSerializer
 from .settings import SettingsSerializer
@@ -28,8 +34,10 @@ __all__ = [
     'JobSerializer',
 
     'LootSerializer',
+    'LootClearSerializer',
     'LootCreateSerializer',
     'LootCreateWithBISSerializer',
+    'LootSolverWhatIfSerializer',
 
     'NotificationSerializer',
 
@@ -4,11 +4,12 @@ Serializer for Loot data
 # stdlib
 from datetime import datetime, timedelta
 from string import capwords
-from typing import Optional
+from typing import Dict, Optional
 # lib
 from rest_framework import serializers
 # local
 from api.models import BISList, Loot, TeamMember
+from .team import validate_solver_sort_overrides
 
 __all__ = [
     'LootSerializer',
@@ -186,3 +187,22 @@ class LootCreateWithBISSerializer(serializers.Serializer):
                 )
 
         return data
+
+
+class LootClearSerializer(serializers.Serializer):
+    drops = LootCreateWithBISSerializer(many=True, allow_empty=False)
+
+
+class LootSolverCandidateSerializer(serializers.Serializer):
+    greedy = serializers.BooleanField()
+    solver_sort_overrides = serializers.DictField(child=serializers.IntegerField(), allow_empty=True)
+
+    def validate_solver_sort_overrides(self, solver_sort_overrides: Dict[str, int]) -> Dict[str, int]:
+        return validate_solver_sort_overrides(solver_sort_overrides)
+
+
+class LootSolverWhatIfSerializer(serializers.Serializer):
+    # Every candidate is a full run of the solver
+    MAX_CANDIDATES = 10
+
+    candidates = LootSolverCandidateSerializer(many=True, allow_empty=False, max_length=MAX_CANDIDATES)
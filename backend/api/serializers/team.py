@@ -16,13 +16,33 @@ __all__ = [
 ]
 
 
+def validate_solver_sort_overrides(solver_sort_overrides: Dict[str, int]) -> Dict[str, int]:
+    """
+    Ensure that no IDs are specified twice, and ensure that the numbers are not higher than the number of jobs defined
+    """
+    job_ids = set(Job.objects.values_list('id', flat=True))
+    total_jobs = len(job_ids)
+    seen_positions = set()
+    for job_id, new_position in solver_sort_overrides.items():
+        if job_id not in job_ids:
+            raise serializers.ValidationError(f'Invalid Job ID supplied: "{job_id}"')
+        if new_position < 1 or new_position > total_jobs:
+            raise serializers.ValidationError(f'Please specify a position between 1 and {total_jobs} (found "{new_position}")')
+        if new_position in seen_positions:
+            raise serializers.ValidationError(f'Please specify only one Job per position! (position "{new_position}" was found multiple times)')
+
+        seen_positions.add(new_position)
+
+    return solver_sort_overrides
+
+
 class TeamSerializer(serializers.ModelSerializer):
     members = TeamMemberSerializer(many=True)
     tier = TierSerializer()
 
     class Meta:
         model = Team
-        fields = '__all__'
+        exclude = ['data_version']
 
 
 class TeamUpdateSerializer(serializers.ModelSerializer):
@@ -36,23 +56,7 @@ class TeamUpdateSerializer(serializers.ModelSerializer):
         write_only_fields = ['team_lead']
 
     def validate_solver_sort_overrides(self, solver_sort_overrides: Dict[str, int]) -> Dict[str, int]:
-        """
-        Ensure that no IDs are specified twice, and ensure that the numbers are not higher than the number of jobs defined
-        """
-        job_ids = set(Job.objects.values_list('id', flat=True))
-        total_jobs = len(job_ids)
-        seen_positions = set()
-        for job_id, new_position in solver_sort_overrides.items():
-            if job_id not in job_ids:
-                raise serializers.ValidationError(f'Invalid Job ID supplied: "{job_id}"')
-            if new_position < 1 or new_position > total_jobs:
-                raise serializers.ValidationError(f'Please specify a position between 1 and {total_jobs} (found "{new_position}")')
-            if new_position in seen_positions:
-                raise serializers.ValidationError(f'Please specify only one Job per position! (position "{new_position}" was found multiple times)')
-
-            seen_positions.add(new_position)
-
-        return solver_sort_overrides
+        return validate_solver_sort_overrides(solver_sort_overrides)
 
     def validate_tier_id(self, tier_id: int) -> int:
         """
@@ -0,0 +1,21 @@
+"""
+The Loot Solver algorithm and the data structures it uses, independent of Django
+"""
+from .brackets import PriorityBrackets
+from .checkpoints import FloorCheckpoints
+from .core import project, solve, SolverInputs
+from .history import History, HistoryEntry
+from .journal import RequirementJournal
+from .pool import solve_many
+
+__all__ = [
+    'FloorCheckpoints',
+    'History',
+    'HistoryEntry',
+    'PriorityBrackets',
+    'project',
+    'RequirementJournal',
+    'solve',
+    'solve_many',
+    'SolverInputs',
+]
@@ -0,0 +1,246 @@
+"""
+Bitset kernel for the Loot Solver's handout simulation
+
+Most of the simulation asks set questions; which Members still need a slot, which slots only one Member can take this
+week, and who is left to hand out to. The list kernel in api.solver.core answers them by scanning lists of member ids.
+This kernel gives every slot and every Member a bit instead, so the requirements become a mask of Members per slot and a
+mask of slots per Member, and finding unique slots or removing a handed out slot from everyone is a few bitwise
+operations.
+
+Both kernels produce exactly the same handouts, which is fuzz tested, so either can be picked with core.KERNELS.
+"""
+# stdlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+# local
+from .brackets import PriorityBrackets
+from .core import HandoutData, output_slot_name, Requirements
+
+
+def _bits(mask: int) -> List[int]:
+    """
+    Get the index of every set bit in the mask, lowest first
+    """
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+class _Requirements:
+    """
+    A requirements map as a mask of Members for each slot and a mask of slots for each Member.
+    Members can need some slots more than once, like augments, so the extra copies are counted separately.
+    """
+    __slots__ = ('needs', 'member_slots', 'extra')
+
+    def __init__(self, requirements: Requirements, member_bits: Dict[int, int]):
+        self.needs = [0] * len(requirements)
+        self.member_slots: Dict[int, int] = dict.fromkeys(member_bits, 0)
+        self.extra: Dict[Tuple[int, int], int] = {}
+        for index, members in enumerate(requirements.values()):
+            for member_id in members:
+                if self.member_slots[member_id] >> index & 1:
+                    self.extra[index, member_id] = self.extra.get((index, member_id), 0) + 1
+                    continue
+                self.needs[index] |= member_bits[member_id]
+                self.member_slots[member_id] |= 1 << index
+
+    def remove(self, index: int, member_id: int, member_bit: int):
+        """
+        Remove one copy of a slot from a Member's requirements
+        """
+        copies = self.extra.get((index, member_id), 0)
+        if copies > 0:
+            self.extra[index, member_id] = copies - 1
+            return
+        self.needs[index] &= ~member_bit
+        self.member_slots[member_id] &= ~(1 << index)
+
+
+def simulate_handouts(
+    slots: List[str],
+    requirements: Requirements,
+    prio_brackets: PriorityBrackets,
+    weeks_per_token: int,
+    weeks: int,
+    greedy: bool,
+    finished: Optional[Dict[int, int]] = None,
+) -> List[HandoutData]:
+    """
+    Run the weekly handout simulation, the same as core._simulate_handouts.
+    The requirements are read into masks up front and never changed.
+    """
+    # Slot bits are in requirements order, which is the order the list kernel reads each Member's slots in
+    names = list(requirements)
+    output_names = [output_slot_name(slot) for slot in names]
+    indices = {slot: index for index, slot in enumerate(names)}
+    all_slots = (1 << len(names)) - 1
+
+    member_ids = {member_id: None for members in requirements.values() for member_id in members}
+    member_ids.update((member_id, None) for _, member_id in prio_brackets.descending())
+    member_bits = {member_id: 1 << index for index, member_id in enumerate(member_ids)}
+    state = _Requirements(requirements, member_bits)
+
+    remove_slots = slots
+    if 'augment' in slots[-1]:
+        remove_slots = [slots[-1]]
+    remove_indices = [indices[slot] for slot in remove_slots]
+    remove_mask = sum(1 << index for index in remove_indices)
+
+    handouts = []
+    while len(prio_brackets) > 0:
+        weeks += 1
+        week_data: HandoutData = {}
+
+        # Slots nobody needs any more are skipped for the week
+        done = 0
+        for index, needs in enumerate(state.needs):
+            if needs == 0:
+                week_data[output_names[index]] = None
+                done |= 1 << index
+        required_for_week = all_slots & ~done
+        needed_item_count = bin(required_for_week).count('1')
+
+        # Take Members in priority order until every slot needed this week is covered, see core._simulate_handouts
+        potential_loot_members: Dict[int, int] = {}
+        single_item_entries = 0
+        for _, member_id in prio_brackets.descending():
+            required = state.member_slots[member_id]
+            if required != 0 and required & (required - 1) == 0:
+                if required & single_item_entries:
+                    continue
+                single_item_entries |= required
+
+            potential_loot_members[member_id] = required
+            required_for_week &= ~required
+            if len(potential_loot_members) >= needed_item_count and required_for_week == 0:
+                break
+
+        re_insert = len(potential_loot_members) < needed_item_count
+
+        # The Members each slot is still potentially going to, as a mask per slot
+        holders = [0] * len(names)
+        for member_id, member_items in potential_loot_members.items():
+            for index in _bits(member_items):
+                holders[index] |= member_bits[member_id]
+
+        handout_queue: Deque[Tuple[int, int]] = deque()
+        for member_id, member_items in potential_loot_members.items():
+            if member_items != 0 and member_items & (member_items - 1) == 0:
+                handout_queue.append((member_id, member_items.bit_length() - 1))
+
+        uniques = _unique_slots(holders)
+        for member_id, member_items in potential_loot_members.items():
+            _queue_uniques(handout_queue, member_id, member_items, uniques, names, indices)
+
+        while done != all_slots and (len(potential_loot_members) > 0 or len(handout_queue) > 0):
+            if len(handout_queue) > 0:
+                member_id, index = handout_queue.popleft()
+            else:
+                member_id = next(iter(potential_loot_members))
+                member_items = potential_loot_members[member_id]
+                if member_items == 0:
+                    potential_loot_members.pop(member_id)
+                    continue
+                low = member_items & -member_items
+                if done & low:
+                    # Already handed out or skipped this week, so the Member can't take it any more
+                    potential_loot_members[member_id] = member_items ^ low
+                    holders[low.bit_length() - 1] &= ~member_bits[member_id]
+                    continue
+                index = low.bit_length() - 1
+
+            item_bit = 1 << index
+            if done & item_bit:
+                continue
+            done |= item_bit
+
+            if greedy and weeks % weeks_per_token == 0 and item_bit & remove_mask and prio_brackets.priority_of(member_id) <= 1:
+                week_data[output_names[index]] = None
+                continue
+
+            week_data[output_names[index]] = member_id
+            member_bit = member_bits[member_id]
+            state.remove(index, member_id, member_bit)
+            if prio_brackets.demote(member_id) == 0 and finished is not None:
+                finished[member_id] = weeks
+
+            removed = potential_loot_members.pop(member_id, 0)
+            for removed_index in _bits(removed):
+                holders[removed_index] &= ~member_bit
+            removed &= ~item_bit
+
+            # Nobody else can take the item this week, which can leave people with one slot or a newly unique one
+            holders[index] = 0
+            uniques = _unique_slots(holders)
+            for other_member_id, other_member_items in potential_loot_members.items():
+                if other_member_items & item_bit:
+                    other_member_items ^= item_bit
+                    potential_loot_members[other_member_id] = other_member_items
+                    if other_member_items != 0 and other_member_items & (other_member_items - 1) == 0:
+                        handout_queue.append((other_member_id, other_member_items.bit_length() - 1))
+                _queue_uniques(handout_queue, other_member_id, other_member_items, uniques, names, indices)
+
+            if re_insert:
+                potential_loot_members[member_id] = removed
+                for removed_index in _bits(removed):
+                    holders[removed_index] |= member_bit
+
+        handouts.append(week_data)
+
+        if weeks % weeks_per_token == 0:
+            member_purchases = {}
+            for _, member_id in prio_brackets.descending():
+                member_items = state.member_slots[member_id]
+                for index in remove_indices:
+                    if member_items >> index & 1:
+                        member_purchases[member_id] = index
+                        break
+
+            for purchaser_id, index in member_purchases.items():
+                state.remove(index, purchaser_id, member_bits[purchaser_id])
+                if prio_brackets.demote(purchaser_id) == 0 and finished is not None:
+                    finished[purchaser_id] = weeks
+            week_data['token'] = True
+        else:
+            week_data['token'] = False
+
+    return handouts
+
+
+def _unique_slots(holders: List[int]) -> int:
+    """
+    Get the mask of slots that exactly one Member can still take
+    """
+    uniques = 0
+    for index, members in enumerate(holders):
+        if members != 0 and members & (members - 1) == 0:
+            uniques |= 1 << index
+    return uniques
+
+
+def _queue_uniques(
+    handout_queue: Deque[Tuple[int, int]],
+    member_id: int,
+    member_items: int,
+    uniques: int,
+    names: List[str],
+    indices: Dict[str, int],
+):
+    """
+    Queue every slot only this Member can take.
+    When there are several, they're queued in name order like the list kernel, as which one is handed out first can
+    change the result.
+    """
+    member_uniques = member_items & uniques
+    if member_uniques == 0:
+        return
+    if member_uniques & (member_uniques - 1) == 0:
+        handout_queue.append((member_id, member_uniques.bit_length() - 1))
+        return
+
+    for name in sorted(names[index] for index in _bits(member_uniques)):
+        handout_queue.append((member_id, indices[name]))
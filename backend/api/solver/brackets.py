@@ -0,0 +1,102 @@
+"""
+Priority brackets for the Loot Solver
+
+A Member's priority is the number of items they still need on a floor, and the brackets group Members by priority.
+Within a bracket, Members keep the order they were added in, which is what decides ties between them.
+
+Every Member's priority is tracked directly, so finding or changing it doesn't need a scan through the brackets,
+and the priorities in use are kept sorted so the brackets can be walked from the highest priority down at any point.
+"""
+# stdlib
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Tuple
+
+
+class PriorityBrackets:
+
+    def __init__(self):
+        # Dicts double as ordered sets; O(1) to add or remove a member while keeping insertion order
+        self._brackets: Dict[int, Dict[int, None]] = {}
+        self._priorities: Dict[int, int] = {}
+        # The priorities that have a non-empty bracket, in ascending order
+        self._order: List[int] = []
+
+    @classmethod
+    def from_dict(cls, brackets: Dict[int, List[int]]) -> 'PriorityBrackets':
+        """
+        Build the structure from the {priority: [member ids]} dicts used around the solver
+        """
+        obj = cls()
+        for priority, members in brackets.items():
+            for member_id in members:
+                obj.add(member_id, priority)
+        return obj
+
+    def as_dict(self) -> Dict[int, List[int]]:
+        """
+        Turn the structure back into a {priority: [member ids]} dict, highest priority first
+        """
+        return {priority: list(self._brackets[priority]) for priority in reversed(self._order)}
+
+    def __contains__(self, member_id: int) -> bool:
+        return member_id in self._priorities
+
+    def __len__(self) -> int:
+        """
+        The number of non-empty brackets
+        """
+        return len(self._order)
+
+    def add(self, member_id: int, priority: int):
+        """
+        Add a Member to the end of the bracket for the given priority.
+        Priorities of 0 or lower mean nothing is needed, so the Member isn't added.
+        """
+        if priority <= 0:
+            return
+        if priority not in self._brackets:
+            self._brackets[priority] = {}
+            insort(self._order, priority)
+        self._brackets[priority][member_id] = None
+        self._priorities[member_id] = priority
+
+    def remove(self, member_id: int) -> int:
+        """
+        Remove a Member from the brackets entirely, returning the priority they had.
+        Members that aren't in any bracket are left alone and have a priority of 0.
+        """
+        priority = self._priorities.pop(member_id, 0)
+        if priority == 0:
+            return 0
+        bracket = self._brackets[priority]
+        del bracket[member_id]
+        if len(bracket) == 0:
+            del self._brackets[priority]
+            del self._order[bisect_left(self._order, priority)]
+        return priority
+
+    def demote(self, member_id: int) -> int:
+        """
+        Move a Member to the end of the bracket one priority lower, dropping them if that would be 0.
+        Returns their new priority, which stays 0 for Members that aren't in any bracket.
+        This happens when the history gave someone items they don't need, so they run out of priority before running
+        out of requirements.
+        """
+        priority = self.remove(member_id) - 1
+        self.add(member_id, priority)
+        return max(priority, 0)
+
+    def priority_of(self, member_id: int) -> int:
+        """
+        Get the priority of a Member, 0 if they aren't in any bracket
+        """
+        return self._priorities.get(member_id, 0)
+
+    def descending(self) -> Iterator[Tuple[int, int]]:
+        """
+        Iterate through (priority, member id) pairs from the highest priority bracket down, in bracket order.
+        The brackets must not be changed while iterating.
+        """
+        for priority in reversed(self._order):
+            for member_id in self._brackets[priority]:
+                yield priority, member_id
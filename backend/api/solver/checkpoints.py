@@ -0,0 +1,87 @@
+"""
+Weekly checkpoints of the state of each floor of the Loot Solver
+
+Before simulating a floor, the solver replays the whole Loot history to find where every Member's priority is now.
+Past weeks don't change unless Loot is deleted or back-dated, or a BIS List changes, so after each recorded clear the
+brackets and remaining requirements are saved as a checkpoint, and the next solve replays only what came after the
+latest checkpoint that still matches.
+
+A checkpoint matches as long as the history up to it is exactly the same as when it was taken, and the floor
+requirements and Member order it started from are the same.
+The history is checked with a running digest of the History columns; each checkpoint's digest extends the one before it
+with only the rows replayed since, so neither saving a week nor checking every saved week hashes any row twice.
+Anything else invalidates the checkpoint and all the ones after it, so replaying starts again from the last good one.
+"""
+# stdlib
+import hashlib
+import json
+from typing import Dict, List, NamedTuple, Optional
+# local
+from .history import History
+
+
+class FloorCheckpoint(NamedTuple):
+    """
+    The state of a floor after replaying every history row up to and including the day `through`
+    """
+    # Ordinal of the last day replayed
+    through: int
+    # Number of history rows replayed, and the running digest of those rows, see History.digest
+    rows: int
+    digest: str
+    clears: int
+    brackets: Dict[int, List[int]]
+    requirements: Dict[str, List[int]]
+
+
+class FloorCheckpoints:
+    """
+    Every checkpoint for one floor of one Team, oldest first.
+    Pickles as plain values, so it can be kept in the cache between solves.
+    """
+    __slots__ = ('base', 'weeks')
+
+    def __init__(self):
+        # Digest of the floor requirements and Member order the checkpoints started from
+        self.base = ''
+        self.weeks: List[FloorCheckpoint] = []
+
+    def __getstate__(self):
+        return self.base, self.weeks
+
+    def __setstate__(self, state):
+        self.base, self.weeks = state
+
+    def __len__(self) -> int:
+        return len(self.weeks)
+
+    @staticmethod
+    def base_digest(requirements: Dict[str, List[int]], id_order: List[int]) -> str:
+        return hashlib.sha256(json.dumps([requirements, id_order], sort_keys=True).encode()).hexdigest()
+
+    def resume(self, base: str, history: History) -> Optional[FloorCheckpoint]:
+        """
+        Find the latest checkpoint that still matches the given starting state and history, dropping every one after it.
+        Returns None if replaying has to start from the beginning.
+        """
+        if base != self.base:
+            self.base = base
+            self.weeks = []
+            return None
+
+        # Check oldest first, extending the digest of the last match with the rows up to the next checkpoint
+        rows, digest = 0, ''
+        for index, checkpoint in enumerate(self.weeks):
+            if not (
+                checkpoint.rows <= len(history)
+                # Anything recorded later on the same day means the checkpoint didn't see the whole day
+                and (checkpoint.rows == len(history) or history.obtained[checkpoint.rows] > checkpoint.through)
+                and history.digest(checkpoint.rows, rows, digest) == checkpoint.digest
+            ):
+                del self.weeks[index:]
+                break
+            rows, digest = checkpoint.rows, checkpoint.digest
+        return self.weeks[-1] if len(self.weeks) > 0 else None
+
+    def add(self, checkpoint: FloorCheckpoint):
+        self.weeks.append(checkpoint)
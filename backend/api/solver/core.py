@@ -0,0 +1,558 @@
+"""
+The Loot Solver algorithm
+
+Everything here works on plain values; member ids, {item: [member ids]} requirement maps and a columnar History,
+so none of it needs Django or a database.
+The LootSolver view reads a Team into SolverInputs and calls solve, and the same inputs can be solved anywhere else,
+like benchmarks or worker processes, with the same result.
+"""
+# stdlib
+import hashlib
+import json
+from bisect import bisect_right
+from collections import Counter, defaultdict, deque
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, NamedTuple, Optional, Protocol, Tuple, Union
+# local
+from .brackets import PriorityBrackets
+from .checkpoints import FloorCheckpoint, FloorCheckpoints
+from .history import History
+from .journal import RequirementJournal
+
+Requirements = Dict[str, List[int]]
+PrioBrackets = Dict[int, List[int]]
+HandoutData = Dict[str, Union[str, bool, None]]
+NonLootGear = Dict[int, List[str]]
+Payload = Dict[str, Union[List[HandoutData], HandoutData]]
+# Weeks until everything is handed out for each floor and for each Member, see project
+Projection = Dict[str, Any]
+# The checkpoints for each floor in FLOORS
+Checkpoints = Dict[str, FloorCheckpoints]
+
+FIRST_FLOOR_SLOTS = ['earrings', 'necklace', 'bracelet', 'ring']
+SECOND_FLOOR_SLOTS = ['head', 'hands', 'feet', 'tome-accessory-augment']
+THIRD_FLOOR_SLOTS = ['body', 'legs', 'tome-armour-augment', ]
+FIRST_FLOOR_TOKENS = 3
+SECOND_FLOOR_TOKENS = 3
+THIRD_FLOOR_TOKENS = 4
+
+# The implementations of the handout simulation that can be picked with the `kernel` arguments, see handout_data
+KERNELS = ['lists', 'bitset']
+DEFAULT_KERNEL = 'lists'
+
+# The floors that get simulated week by week, keyed by their name in the solver output
+FLOORS = {
+    'first_floor': (FIRST_FLOOR_SLOTS, FIRST_FLOOR_TOKENS),
+    'second_floor': (SECOND_FLOOR_SLOTS, SECOND_FLOOR_TOKENS),
+    'third_floor': (THIRD_FLOOR_SLOTS, THIRD_FLOOR_TOKENS),
+}
+
+
+class ProjectionMemo(Protocol):
+    """
+    Somewhere to keep the projection of each floor between calls to project, like a dict
+    """
+
+    def get(self, key: str) -> Optional[Tuple[int, Dict[int, int]]]:
+        ...
+
+    def __setitem__(self, key: str, value: Tuple[int, Dict[int, int]]):
+        ...
+
+
+class SolverInputs(NamedTuple):
+    """
+    Everything the Loot Solver needs to know about a Team
+    """
+    requirements: Requirements
+    history: History
+    id_order: List[int]
+    non_loot_gear: NonLootGear
+    greedy: bool
+    tier_id: int
+
+    def fingerprint(self) -> str:
+        """
+        Hash the inputs.
+        Any two sets of inputs with the same fingerprint produce the same output, no matter which Team they came from.
+        """
+        inputs = {
+            'greedy': self.greedy,
+            'history': [[entry.obtained.isoformat(), entry.item, entry.member_id, entry.greed] for entry in self.history],
+            'id_ordering': self.id_order,
+            'non_loot_gear': self.non_loot_gear,
+            'requirements': self.requirements,
+            'team_size': len(self.id_order),
+            'tier': self.tier_id,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def untimed(name: str) -> ContextManager:
+    """
+    The default for `phase` arguments, for when nothing is timing the solver
+    """
+    return nullcontext()
+
+
+def solve(
+    inputs: SolverInputs,
+    checkpoints: Optional[Checkpoints] = None,
+    kernel: str = DEFAULT_KERNEL,
+    phase: Callable[[str], ContextManager] = untimed,
+) -> Payload:
+    """
+    Run the full Loot Solver, simulating each of the first three floors and counting what is left from the fourth.
+    If checkpoints are given, the history is only replayed from the latest one that matches, and new ones are added.
+    Each floor runs inside `phase(floor name)`, so callers can time them.
+    """
+    payload: Payload = {}
+    for floor in FLOORS:
+        with phase(floor):
+            payload[floor] = floor_handouts(
+                floor,
+                inputs.requirements,
+                inputs.history,
+                inputs.id_order,
+                inputs.non_loot_gear,
+                inputs.greedy,
+                None if checkpoints is None else checkpoints.setdefault(floor, FloorCheckpoints()),
+                kernel,
+            )
+    with phase('fourth_floor'):
+        payload['fourth_floor'] = fourth_floor_data(inputs.history, len(inputs.id_order), inputs.non_loot_gear)
+    return payload
+
+
+def floor_handouts(
+    floor: str,
+    requirements: Requirements,
+    history: History,
+    id_order: List[int],
+    non_loot_gear: NonLootGear,
+    greedy: bool = False,
+    checkpoints: Optional[FloorCheckpoints] = None,
+    kernel: str = DEFAULT_KERNEL,
+) -> List[HandoutData]:
+    """
+    Simulate handing out the loot for one of the floors in FLOORS
+    """
+    slots, tokens = FLOORS[floor]
+    weeks, prio_brackets, floor_requirements = floor_data(requirements, history, slots, id_order, non_loot_gear, checkpoints)
+    return handout_data(slots, floor_requirements, prio_brackets, tokens, weeks, greedy, kernel)
+
+
+def project(
+    inputs: SolverInputs,
+    checkpoints: Optional[Checkpoints] = None,
+    kernel: str = DEFAULT_KERNEL,
+    memo: Optional[ProjectionMemo] = None,
+) -> Projection:
+    """
+    Run every floor forward until everything still needed has been handed out, including the augments bought with
+    tokens and the weapons from the fourth floor, and work out how many more weeks each Member takes to finish.
+    Weeks count from the next clear, and 0 means the Member has nothing left to get from that floor.
+
+    Each floor's result only depends on the state its history was replayed to, so if `memo` is given the result is
+    stored in it against a digest of that state, and reused by any later projection that reaches the same state.
+    """
+    floors: Dict[str, int] = {}
+    member_weeks: Dict[int, Dict[str, int]] = {member_id: {} for member_id in inputs.id_order}
+    for floor, (slots, tokens) in FLOORS.items():
+        clears, prio_brackets, floor_requirements = floor_data(
+            inputs.requirements,
+            inputs.history,
+            slots,
+            inputs.id_order,
+            inputs.non_loot_gear,
+            None if checkpoints is None else checkpoints.setdefault(floor, FloorCheckpoints()),
+        )
+        state = [floor, clears, sorted(prio_brackets.items()), floor_requirements, inputs.greedy]
+        key = hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+        result = None if memo is None else memo.get(key)
+        if result is None:
+            finished: Dict[int, int] = {}
+            weeks = len(handout_data(slots, floor_requirements, prio_brackets, tokens, clears, inputs.greedy, kernel, finished))
+            result = (weeks, {member_id: week - clears for member_id, week in finished.items()})
+            if memo is not None:
+                memo[key] = result
+
+        floors[floor], finished_weeks = result
+        for member_id, weeks in member_weeks.items():
+            weeks[floor] = finished_weeks.get(member_id, 0)
+
+    # One weapon drops from the fourth floor each week, going to whoever is highest in the sort order that still needs one
+    weapon_owners = {entry.member_id for entry in inputs.history if entry.item == 'mainhand' and not entry.greed}
+    weapon_owners.update(member_id for member_id, gear in inputs.non_loot_gear.items() if 'mainhand' in gear)
+    weapon_needs = set(inputs.requirements.get('mainhand', [])) - weapon_owners
+    weapon_order = [member_id for member_id in inputs.id_order if member_id in weapon_needs]
+    floors['fourth_floor'] = len(weapon_order)
+    for member_id, weeks in member_weeks.items():
+        weeks['fourth_floor'] = weapon_order.index(member_id) + 1 if member_id in weapon_needs else 0
+
+    return {
+        'weeks_to_finish': max(floors.values()),
+        'floors': floors,
+        'members': [
+            {'member_id': member_id, 'weeks': weeks, 'finished_week': max(weeks.values())}
+            for member_id, weeks in member_weeks.items()
+        ],
+    }
+
+
+def output_slot_name(slot: str) -> str:
+    return slot.replace('-', ' ').title()
+
+
+def generate_priority_brackets(requirements: Requirements, id_ordering: List[int]) -> PrioBrackets:
+    """
+    Given a requirements map, generate a new dictionary that gives priority brackets for items.
+    This will be used by the individual floors, which will want to use it on subsets of the overall requirements map.
+    """
+    # Firstly, turn data into map of ids to how many items they need
+    items_needed = defaultdict(int)
+    for ids in requirements.values():
+        for id in ids:
+            items_needed[id] += 1
+
+    # Turn this into our prio bracket: name list with names sorted in required order
+    prio_brackets = defaultdict(list)
+    rank = {id: index for index, id in enumerate(id_ordering)}
+    ordered_ids = sorted(items_needed, key=rank.__getitem__)
+    for ids in ordered_ids:
+        needed = items_needed[ids]
+        prio_brackets[needed].append(ids)
+
+    return dict(prio_brackets)
+
+
+def non_loot_gear(member_ids: Iterable[int], history: History, obtained: Iterable[Tuple[int, str]]) -> NonLootGear:
+    """
+    Work out the items each Member got other than through drops, given every (member id, item) they have already
+    obtained one way or another, by removing the ones recorded in the Loot history
+    """
+    loot_gear = defaultdict(list)
+    for member_id, item in history.items_by_member():
+        loot_gear[member_id].append(item)
+
+    obtained_gear = defaultdict(list)
+    for member_id, item in obtained:
+        obtained_gear[member_id].append(item)
+
+    gear: NonLootGear = {}
+    for member_id in member_ids:
+        member_bis_gear = obtained_gear[member_id]
+
+        # Remove the stuff they got through the history
+        for history_item in loot_gear[member_id]:
+            try:
+                member_bis_gear.remove(history_item)
+            except ValueError:
+                # They haven't updated their list ;-;
+                pass
+        gear[member_id] = member_bis_gear
+    return gear
+
+
+def floor_data(
+    requirements: Requirements,
+    history: History,
+    slots: List[str],
+    id_order: List[int],
+    non_loot_gear: NonLootGear,
+    checkpoints: Optional[FloorCheckpoints] = None,
+) -> Tuple[int, PrioBrackets, Requirements]:
+    """
+    Turn a requirements map and history into the priority bracket information, along with how many clears have already been recorded for the fight.
+    Also generate and return the updated Requirements from the Loot History.
+    With checkpoints, replaying the history starts from the latest one that matches, and each newly replayed clear adds one.
+    """
+    # Limit floor requirements to the items that were important, then remove from this list as we update the prios below
+    floor_requirements = {
+        slot: list(requirements.get(slot, []))
+        for slot in slots
+    }
+    start = None
+    if checkpoints is not None:
+        start = checkpoints.resume(FloorCheckpoints.base_digest(floor_requirements, id_order), history)
+
+    if start is None:
+        prio_brackets = PriorityBrackets.from_dict(generate_priority_brackets(floor_requirements, id_order))
+        clears = 0
+        first_row = 0
+        digest = ''
+    else:
+        prio_brackets = PriorityBrackets.from_dict(start.brackets)
+        floor_requirements = {slot: list(members) for slot, members in start.requirements.items()}
+        clears = start.clears
+        first_row = start.rows
+        digest = start.digest
+
+    digested_rows = first_row
+
+    # Sim through the existing clear data and update prio brackets with how things have evolved in the past
+    history_data: Dict[int, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+    for index in history.indices(floor_requirements, first_row):
+        # Use a list so we can potentially handle split clears?
+        history_data[history.obtained[index]][history.item(index)].append(history.member_ids[index])
+
+    for obtained in history_data:
+        for slot in slots:
+            for member_id in history_data[obtained].get(slot, []):
+                # move the receiver of the item down one bracket, making a new one if you have to
+                _demote_for_item(prio_brackets, floor_requirements, member_id, slot)
+        clears += 1
+
+        if checkpoints is not None:
+            # Extend the digest of the previous checkpoint with only the rows replayed since
+            rows = bisect_right(history.obtained, obtained)
+            digest = history.digest(rows, digested_rows, digest)
+            digested_rows = rows
+            checkpoints.add(FloorCheckpoint(
+                through=obtained,
+                rows=rows,
+                digest=digest,
+                clears=clears,
+                brackets=prio_brackets.as_dict(),
+                requirements={slot: list(members) for slot, members in floor_requirements.items()},
+            ))
+
+    # Also check loot not tracked in the history
+    for member_id in id_order:
+        # Go through the slots, if they're in the requirements map, remove the user from them and move them down a prio
+        for non_loot_item in non_loot_gear.get(member_id, []):
+            if non_loot_item not in floor_requirements:
+                continue
+            _demote_for_item(prio_brackets, floor_requirements, member_id, non_loot_item)
+
+    return clears, prio_brackets.as_dict(), floor_requirements
+
+
+def _demote_for_item(prio_brackets: PriorityBrackets, requirements: Requirements, member_id: int, slot: str):
+    """
+    Record that a member has received an item outside of the simulation.
+    Members that are no longer in the prio brackets don't need anything else, so they are left alone.
+    """
+    if member_id not in prio_brackets:
+        return
+    try:
+        requirements[slot].remove(member_id)
+    except ValueError:
+        pass
+    prio_brackets.demote(member_id)
+
+
+def fourth_floor_data(history: History, team_size: int, non_loot_gear: NonLootGear) -> HandoutData:
+    """
+    Count what is left to hand out from the fourth floor.
+    Different from how the others are handled, because we just check how many people already have bis weapon, and also how many mounts have been obtained.
+    """
+    weapons_obtained = history.count('mainhand', greed=False)
+    mounts_obtained = history.count('mount')
+    non_loot_weapons = len([member_id for member_id in non_loot_gear if 'mainhand' in non_loot_gear[member_id]])
+    return {
+        'weapons': team_size - weapons_obtained - non_loot_weapons,
+        'mounts': team_size - mounts_obtained,
+    }
+
+
+def handout_data(
+    slots: List[str],
+    requirements: Requirements,
+    prio_brackets: PrioBrackets,
+    weeks_per_token: int,
+    weeks: int,
+    greedy: bool = False,
+    kernel: str = DEFAULT_KERNEL,
+    finished: Optional[Dict[int, int]] = None,
+) -> List[HandoutData]:
+    """
+    Simulate handing out a floor's loot week by week, returning who gets what each week.
+    `kernel` picks the implementation from KERNELS; they all give the same result.
+    If `finished` is given, the week each Member gets the last thing they need is stored in it.
+    """
+    if kernel == 'bitset':
+        # Imported here as the bitset kernel uses the helpers in this module
+        from .bitset import simulate_handouts
+        return simulate_handouts(slots, requirements, PriorityBrackets.from_dict(prio_brackets), weeks_per_token, weeks, greedy, finished)
+    if kernel != 'lists':
+        raise ValueError(f'Unknown Loot Solver kernel {kernel!r}, expected one of {KERNELS}')
+
+    # Handouts are removed from the passed requirements in place and undone afterwards, so the caller's lists are
+    # left untouched for Sentry debugging without having to copy them. The passed brackets are left untouched too
+    with RequirementJournal(requirements) as journal:
+        return _simulate_handouts(slots, journal, PriorityBrackets.from_dict(prio_brackets), weeks_per_token, weeks, greedy, finished)
+
+
+def _simulate_handouts(
+    slots: List[str],
+    journal: RequirementJournal,
+    prio_brackets: PriorityBrackets,
+    weeks_per_token: int,
+    weeks: int,
+    greedy: bool,
+    finished: Optional[Dict[int, int]] = None,
+) -> List[HandoutData]:
+    """
+    Run the weekly handout simulation, handing out items through the journal so they can be undone by the caller
+    """
+    handouts = []
+    requirements = journal.requirements
+    remove_slots = slots
+    if 'augment' in slots[-1]:
+        remove_slots = [slots[-1]]
+
+    while len(prio_brackets) > 0:
+        weeks += 1
+        week_data = {}
+
+        # Check what items we no longer need this week and add them to the handout info
+        for slot, needs in requirements.items():
+            if len(needs) == 0:
+                week_data[output_slot_name(slot)] = None
+
+        # Build up a map of who is needed to sort every required item for the week
+        required_slots_for_week = set(slot for slot in requirements if output_slot_name(slot) not in week_data)
+        needed_item_count = len(required_slots_for_week)
+
+        # Loop through the people in priority order, populating a map of who needs what until all of the required items for the week are covered
+        # This ensures each item is given to the person with the highest priority of getting it
+        potential_loot_members: Dict[int, List[str]] = {}
+        # Skip repeated single item lists
+        single_item_entries = set()
+        for _, member_id in prio_brackets.descending():
+            required = journal.slots_for(member_id)
+
+            if len(required) == 1:
+                if required[0] in single_item_entries:
+                    continue
+                single_item_entries.add(required[0])
+
+            potential_loot_members[member_id] = required
+            # Subtract from the set of things needed this week
+            required_slots_for_week -= set(required)
+
+            # Check that we have enough potential members to cover each available item
+            if len(potential_loot_members) >= needed_item_count and len(required_slots_for_week) == 0:
+                break
+
+        # If we have less characters than items, we can re-add people back to the dictionary after we remove them to cycle around properly
+        re_insert = len(potential_loot_members) < needed_item_count
+
+        # At this point, we have a mapping of potential member_ids to the items they still need this week.
+        # It has the minimum required amount of people such that every Need item can be handed out to someone.
+        # Now we determine who actually gets what
+        # There is a 3 step priority system to sorting out handouts;
+        # 1 - Anyone who has only one potential item
+        # 2 - Anyone who is the only person who needs a given item
+        # 3 - Go down the list from highest to lowest priority and just give them one of the needed items
+        # Whenever we give someone an item, we remove them from the potential list, remove their item from everyone elses'
+        # If anyone gets reduced to 1 item left, they get added to the queue
+        handout_queue = deque()
+        # How many potential members still have each item in their list, kept up to date as the lists shrink,
+        # so finding the items only one member can take doesn't mean merging everyone else's lists each time
+        holders = Counter(item for member_items in potential_loot_members.values() for item in member_items)
+
+        # Handle the two special cases first
+        # 1 - Anyone who only has 1 item they can get
+        for member_id, member_items in potential_loot_members.items():
+            if len(member_items) == 1:
+                handout_queue.append((member_id, member_items[0]))
+
+        # 2 - Anyone who has a unique item in their list, in name order so the result doesn't depend on set ordering
+        for member_id, member_items in potential_loot_members.items():
+            uniques = {unique_item for unique_item in set(member_items) if holders[unique_item] == 1}
+            for unique_item in sorted(uniques):
+                handout_queue.append((member_id, unique_item))
+
+        # Loop until we get all the requirements
+        while len(week_data) < len(requirements) and (len(potential_loot_members) > 0 or len(handout_queue) > 0):
+            # Check if we've already had someone in the handout queue, if not we get the first id and item
+            if len(handout_queue) > 0:
+                member_id, item = handout_queue.popleft()
+            else:
+                member_id = next(iter(potential_loot_members))
+                member_items = potential_loot_members.get(member_id, [])
+                if len(member_items) == 0:
+                    # Remove the member and re-loop
+                    potential_loot_members.pop(member_id, None)
+                    continue
+                item = member_items[0]
+                if output_slot_name(item) in week_data:
+                    # Already handed out or skipped this week, drop it so the same item isn't picked for this member forever
+                    holders[member_items.pop(0)] -= 1
+                    continue
+
+            # Attempt to give this item to the chosen member, if it's not already in the week's data
+            output_item_name = output_slot_name(item)
+            if output_item_name in week_data:
+                continue
+
+            # Check if we're already at the end of needing to assign loot
+            member_items_left = prio_brackets.priority_of(member_id)
+            if greedy and weeks % weeks_per_token == 0 and item in remove_slots and member_items_left <= 1:
+                week_data[output_item_name] = None
+                continue
+
+            # At this point, the item is guaranteed to go to this person
+            week_data[output_item_name] = member_id
+            journal.remove(item, member_id)
+
+            # Reduce the requirement number of the person and add them to the end of the list
+            if prio_brackets.demote(member_id) == 0 and finished is not None:
+                finished[member_id] = weeks
+
+            # Now we need to remove the member_id from potentials and remove the item from the popped list in case we need to re-insert
+            removed = potential_loot_members.pop(member_id, [])
+            holders.subtract(removed)
+            try:
+                removed.remove(item)
+            except ValueError:
+                pass
+
+            # Now remove the item from everyone else, and check for any now-unique items
+            for other_member_id, other_member_items in potential_loot_members.items():
+                try:
+                    other_member_items.remove(item)
+                    holders[item] -= 1
+                    if len(other_member_items) == 1:
+                        # Put the person and their item into the queue
+                        handout_queue.append((other_member_id, other_member_items[0]))
+                except ValueError:
+                    # If the item isn't in the list, that's fine
+                    pass
+
+                # Also recalc if someone now has a unique item that they should get
+                uniques = {unique_item for unique_item in set(other_member_items) if holders[unique_item] == 1}
+                for unique_item in sorted(uniques):
+                    handout_queue.append((other_member_id, unique_item))
+
+            # Then do some checking if we need to re_insert the popped member
+            if re_insert:
+                # Put them back in the dictionary because dictionary keys are ordered by insertion time
+                potential_loot_members[member_id] = removed
+                holders.update(removed)
+
+        # Add the week data to the handouts list
+        handouts.append(week_data)
+
+        # Lastly, if weeks % token_count == 0, reduce everyone's requirement by 1 if they can buy an item
+        if weeks % weeks_per_token == 0:
+            # Find the members that can buy something and track what they can buy
+            member_purchases = {}
+            for _, member_id in prio_brackets.descending():
+                for slot in remove_slots:
+                    if journal.needs(slot, member_id):
+                        member_purchases[member_id] = slot
+                        break
+
+            for purchaser_id, slot in member_purchases.items():
+                # Remove the purchaser_id from the item requirements, reduce their priority by one
+                journal.remove(slot, purchaser_id)
+                if prio_brackets.demote(purchaser_id) == 0 and finished is not None:
+                    finished[purchaser_id] = weeks
+            week_data['token'] = True
+        else:
+            week_data['token'] = False
+
+    return handouts
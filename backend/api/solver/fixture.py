@@ -0,0 +1,69 @@
+"""
+JSON fixtures of the Loot Solver's inputs
+
+A fixture holds everything the solver reads for a Team, so a slow solve seen in production can be replayed locally
+without a database, see the solver_replay management command.
+Member ids are replaced with 1, 2, 3... in the Team's solver order, so a fixture says nothing about who the Team is.
+"""
+# stdlib
+from datetime import date
+from typing import Any, Dict, Optional
+# local
+from .core import SolverInputs
+from .history import History, NO_MEMBER
+
+VERSION = 1
+
+
+def dump(inputs: SolverInputs, solver_sort_overrides: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Turn solver inputs into a JSON-safe fixture, anonymizing the Member ids.
+    The Team's sort overrides are kept for reference, the id order they produced is already part of the inputs.
+    """
+    anonymous = {NO_MEMBER: NO_MEMBER}
+    for member_id in inputs.id_order:
+        anonymous.setdefault(member_id, len(anonymous))
+
+    def anonymize(member_id: int) -> int:
+        # Loot can still belong to Members that are no longer in the solver order
+        return anonymous.setdefault(member_id, len(anonymous))
+
+    return {
+        'version': VERSION,
+        'greedy': inputs.greedy,
+        'tier_id': inputs.tier_id,
+        'id_order': [anonymize(member_id) for member_id in inputs.id_order],
+        'requirements': {
+            item: [anonymize(member_id) for member_id in members]
+            for item, members in inputs.requirements.items()
+        },
+        'history': [
+            [entry.obtained.isoformat(), entry.item, anonymize(entry.member_id), entry.greed]
+            for entry in inputs.history
+        ],
+        'non_loot_gear': {
+            str(anonymize(member_id)): items
+            for member_id, items in inputs.non_loot_gear.items()
+        },
+        'solver_sort_overrides': solver_sort_overrides or {},
+    }
+
+
+def load(fixture: Dict[str, Any]) -> SolverInputs:
+    """
+    Read solver inputs back out of a fixture made by `dump`
+    """
+    if fixture.get('version') != VERSION:
+        raise ValueError(f'Unsupported solver fixture version {fixture.get("version")!r}, expected {VERSION}.')
+
+    return SolverInputs(
+        requirements={item: list(members) for item, members in fixture['requirements'].items()},
+        history=History.from_rows(
+            (date.fromisoformat(obtained), item, member_id, greed)
+            for obtained, item, member_id, greed in fixture['history']
+        ),
+        id_order=list(fixture['id_order']),
+        non_loot_gear={int(member_id): items for member_id, items in fixture['non_loot_gear'].items()},
+        greedy=fixture['greedy'],
+        tier_id=fixture['tier_id'],
+    )
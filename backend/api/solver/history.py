@@ -0,0 +1,123 @@
+"""
+Columnar Loot history for the Loot Solver
+
+A Team's history is read once and stored as parallel columns; the date each item was obtained as an ordinal, a code for
+the item, the id of the Member that got it, and whether it was greed.
+Every part of the solver reads from the same columns, picking out the rows for a floor or counting an item without
+going back to the database.
+"""
+# stdlib
+import hashlib
+from array import array
+from datetime import date
+from typing import Collection, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Stored in place of the Member for Loot whose Member has since left the Team
+NO_MEMBER = 0
+
+
+class HistoryEntry(NamedTuple):
+    """
+    A single piece of Loot a Team has recorded
+    """
+    obtained: date
+    item: str
+    member_id: int
+    greed: bool
+
+
+class History:
+    """
+    Loot history in the order it was obtained, with one column per field
+    """
+    __slots__ = ('obtained', 'item_codes', 'member_ids', 'greed', 'item_names')
+
+    def __init__(self):
+        self.obtained = array('l')
+        self.item_codes = array('H')
+        self.member_ids = array('q')
+        self.greed = bytearray()
+        # The item name for each code, in the order each item was first seen
+        self.item_names: List[str] = []
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[date, str, int, bool]]) -> 'History':
+        """
+        Build the columns from (obtained, item, member id, greed) rows, like HistoryEntry tuples or a values_list.
+        Rows are sorted by the date they were obtained, keeping the given order within a day.
+        """
+        history = cls()
+        codes: Dict[str, int] = {}
+        for obtained, item, member_id, greed in sorted(rows, key=lambda row: row[0]):
+            if item not in codes:
+                codes[item] = len(history.item_names)
+                history.item_names.append(item)
+            history.obtained.append(obtained.toordinal())
+            history.item_codes.append(codes[item])
+            history.member_ids.append(member_id or NO_MEMBER)
+            history.greed.append(bool(greed))
+        return history
+
+    def __len__(self) -> int:
+        return len(self.obtained)
+
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        for index in range(len(self)):
+            yield self.entry(index)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, History):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def entry(self, index: int) -> HistoryEntry:
+        return HistoryEntry(
+            date.fromordinal(self.obtained[index]),
+            self.item_names[self.item_codes[index]],
+            self.member_ids[index],
+            bool(self.greed[index]),
+        )
+
+    def _codes(self, items: Collection[str]) -> set:
+        return {code for code, item in enumerate(self.item_names) if item in items}
+
+    def indices(self, items: Collection[str], start: int = 0) -> List[int]:
+        """
+        Get the positions of every row for any of the given items, in the order they were obtained, from `start` onwards
+        """
+        codes = self._codes(items)
+        return [index for index, code in enumerate(self.item_codes[start:], start) if code in codes]
+
+    def count(self, item: str, greed: Optional[bool] = None) -> int:
+        """
+        Count the rows for an item, optionally only the ones that were or weren't greed
+        """
+        codes = self._codes({item})
+        return sum(
+            1 for code, was_greed in zip(self.item_codes, self.greed)
+            if code in codes and (greed is None or bool(was_greed) == greed)
+        )
+
+    def digest(self, rows: int, start: int = 0, previous: str = '') -> str:
+        """
+        Hash the rows from `start` up to `rows` on top of `previous`, the digest of every row before `start`.
+        Chaining the digests means a saved position in the history can be checked, or a later one saved, by hashing only
+        the rows since the position before it.
+        """
+        data = hashlib.sha256(previous.encode())
+        for column in (self.obtained, self.item_codes, self.member_ids):
+            data.update(column[start:rows].tobytes())
+        data.update(self.greed[start:rows])
+        # Earlier rows are covered by `previous`, so only the names of the items in these rows are needed
+        data.update('\n'.join(self.item_names[code] for code in sorted(set(self.item_codes[start:rows]))).encode())
+        return data.hexdigest()
+
+    def item(self, index: int) -> str:
+        return self.item_names[self.item_codes[index]]
+
+    def items_by_member(self) -> Iterator[Tuple[int, str]]:
+        """
+        Iterate through (member id, item) for every row
+        """
+        for member_id, code in zip(self.member_ids, self.item_codes):
+            yield member_id, self.item_names[code]
@@ -0,0 +1,49 @@
+"""
+Undoable requirements for the Loot Solver
+
+The handout simulation hands items out by removing Members from the requirements map it was given.
+Rather than copying the whole map before every simulation, the removals are made in place and journaled, and undone in
+reverse order once the simulation finishes, leaving the caller's lists exactly as they were.
+"""
+# stdlib
+from typing import Dict, List, Tuple
+
+
+class RequirementJournal:
+
+    def __init__(self, requirements: Dict[str, List[int]]):
+        self.requirements = requirements
+        # (slot, index, member id) for every removal, so they can be put back where they came from
+        self._removals: List[Tuple[str, int, int]] = []
+
+    def __enter__(self) -> 'RequirementJournal':
+        return self
+
+    def __exit__(self, *args):
+        self.undo()
+
+    def needs(self, slot: str, member_id: int) -> bool:
+        return member_id in self.requirements[slot]
+
+    def slots_for(self, member_id: int) -> List[str]:
+        """
+        Get the slots a Member still needs, in requirements order
+        """
+        return [slot for slot, members in self.requirements.items() if member_id in members]
+
+    def remove(self, slot: str, member_id: int):
+        """
+        Remove a Member from the requirements of a slot, raising ValueError if they weren't in it
+        """
+        members = self.requirements[slot]
+        index = members.index(member_id)
+        del members[index]
+        self._removals.append((slot, index, member_id))
+
+    def undo(self):
+        """
+        Put back every removal made so far, most recent first
+        """
+        while self._removals:
+            slot, index, member_id = self._removals.pop()
+            self.requirements[slot].insert(index, member_id)
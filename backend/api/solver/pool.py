@@ -0,0 +1,51 @@
+"""
+Running several Loot Solver simulations at once
+
+The simulations are independent and CPU bound, so they are spread over a pool of worker processes.
+SolverInputs and the payloads are plain values, which is all that has to be sent between processes.
+The pool is started the first time it is needed and reused after that.
+
+Workers are started from a forkserver rather than forked from the web worker, as forking a process that holds database
+connections and threads isn't safe. The forkserver only imports the solver, which doesn't touch Django.
+"""
+# stdlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import List, Optional
+# local
+from .core import DEFAULT_KERNEL, Payload, solve, SolverInputs
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_processes = 0
+
+
+def _get_executor(processes: int) -> ProcessPoolExecutor:
+    global _executor, _executor_processes
+    if _executor is None or _executor_processes != processes:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        _executor = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+        _executor_processes = processes
+    return _executor
+
+
+def solve_many(inputs: List[SolverInputs], processes: int, kernel: str = DEFAULT_KERNEL) -> List[Payload]:
+    """
+    Solve every set of inputs with the given kernel, returning the payloads in the same order.
+    Runs in this process when there's only one set of inputs, or fewer than 2 processes are allowed.
+    """
+    global _executor
+    solve_one = partial(solve, kernel=kernel)
+    if processes < 2 or len(inputs) < 2:
+        return [solve_one(item) for item in inputs]
+
+    try:
+        return list(_get_executor(processes).map(solve_one, inputs))
+    except BrokenProcessPool:
+        # A worker died, start a fresh pool next time and don't lose this request
+        _executor = None
+        return [solve_one(item) for item in inputs]
@@ -0,0 +1,189 @@
+"""
+Synthetic Teams for benchmarking the Loot Solver
+
+Builds SolverInputs that look like real Teams; a mix of jobs deciding the solver order, BIS Lists that mix raid and
+tome gear, and a Loot history of weekly clears where some weeks are split across two clears.
+It can also fill the gear of BIS Lists at random, for benchmarking how requirements are read from them.
+Everything is generated from a seeded Random, so the same arguments always give the same Team.
+"""
+# stdlib
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Sequence, Tuple, TypeVar
+# local
+from .core import FLOORS, NonLootGear, Requirements, SolverInputs
+from .history import History, HistoryEntry
+
+# Same order as gear_masks.SLOTS, which is the order a Member's requirements are read in
+SLOTS = [
+    'mainhand',
+    'offhand',
+    'head',
+    'body',
+    'hands',
+    'legs',
+    'feet',
+    'earrings',
+    'necklace',
+    'bracelet',
+    'left_ring',
+    'right_ring',
+]
+ARMOUR = {'head', 'body', 'hands', 'legs', 'feet'}
+ACCESSORIES = {'earrings', 'necklace', 'bracelet', 'left_ring', 'right_ring'}
+
+# Roles in the order the solver sorts them by default
+ROLES = ['dps', 'tank', 'heal']
+# The roles of a standard party of 8, repeated to fill bigger Teams
+STANDARD_PARTY = ['tank', 'tank', 'heal', 'heal', 'dps', 'dps', 'dps', 'dps']
+JOB_MIXES = ['standard', 'random']
+
+START = date(2024, 1, 2)
+
+Gear = TypeVar('Gear')
+
+
+def _id_order(member_ids: List[int], job_mix: str, rng: random.Random) -> List[int]:
+    """
+    Give each Member a role from the job mix, then sort them the way the solver does by default
+    """
+    if job_mix == 'standard':
+        roles = [STANDARD_PARTY[index % len(STANDARD_PARTY)] for index in range(len(member_ids))]
+        rng.shuffle(roles)
+    else:
+        roles = [rng.choice(ROLES) for _ in member_ids]
+    return [member_id for _, member_id in sorted(zip(roles, member_ids), key=lambda pair: ROLES.index(pair[0]))]
+
+
+def _requirements(member_ids: List[int], raid_share: float, rng: random.Random) -> Requirements:
+    """
+    Fill a BIS List for each Member, where each slot is from the raid with the given chance and from tomes otherwise.
+    Raid slots need the item itself, and tome armour and accessories need an augment.
+    """
+    requirements: Requirements = {}
+    for member_id in member_ids:
+        raid_ring = False
+        for slot in SLOTS:
+            if rng.random() < raid_share:
+                if 'ring' in slot:
+                    # Only one raid ring drops for either slot
+                    if raid_ring:
+                        continue
+                    raid_ring = True
+                    item = 'ring'
+                else:
+                    item = slot
+            elif slot in ARMOUR:
+                item = 'tome-armour-augment'
+            elif slot in ACCESSORIES:
+                item = 'tome-accessory-augment'
+            else:
+                continue
+            requirements.setdefault(item, []).append(member_id)
+    return requirements
+
+
+def _history(requirements: Requirements, member_ids: List[int], weeks: int, split_chance: float, rng: random.Random) -> History:
+    """
+    Record a clear of every floor each week, handing each drop to a random Member that still needs it.
+    Split weeks record a second clear the day after, dropping another set of loot.
+    """
+    outstanding = {item: list(members) for item, members in requirements.items()}
+    history = []
+    for week in range(weeks):
+        clears = 2 if rng.random() < split_chance else 1
+        for clear in range(clears):
+            obtained = START + timedelta(weeks=week, days=clear)
+            for slots, _ in FLOORS.values():
+                for item in slots:
+                    candidates = outstanding.get(item, [])
+                    if len(candidates) == 0:
+                        continue
+                    member_id = candidates.pop(rng.randrange(len(candidates)))
+                    history.append(HistoryEntry(obtained, item, member_id, False))
+
+            # The fourth floor drops a weapon and a mount, which anyone can take
+            history.append(HistoryEntry(obtained, 'mainhand', rng.choice(member_ids), rng.random() < 0.2))
+            history.append(HistoryEntry(obtained, 'mount', rng.choice(member_ids), False))
+    return History.from_rows(history)
+
+
+def _non_loot_gear(requirements: Requirements, history: History, weeks: int, rng: random.Random) -> NonLootGear:
+    """
+    Members also buy some of what they need with tomes, roughly one item every few weeks each
+    """
+    received = {(item, member_id) for member_id, item in history.items_by_member()}
+    gear: NonLootGear = {}
+    for item, members in requirements.items():
+        for member_id in members:
+            if (item, member_id) not in received and rng.random() < min(weeks * 0.03, 0.5):
+                gear.setdefault(member_id, []).append(item)
+    return gear
+
+
+def team(
+    size: int,
+    weeks: int,
+    rng: random.Random,
+    job_mix: str = 'standard',
+    raid_share: float = 0.5,
+    split_chance: float = 0.2,
+    greedy: bool = False,
+) -> SolverInputs:
+    """
+    Build the solver inputs for a synthetic Team of the given size, with the given number of weeks of Loot history
+    """
+    member_ids = list(range(1, size + 1))
+    id_order = _id_order(member_ids, job_mix, rng)
+    requirements = _requirements(member_ids, raid_share, rng)
+    history = _history(requirements, member_ids, weeks, split_chance, rng)
+    return SolverInputs(
+        requirements=requirements,
+        history=history,
+        id_order=id_order,
+        non_loot_gear=_non_loot_gear(requirements, history, weeks, rng),
+        greedy=greedy,
+        tier_id=0,
+    )
+
+
+def teams(sizes: List[int], weeks: List[int], count: int, seed: int) -> Dict[Tuple[int, int], List[SolverInputs]]:
+    """
+    Build `count` Teams for every combination of size and weeks of history, cycling through the job mixes, raid and
+    tome shares and greed settings so every combination sees a spread of them.
+    Each combination has its own Random, so its Teams don't change when other combinations are added or removed.
+    """
+    generated = {}
+    for size in sizes:
+        for week_count in weeks:
+            rng = random.Random(f'{seed}:{size}:{week_count}')
+            generated[size, week_count] = [
+                team(
+                    size,
+                    week_count,
+                    rng,
+                    job_mix=JOB_MIXES[index % len(JOB_MIXES)],
+                    raid_share=[0.3, 0.5, 0.7][index % 3],
+                    greedy=index % 2 == 1,
+                )
+                for index in range(count)
+            ]
+    return generated
+
+
+def bis_lists(size: int, lists: int, gear: Sequence[Gear], rng: random.Random) -> List[List[Dict[str, Gear]]]:
+    """
+    Fill the given number of BIS Lists for each Member of a Team of the given size, picking the BIS and current gear of
+    every slot at random. Each list is a dict of `bis_<slot>` and `current_<slot>` values to build a BIS List from.
+    """
+    team_lists = []
+    for _ in range(size):
+        member_lists = []
+        for _ in range(lists):
+            fields = {}
+            for slot in SLOTS:
+                fields[f'bis_{slot}'] = rng.choice(gear)
+                fields[f'current_{slot}'] = rng.choice(gear)
+            member_lists.append(fields)
+        team_lists.append(member_lists)
+    return team_lists
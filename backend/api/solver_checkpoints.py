@@ -0,0 +1,32 @@
+"""
+Loot Solver checkpoints for each Team, see api.solver.checkpoints
+
+Checkpoints are kept in the default cache, like the response cache, so losing them only means the next solve replays
+the whole history again.
+A checkpoint checks itself against the history and BIS Lists it's used with, so deleting Loot or changing a BIS List
+doesn't need to clear anything here; the checkpoints from that point on are dropped by the next solve.
+"""
+# stdlib
+from typing import Any
+# lib
+from django.conf import settings
+from django.core.cache import cache
+# local
+from api.solver.core import Checkpoints
+
+PREFIX = 'solver-checkpoints'
+
+
+def _key(team_id: Any) -> str:
+    return f'{PREFIX}:{team_id}'
+
+
+def get(team_id: Any) -> Checkpoints:
+    """
+    Get the checkpoints for each floor of a Team's solver, or an empty dict if there aren't any yet
+    """
+    return cache.get(_key(team_id)) or {}
+
+
+def save(team_id: Any, checkpoints: Checkpoints):
+    cache.set(_key(team_id), checkpoints, timeout=settings.LOOT_CHECKPOINT_TTL)
@@ -0,0 +1,60 @@
+"""
+State of Loot Solver runs happening in the background
+
+A background run is a job identified by the fingerprint of the solver inputs it was started for, stored per Team.
+Asking for the same Team and inputs again while a job exists returns that job instead of starting another one.
+Finished jobs keep their payload so they can be polled until they expire.
+If the Team's inputs change before a job runs, it is marked stale instead of storing a payload for different inputs.
+
+Uses the default cache, like the response cache.
+"""
+# stdlib
+from typing import Any, Dict, Optional
+# lib
+from django.conf import settings
+from django.core.cache import cache
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+STALE = 'stale'
+STATUSES = [PENDING, DONE, FAILED, STALE]
+PREFIX = 'solver-job'
+
+
+def _key(team_id: Any, job_id: str) -> str:
+    return f'{PREFIX}:{team_id}:{job_id}'
+
+
+def start(team_id: Any, job_id: str) -> bool:
+    """
+    Record a new pending job for the Team, unless one already exists.
+    Returns True if the job is new and needs to be run.
+    """
+    return cache.add(_key(team_id, job_id), {'status': PENDING}, timeout=settings.LOOT_CACHE_TTL)
+
+
+def get(team_id: Any, job_id: str) -> Optional[Dict]:
+    """
+    Get the state of a job, or None if there's no such job for the Team
+    """
+    return cache.get(_key(team_id, job_id))
+
+
+def finish(team_id: Any, job_id: str, payload: Dict):
+    cache.set(_key(team_id, job_id), {'status': DONE, 'payload': payload}, timeout=settings.LOOT_CACHE_TTL)
+
+
+def fail(team_id: Any, job_id: str):
+    """
+    Mark a job as failed. It's kept for a short while so polling can see it, then the inputs can be tried again.
+    """
+    cache.set(_key(team_id, job_id), {'status': FAILED}, timeout=60)
+
+
+def stale(team_id: Any, job_id: str):
+    """
+    Mark a job as stale, as the Team's inputs no longer match the ones it was started for.
+    It's kept for a short while so polling can see it and start a job for the new inputs.
+    """
+    cache.set(_key(team_id, job_id), {'status': STALE}, timeout=60)
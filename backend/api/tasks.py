@@ -2,19 +2,21 @@
 Set up our tasks for celery to run
 
 Task to verify accounts on XIVAPI.
+Task to run the Loot Solver in the background.
+Tasks to warm the Loot and Solver caches after the weekly reset.
 """
 # stdlib
 from datetime import timedelta
+from typing import List
 # lib
-from asgiref.sync import async_to_sync
-from celery import shared_task
+from celery import chain, group, shared_task
 from celery.utils.log import get_task_logger
-from channels.layers import get_channel_layer
+from django.conf import settings
 from django.core.management import call_command
 from django.db.models import Q
 from django.utils import timezone
 # local
-from . import notifier
+from . import broadcast, notifier, prewarm, response_cache, solver_jobs
 from .lodestone_scraper import LodestoneScraper
 from .models import Character, Notification, Team
 
@@ -92,9 +94,7 @@ def verify_character(pk: int):
     # Then we're done!
     notifier.verify_success(obj)
     # Also send websocket details
-    channel_layer = get_channel_layer()
-    if channel_layer is not None:
-        async_to_sync(channel_layer.group_send)(f'user-updates-{obj.user.id}', {'type': 'character', 'id': obj.pk})
+    broadcast.send_to_user(obj.user.id, {'type': 'character', 'id': obj.pk})
 
 
 @shared_task(name='verify_reminder')
@@ -142,3 +142,89 @@ def refresh_tokens():
     Refresh any tokens that are about to expire
     """
     call_command('refresh_tokens')
+
+
+@shared_task(name='run_loot_solver')
+def run_loot_solver(team_id: str, greedy: bool, job_id: str):
+    """
+    Run the Loot Solver for a Team, store the result against the job, and tell the Team's websocket group it's ready.
+    The job id is the fingerprint of the inputs it was started for, so if the Team has changed since then the job is
+    marked stale rather than storing the result for different inputs under it.
+    """
+    # Imported here as the views import these tasks
+    from .views.loot_solver import LootSolver
+
+    logger.info(f'Running Loot Solver job {job_id} for Team #{team_id}.')
+    try:
+        obj = Team.objects.select_related('tier').get(pk=team_id)
+        inputs = LootSolver._get_inputs(obj, greedy)
+        if inputs.fingerprint() != job_id:
+            logger.info(f'Inputs for Team #{team_id} changed since Loot Solver job {job_id} was started.')
+            solver_jobs.stale(team_id, job_id)
+            broadcast.send_to_team(team_id, {'type': 'solver', 'id': team_id, 'job_id': job_id})
+            return
+        variant = 'greedy' if greedy else 'standard'
+        payload = response_cache.get_or_build(
+            obj, 'solver', lambda: LootSolver._build_payload(obj, greedy, inputs=inputs), variant,
+        )
+    except Exception:
+        solver_jobs.fail(team_id, job_id)
+        raise
+
+    solver_jobs.finish(team_id, job_id, payload)
+    broadcast.send_to_team(team_id, {'type': 'solver', 'id': team_id, 'job_id': job_id})
+
+
+@shared_task(name='prewarm_loot_caches')
+def prewarm_loot_caches(region: str):
+    """
+    Warm the Loot page and Loot Solver caches for every Team in the region, in chunks.
+    Chunks are split between LOOT_PREWARM_CONCURRENCY chains, so no more than that many run at once.
+    """
+    chunks = prewarm.chunks(prewarm.region_teams(region))
+    prewarm.start(region, sum(len(chunk) for chunk in chunks), len(chunks))
+    logger.info(f'Warming Loot caches for {len(chunks)} chunks of Teams in {region}.')
+    if len(chunks) == 0:
+        return
+
+    concurrency = max(settings.LOOT_PREWARM_CONCURRENCY, 1)
+    lanes = [chunks[lane::concurrency] for lane in range(min(concurrency, len(chunks)))]
+    group(
+        chain(prewarm_loot_chunk.si(region, chunk) for chunk in lane)
+        for lane in lanes
+    ).apply_async()
+
+
+@shared_task(name='prewarm_loot_chunk')
+def prewarm_loot_chunk(region: str, team_ids: List[str]):
+    """
+    Build and cache the default Loot page and both Loot Solver variants for a chunk of Teams
+    """
+    # Imported here as the views import these tasks
+    from .views.loot import LootCollection
+    from .views.loot_solver import LootSolver
+
+    # Everything either payload reads is loaded for the whole chunk up front, so a chunk is a fixed number of queries
+    teams = list(Team.objects.filter(pk__in=team_ids).select_related('tier'))
+    loaded = LootCollection._load_teams(teams)
+    inputs = LootSolver._get_inputs_for_teams(teams, False)
+    view = LootCollection()
+    timeout = settings.LOOT_PREWARM_TTL
+    warmed = built = failed = 0
+    for obj in teams:
+        try:
+            built += response_cache.warm(obj, 'loot', lambda: view._build_payload(obj, loaded=loaded[obj.pk]), 'all:all', timeout)
+            for greedy in [False, True]:
+                variant = 'greedy' if greedy else 'standard'
+                team_inputs = inputs[obj.pk]._replace(greedy=greedy)
+                built += response_cache.warm(
+                    obj, 'solver', lambda: LootSolver._build_payload(obj, greedy, inputs=team_inputs), variant, timeout,
+                )
+        except Exception:
+            # One broken Team shouldn't stop the rest of the chunk from being warmed
+            logger.exception(f'Could not warm Loot caches for Team #{obj.pk}.')
+            failed += 1
+        else:
+            warmed += 1
+
+    prewarm.record(region, warmed, built, failed)
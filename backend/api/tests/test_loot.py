@@ -1,8 +1,14 @@
 from datetime import datetime, timedelta
 from io import StringIO
+from unittest.mock import patch
+from django.core.cache import cache
 from django.core.management import call_command
+from django.db import transaction
+from django.http import HttpResponse
 from django.urls import reverse
 from rest_framework import status
+from api import broadcast, response_cache
+from api.views import LootClear
 from api.models import BISList, Character, Gear, Loot, Notification, Team, TeamMember, Tier
 from .test_base import SavageAimTestCase
 
@@ -1119,6 +1125,353 @@ class LootTestSuite(SavageAimTestCase):
         for i in range(len(content)):
             self.assertDictEqual(content[i], history[i])
 
+    def test_query_count(self):
+        """
+        Ensure that the loot page is built in a fixed number of queries,
+        no matter how many Members are in the Team or how many BIS Lists each of their Characters owns.
+        """
+        url = reverse('api:loot_collection', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+        Loot.objects.create(
+            greed=False,
+            item='mount',
+            member=self.tl_tm,
+            team=self.team,
+            obtained=datetime.today(),
+            tier=self.team.tier,
+        )
+
+        with self.assertNumQueries(10):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Add a new Member to the Team, and give every Character in the Team some extra greed lists
+        new_char = Character.objects.create(
+            avatar_url='https://img.savageaim.com/abcde',
+            lodestone_id=1234567890,
+            user=self._create_user(),
+            name='Off Tank',
+            verified=True,
+            world='Lich',
+        )
+        new_chars_list = None
+        for char in [self.team_lead, self.main_tank, new_char]:
+            for job_id in ['WAR', 'DRK', 'GNB']:
+                bis = BISList.objects.get(pk=self.tl_main_bis.pk)
+                bis.pk = None
+                bis.job_id = job_id
+                bis.owner = char
+                bis.save()
+                new_chars_list = bis
+        new_tm = self.team.members.create(character=new_char, bis_list=new_chars_list)
+        Loot.objects.create(
+            greed=True,
+            item='body',
+            member=new_tm,
+            team=self.team,
+            obtained=datetime.today(),
+            tier=self.team.tier,
+        )
+
+        with self.assertNumQueries(10):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['team']['members']), 3)
+
+    def test_etag(self):
+        """
+        Read the loot page, then read it again with the ETag and ensure a 304 is returned without building the page.
+        Recording Loot for the Team should give a new ETag.
+        """
+        url = reverse('api:loot_collection', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        Loot.objects.create(
+            greed=False,
+            item='mount',
+            member=self.tl_tm,
+            team=self.team,
+            obtained=datetime.today(),
+            tier=self.team.tier,
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['loot']['history']), 1)
+
+    def test_response_cache(self):
+        """
+        Load the loot page twice, and ensure the second load is served from the cache.
+        Recording Loot through the API should clear the cached page for the Team.
+        """
+        url = reverse('api:loot_collection', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+        before = response_cache.stats()['loot']
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.json(), cached.json())
+
+        after = response_cache.stats()['loot']
+        self.assertEqual(after['hits'], before['hits'] + 1)
+        self.assertEqual(after['misses'], before['misses'] + 1)
+
+        data = {
+            'greed': False,
+            'member_id': self.tl_tm.pk,
+            'item': 'mount',
+            'obtained': datetime.today().strftime('%Y-%m-%d'),
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertIsNone(cache.get(f'{response_cache.PREFIX}:{self.team.pk}:loot:all:all'))
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['loot']['history']), 1)
+        self.assertEqual(response_cache.stats()['loot']['misses'], before['misses'] + 2)
+
+    def test_paginated_history(self):
+        """
+        Page through the history endpoint with entries sharing the same obtained date, and ensure each entry is returned
+        exactly once, newest first.
+        """
+        url = reverse('api:loot_history', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+
+        today = datetime.today()
+        loot = [
+            Loot.objects.create(
+                greed=False,
+                item='mount',
+                member=self.tl_tm,
+                team=self.team,
+                obtained=today - timedelta(days=index // 2),
+                tier=self.team.tier,
+            )
+            for index in range(5)
+        ]
+        # Loot for other Tiers shouldn't appear
+        Loot.objects.create(
+            greed=False,
+            item='mount',
+            member=self.tl_tm,
+            team=self.team,
+            obtained=today,
+            tier=Tier.objects.exclude(pk=self.team.tier.pk).first(),
+        )
+        expected = [item.pk for item in sorted(loot, key=lambda item: (item.obtained.date(), item.pk), reverse=True)]
+
+        received = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {'limit': 2}
+            if cursor is not None:
+                params['cursor'] = cursor
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+            content = response.json()
+            self.assertLessEqual(len(content['results']), 2)
+            received.extend(item['id'] for item in content['results'])
+            pages += 1
+            cursor = content['next']
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertListEqual(received, expected)
+
+    def test_paginated_history_400(self):
+        """
+        Send invalid cursors and limits to the history endpoint
+        """
+        url = reverse('api:loot_history', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+
+        response = self.client.get(url, {'cursor': 'abcde'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['cursor'], ['Invalid cursor.'])
+
+        for limit in ['abc', '0', '-1']:
+            response = self.client.get(url, {'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json()['limit'], ['Please provide a positive whole number.'])
+
+    def test_history_options(self):
+        """
+        Ensure the loot page can omit its history, or include only the latest page of it
+        """
+        url = reverse('api:loot_collection', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+        Loot.objects.bulk_create(
+            Loot(
+                greed=False,
+                item='mount',
+                member=self.tl_tm,
+                team=self.team,
+                obtained=datetime.today(),
+                tier=self.team.tier,
+            )
+            for _ in range(55)
+        )
+
+        full = self.client.get(url).json()['loot']
+        self.assertEqual(len(full['history']), 55)
+        self.assertNotIn('history_next', full)
+
+        none = self.client.get(url, {'history': 'none'}).json()['loot']
+        self.assertNotIn('history', none)
+        self.assertDictEqual(none['gear'], full['gear'])
+        self.assertDictEqual(none['received'], full['received'])
+
+        latest = self.client.get(url, {'history': 'latest'}).json()['loot']
+        self.assertListEqual(latest['history'], full['history'][:50])
+        self.assertIsNotNone(latest['history_next'])
+
+        # The cursor picks up from where the latest page stopped
+        history_url = reverse('api:loot_history', kwargs={'team_id': self.team.pk})
+        response = self.client.get(history_url, {'cursor': latest['history_next']})
+        self.assertListEqual(response.json()['results'], full['history'][50:])
+        self.assertIsNone(response.json()['next'])
+
+    def test_received(self):
+        """
+        Ensure the received counts are correct, both on their own endpoint and as part of the loot page
+        """
+        url = reverse('api:loot_received', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+        other_tier = Tier.objects.exclude(pk=self.team.tier.pk).first()
+        today = datetime.today()
+        Loot.objects.bulk_create([
+            Loot(greed=False, item='mount', member=self.tl_tm, team=self.team, obtained=today, tier=self.team.tier),
+            Loot(greed=True, item='body', member=self.tl_tm, team=self.team, obtained=today, tier=self.team.tier),
+            Loot(greed=True, item='head', member=self.tl_tm, team=self.team, obtained=today, tier=self.team.tier),
+            Loot(greed=False, item='feet', member=self.mt_tm, team=self.team, obtained=today, tier=self.team.tier),
+            # Neither of these should be counted
+            Loot(greed=False, item='legs', member=self.mt_tm, team=self.team, obtained=today, tier=other_tier),
+            Loot(greed=False, item='hands', member=None, team=self.team, obtained=today, tier=self.team.tier),
+        ])
+
+        expected = {
+            self.team_lead.display_name: {'need': 1, 'greed': 2},
+            self.main_tank.display_name: {'need': 1, 'greed': 0},
+        }
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.json(), expected)
+
+        response = self.client.get(reverse('api:loot_collection', kwargs={'team_id': self.team.pk}))
+        self.assertDictEqual(response.json()['loot']['received'], expected)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.client.get(url)['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_slot_selection(self):
+        """
+        Request only some slots of the loot page, by fight and by name, and ensure they match the full page
+        """
+        url = reverse('api:loot_collection', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+        full = self.client.get(url).json()['loot']['gear']
+
+        fights = {
+            'first': ['earrings', 'necklace', 'bracelet', 'ring'],
+            'second': ['head', 'hands', 'feet', 'tome-accessory-augment', 'tome-weapon-token'],
+            'third': ['body', 'legs', 'tome-armour-augment', 'tome-weapon-augment'],
+            'fourth': ['mainhand', 'mount'],
+        }
+        for fight, slots in fights.items():
+            response = self.client.get(url, {'fight': fight})
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+            gear = response.json()['loot']['gear']
+            self.assertCountEqual(gear.keys(), slots)
+            for slot in slots:
+                self.assertDictEqual(gear[slot], full[slot])
+
+        response = self.client.get(url, {'slots': 'mount,head', 'fight': 'first'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertCountEqual(response.json()['loot']['gear'].keys(), ['mount', 'head'] + fights['first'])
+
+        # Invalid selections
+        response = self.client.get(url, {'fight': 'fifth'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fight', response.json())
+        for slots in ['', 'head,offhand']:
+            response = self.client.get(url, {'slots': slots})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('slots', response.json())
+
+    def test_overview(self):
+        """
+        Load the loot overview for a User in several Teams, and ensure each Team matches its own loot page.
+        Adding another Team shouldn't add any queries.
+        """
+        url = reverse('api:user_loot')
+        user = self._get_user()
+        self.client.force_authenticate(user)
+        Loot.objects.create(
+            greed=False,
+            item='mount',
+            member=self.tl_tm,
+            team=self.team,
+            obtained=datetime.today(),
+            tier=self.team.tier,
+        )
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(10):
+            self.client.get(url)
+
+        # Put the Team Lead in a second Team, using a different Tier and one of their greed lists
+        other = Team.objects.create(
+            invite_code=Team.generate_invite_code(),
+            name='Another Team',
+            tier=Tier.objects.exclude(pk=self.team.tier.pk).first(),
+        )
+        other.members.create(character=self.team_lead, bis_list=self.tl_alt_bis, lead=True)
+
+        with self.assertNumQueries(10):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.json()
+        self.assertListEqual([team['id'] for team in content], [str(other.pk), str(self.team.pk)])
+
+        for team in content:
+            page = self.client.get(reverse('api:loot_collection', kwargs={'team_id': team['id']})).json()
+            self.assertDictEqual(team['gear'], page['loot']['gear'])
+            self.assertDictEqual(team['received'], page['loot']['received'])
+        self.assertDictEqual(content[1]['received'], {self.team_lead.display_name: {'need': 1, 'greed': 0}})
+        self.assertDictEqual(content[0]['received'], {})
+
+        # Slot selection works the same as the loot page
+        response = self.client.get(url, {'fight': 'fourth'})
+        self.assertCountEqual(response.json()[0]['gear'].keys(), ['mainhand', 'mount'])
+        self.assertEqual(self.client.get(url, {'fight': 'fifth'}).status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_create(self):
         """
         Create just a loot record for an item not tracked using the need/greed gear system
@@ -1315,6 +1668,161 @@ class LootTestSuite(SavageAimTestCase):
         self.mt_alt_bis.refresh_from_db()
         self.assertEqual(self.mt_alt_bis.bis_body_id, self.raid_gear.pk)
 
+    def test_clear(self):
+        """
+        Record the same drops as test_create_with_bis in one request, and ensure the results are the same.
+        Notifications should be created together, and the Team should only receive one update.
+        """
+        read_url = reverse('api:loot_collection', kwargs={'team_id': self.team.pk})
+        write_url = reverse('api:loot_clear', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+
+        drops = [
+            {'greed': False, 'member_id': self.tl_tm.pk, 'item': 'ring', 'greed_bis_id': None},
+            {'greed': False, 'member_id': self.mt_tm.pk, 'item': 'mainhand'},
+            {'greed': False, 'member_id': self.tl_tm.pk, 'item': 'body'},
+            {'greed': False, 'member_id': self.tl_tm.pk, 'item': 'mainhand'},
+            {'greed': True, 'member_id': self.mt_tm.pk, 'item': 'ring', 'greed_bis_id': self.mt_alt_bis2.pk},
+            {'greed': True, 'member_id': self.tl_tm.pk, 'item': 'mainhand', 'greed_bis_id': self.tl_alt_bis.pk},
+            {'greed': True, 'member_id': self.mt_tm.pk, 'item': 'body', 'greed_bis_id': self.mt_alt_bis.pk},
+        ]
+
+        self.expected_gear['ring']['need'].pop(1)
+        self.expected_gear['mainhand']['need'].pop(0)
+        self.expected_gear['mainhand']['need'].pop(0)
+        self.expected_gear['body']['need'].pop(0)
+        self.expected_gear['ring']['greed'][0]['greed_lists'].pop(1)
+        self.expected_gear['mainhand']['greed'][1]['greed_lists'].pop(0)
+        self.expected_gear['body']['greed'][0]['greed_lists'].pop(0)
+        for item in ['tome-weapon-token', 'tome-weapon-augment']:
+            for entry in self.expected_gear[item]['need']:
+                entry.update({'current_gear_il': self.raid_weapon.item_level, 'current_gear_name': self.raid_weapon.name})
+
+        version = Team.objects.get(pk=self.team.pk).data_version
+        with patch.object(LootClear, '_send_to_team') as send, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(write_url, {'drops': drops}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertEqual(len(response.json()['ids']), 7)
+        self.assertEqual(Loot.objects.count(), 7)
+        send.assert_called_once()
+        self.assertGreater(Team.objects.get(pk=self.team.pk).data_version, version)
+
+        content = self.client.get(read_url).json()['loot']['gear']
+        for item in self.expected_gear.keys():
+            self.assertEqual(content[item], self.expected_gear[item], item)
+
+        self.tl_main_bis.refresh_from_db()
+        self.assertEqual(self.tl_main_bis.current_body_id, self.raid_gear.pk)
+        self.assertEqual(self.tl_main_bis.current_offhand_id, self.raid_weapon.pk)
+        self.mt_alt_bis2.refresh_from_db()
+        self.assertEqual(self.mt_alt_bis2.current_left_ring_id, self.raid_gear.pk)
+
+        # One Notification per updated BIS List
+        self.assertEqual(Notification.objects.filter(user=self.team_lead.user).count(), 2)
+        self.assertEqual(Notification.objects.filter(user=self.main_tank.user).count(), 3)
+
+    def test_clear_broadcast(self):
+        """
+        Record a clear, and ensure nothing is sent until the transaction commits, and then only once per group.
+        Then ensure a batch sends everything in one go, only once for identical events, and without the events from a
+        rolled back transaction, and that the middleware sends once per request, and nothing for server errors.
+        """
+        write_url = reverse('api:loot_clear', kwargs={'team_id': self.team.pk})
+        self.client.force_authenticate(self._get_user())
+        drops = [
+            {'greed': False, 'member_id': self.tl_tm.pk, 'item': 'ring', 'greed_bis_id': None},
+            {'greed': False, 'member_id': self.mt_tm.pk, 'item': 'mainhand'},
+            {'greed': False, 'member_id': self.tl_tm.pk, 'item': 'body'},
+        ]
+
+        sent = []
+
+        class Layer:
+            async def group_send(self, group, event):
+                sent.append((group, event))
+
+        with patch.object(broadcast, 'CHANNEL_LAYER', Layer()), patch.object(broadcast, 'async_to_sync', wraps=broadcast.async_to_sync) as hop:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(write_url, {'drops': drops}, format='json')
+                self.assertListEqual(sent, [])
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+            self.assertCountEqual(sent, [
+                (f'team-updates-{self.team.pk}', {'type': 'loot', 'id': str(self.team.pk)}),
+                (f'user-updates-{self.team_lead.user.pk}', {'type': 'notification'}),
+                (f'user-updates-{self.main_tank.user.pk}', {'type': 'notification'}),
+            ])
+
+            sent.clear()
+            hop.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                with broadcast.batch():
+                    broadcast.send_to_team(self.team.pk, {'type': 'team', 'id': str(self.team.pk)})
+                    broadcast.send_to_team(self.team.pk, {'id': str(self.team.pk), 'type': 'team'})
+                    broadcast.send_to_team(self.team.pk, {'type': 'loot', 'id': str(self.team.pk)})
+                    with self.assertRaises(ValueError), transaction.atomic():
+                        broadcast.send_to_user(self.team_lead.user.pk, {'type': 'notification'})
+                        raise ValueError
+                self.assertListEqual(sent, [])
+            hop.assert_called_once()
+            self.assertListEqual(sent, [
+                (f'team-updates-{self.team.pk}', {'type': 'team', 'id': str(self.team.pk)}),
+                (f'team-updates-{self.team.pk}', {'type': 'loot', 'id': str(self.team.pk)}),
+            ])
+
+            # The middleware sends the request's events once, and only for responses that aren't server errors
+            def view(status_code):
+                def handle(request):
+                    broadcast.send_to_team(self.team.pk, {'type': 'team', 'id': str(self.team.pk)})
+                    broadcast.send_to_team(self.team.pk, {'type': 'team', 'id': str(self.team.pk)})
+                    return HttpResponse(status=status_code)
+                return handle
+
+            def failing_view(request):
+                broadcast.send_to_team(self.team.pk, {'type': 'team', 'id': str(self.team.pk)})
+                raise ValueError
+
+            sent.clear()
+            hop.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                response = broadcast.BroadcastMiddleware(view(status.HTTP_200_OK))(None)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            hop.assert_called_once()
+            self.assertListEqual(sent, [(f'team-updates-{self.team.pk}', {'type': 'team', 'id': str(self.team.pk)})])
+
+            sent.clear()
+            hop.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                response = broadcast.BroadcastMiddleware(view(status.HTTP_500_INTERNAL_SERVER_ERROR))(None)
+                with self.assertRaises(ValueError):
+                    broadcast.BroadcastMiddleware(failing_view)(None)
+            self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+            hop.assert_not_called()
+            self.assertListEqual(sent, [])
+
+    def test_clear_400(self):
+        """
+        Send a clear with an invalid drop, and ensure nothing is saved
+        """
+        write_url = reverse('api:loot_clear', kwargs={'team_id': self.team.pk})
+        user = self._get_user()
+        self.client.force_authenticate(user)
+
+        response = self.client.post(write_url, {'drops': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('drops', response.json())
+
+        drops = [
+            {'greed': False, 'member_id': self.tl_tm.pk, 'item': 'body'},
+            {'greed': False, 'member_id': self.tl_tm.pk, 'item': 'abcde'},
+        ]
+        response = self.client.post(write_url, {'drops': drops}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()['drops']
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]['item'], ['Please select a valid item.'])
+        self.assertEqual(Loot.objects.count(), 0)
+
     def test_create_with_bis_notification(self):
         """
         Do the same as above, but only once, and check the Notification status
@@ -1557,6 +2065,9 @@ class LootTestSuite(SavageAimTestCase):
         self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(self.client.post(f'{url}delete/').status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(self.client.post(f'{url}bis/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(f'{url}clear/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(f'{url}history/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(f'{url}received/').status_code, status.HTTP_404_NOT_FOUND)
 
         # Not having a character in the team
         self.team_lead.user = self._create_user()
@@ -1566,9 +2077,13 @@ class LootTestSuite(SavageAimTestCase):
         self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(self.client.post(f'{url}delete/').status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(self.client.post(f'{url}bis/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(f'{url}clear/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(f'{url}history/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(f'{url}received/').status_code, status.HTTP_404_NOT_FOUND)
 
         # POST while not team lead
         self.client.force_authenticate(self.main_tank.user)
         self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(self.client.post(f'{url}delete/').status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(self.client.post(f'{url}bis/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(f'{url}clear/').status_code, status.HTTP_404_NOT_FOUND)
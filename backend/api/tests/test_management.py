@@ -1,6 +1,13 @@
+import importlib
+import json
+import os
+import tempfile
 from datetime import datetime
 from io import StringIO
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
 from api import models
 from .test_base import SavageAimTestCase
 
@@ -191,3 +198,127 @@ class ManagementCommandTestSuite(SavageAimTestCase):
         bis.refresh_from_db()
         self.assertEqual(bis.current_right_ring_id, crafted.id)
         self.assertEqual(bis.current_left_ring_id, tome_gear.id)
+
+    def test_loot_requirements(self):
+        """
+        Create a Team with a Member, and ensure the LootRequirement rows are built by the signals.
+        Then break the rows in a couple of ways and make sure the checker notices and the commands fix them.
+        """
+        call_command('seed', stdout=StringIO())
+        char = models.Character.objects.create(
+            avatar_url='https://img.savageaim.com/abcde',
+            lodestone_id=1234567890,
+            user=self._get_user(),
+            name='Team Lead',
+            verified=True,
+            world='Lich',
+        )
+        raid_weapon = models.Gear.objects.get(item_level=605, name='Asphodelos')
+        raid_gear = models.Gear.objects.get(item_level=600, has_weapon=False)
+        tome_gear = models.Gear.objects.get(item_level=600, has_weapon=True)
+        crafted = models.Gear.objects.get(name='Classical')
+        bis = models.BISList.objects.create(
+            bis_body=raid_gear,
+            bis_bracelet=raid_gear,
+            bis_earrings=raid_gear,
+            bis_feet=raid_gear,
+            bis_hands=tome_gear,
+            bis_head=tome_gear,
+            bis_legs=tome_gear,
+            bis_mainhand=raid_weapon,
+            bis_necklace=tome_gear,
+            bis_offhand=raid_weapon,
+            bis_left_ring=tome_gear,
+            bis_right_ring=raid_gear,
+            current_body=crafted,
+            current_bracelet=crafted,
+            current_earrings=crafted,
+            current_feet=crafted,
+            current_hands=crafted,
+            current_head=crafted,
+            current_legs=crafted,
+            current_mainhand=crafted,
+            current_necklace=crafted,
+            current_offhand=crafted,
+            current_left_ring=crafted,
+            current_right_ring=crafted,
+            job_id='SGE',
+            owner=char,
+        )
+        team = models.Team.objects.create(
+            invite_code=models.Team.generate_invite_code(),
+            name='Les Jambons',
+            tier=models.Tier.objects.get(max_item_level=605),
+        )
+        member = models.TeamMember.objects.create(team=team, character=char, bis_list=bis, lead=True)
+
+        # Signals should have built one row per slot
+        rows = models.LootRequirement.objects.filter(member=member)
+        self.assertEqual(rows.count(), len(models.LootRequirement.SLOTS))
+        self.assertEqual(rows.filter(outstanding=True).count(), 11)
+        self.assertEqual(rows.get(slot='right_ring').item, 'ring')
+        self.assertEqual(rows.get(slot='head').item, 'tome-armour-augment')
+
+        # Updating the BIS List through .save() keeps the rows up to date
+        bis.current_body = raid_gear
+        bis.save()
+        body = rows.get(slot='body')
+        self.assertFalse(body.outstanding)
+        self.assertTrue(body.bis_equipped)
+        call_command('check_loot_requirements', stdout=StringIO(), stderr=StringIO())
+
+        # Bypassing the signals leaves the rows stale, which the checker should report
+        models.BISList.objects.filter(pk=bis.pk).update(current_feet=raid_gear)
+        with self.assertRaises(CommandError):
+            call_command('check_loot_requirements', stdout=StringIO(), stderr=StringIO())
+        call_command('check_loot_requirements', fix=True, stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(rows.get(slot='feet').outstanding)
+
+        # Rebuilding from nothing should give back the same rows
+        models.LootRequirement.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('check_loot_requirements', stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_loot_requirements', stdout=StringIO())
+        self.assertEqual(rows.count(), len(models.LootRequirement.SLOTS))
+        call_command('check_loot_requirements', stdout=StringIO(), stderr=StringIO())
+
+        # So should the data migration that fills the table for existing Teams, with its own copy of the row generation
+        models.LootRequirement.objects.all().delete()
+        migration = importlib.import_module('api.migrations.0031_backfill_loot_requirements')
+        state = MigrationExecutor(connection).loader.project_state(('api', '0031_backfill_loot_requirements'))
+        migration.backfill_loot_requirements(state.apps, None)
+        self.assertEqual(rows.count(), len(models.LootRequirement.SLOTS))
+        call_command('check_loot_requirements', stdout=StringIO(), stderr=StringIO())
+
+        # The augment counts on the BIS List come from the same masks
+        self.assertEqual(bis.armour_augments_required(tome_gear.name), 3)
+        self.assertEqual(bis.accessory_augments_required(tome_gear.name), 2)
+
+    def test_benchmark_gear_masks(self):
+        """
+        Run the gear mask benchmark with small Teams, it raises an error if the two versions ever disagree
+        """
+        out = StringIO()
+        call_command('benchmark_gear_masks', members=[2, 4], repeat=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn('2 members, 6 lists', output)
+        self.assertIn('4 members, 12 lists', output)
+
+    def test_benchmark_solver(self):
+        """
+        Run the solver benchmark with a small set of synthetic Teams, saving a baseline and then comparing against it
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'solver.json')
+            call_command('benchmark_solver', members=[8], weeks=[0, 4], teams=2, repeat=1, save=path, stdout=StringIO())
+            with open(path) as f:
+                saved = json.load(f)
+            self.assertSetEqual(set(saved['results']), {'8 members, 0 weeks', '8 members, 4 weeks'})
+            self.assertSetEqual(set(saved['results']['8 members, 4 weeks']), {'first_floor', 'second_floor', 'third_floor', 'fourth_floor'})
+
+            out = StringIO()
+            call_command('benchmark_solver', members=[8], weeks=[4], teams=2, repeat=1, compare=path, stdout=out)
+            self.assertIn('%)', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark_solver', members=[8], weeks=[0], teams=1, max_regression=10, stdout=StringIO())
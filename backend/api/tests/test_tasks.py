@@ -5,12 +5,16 @@ from typing import Dict
 from unittest.mock import patch
 # lib
 from allauth.socialaccount.models import SocialAccount, SocialApp, SocialToken
+from django.conf import settings
+from django.core.cache import cache
 from django.core.management import call_command
 from django.utils import timezone
 # local
+from api import prewarm, response_cache
 from api.lodestone_scraper import LodestoneScraper
-from api.models import BISList, Character, Gear, Job, Notification, Team, Tier
-from api.tasks import cleanup, verify_character, remind_users_to_verify
+from api.models import BISList, Character, Gear, Job, Notification, Team, TeamMember, Tier
+from api.views import LootCollection, LootSolver
+from api.tasks import cleanup, prewarm_loot_caches, prewarm_loot_chunk, verify_character, remind_users_to_verify
 from .test_base import SavageAimTestCase
 
 
@@ -533,3 +537,84 @@ class TasksTestSuite(SavageAimTestCase):
         self.assertEqual(bis.owner_id, char.id)
         bis2.refresh_from_db()
         self.assertEqual(bis2.owner_id, char.id)
+
+    def test_prewarm_loot_caches(self):
+        """
+        - Create Teams led from different data centres, and one in an old Tier
+        - Ensure each region picks up its own Teams, and Teams with no known data centre
+        - Ensure the chunks are split between chains that run at the same time
+        - Run a chunk, and ensure the payloads are cached and the progress is recorded
+        - Run it again, and ensure nothing is rebuilt
+        - Ensure a chunk makes the same number of queries no matter how many Teams are in it, and caches the same
+          payloads as building each Team on its own
+        """
+        call_command('seed', stdout=StringIO())
+        cache.clear()
+        tier = Tier.objects.first()
+        gear = Gear.objects.first()
+        teams = {}
+        for name, world, team_tier in [
+            ('eu', 'Lich (Light)', tier),
+            ('na', 'Gilgamesh (Aether)', tier),
+            ('unknown', 'Lich', tier),
+            ('old', 'Lich (Light)', Tier.objects.last()),
+        ]:
+            char = Character.objects.create(
+                avatar_url='https://img.savageaim.com/abcde',
+                lodestone_id=1234567890,
+                name=f'Char {name}',
+                verified=True,
+                world=world,
+            )
+            bis = BISList.objects.create(
+                **{f'{kind}_{slot}': gear for kind in ['bis', 'current'] for slot in [
+                    'body', 'bracelet', 'earrings', 'feet', 'hands', 'head', 'left_ring', 'legs', 'mainhand', 'necklace',
+                    'offhand', 'right_ring',
+                ]},
+                job=Job.objects.first(),
+                owner=char,
+            )
+            teams[name] = Team.objects.create(invite_code=Team.generate_invite_code(), name=name, tier=team_tier)
+            TeamMember.objects.create(team=teams[name], character=char, bis_list=bis, lead=True)
+
+        self.assertCountEqual(prewarm.region_teams('eu'), [str(teams['eu'].pk), str(teams['unknown'].pk)])
+        self.assertCountEqual(prewarm.region_teams('na'), [str(teams['na'].pk), str(teams['unknown'].pk)])
+
+        with self.settings(LOOT_PREWARM_CHUNK_SIZE=1), patch('api.tasks.group') as mocked_group:
+            prewarm_loot_caches('eu')
+        # Two chunks split across the two chains allowed by LOOT_PREWARM_CONCURRENCY
+        lanes = list(mocked_group.call_args.args[0])
+        self.assertEqual(len(lanes), settings.LOOT_PREWARM_CONCURRENCY)
+        self.assertListEqual([len(lane.tasks) for lane in lanes], [1, 1])
+        run = prewarm.progress('eu')
+        self.assertTupleEqual((run['teams'], run['chunks'], run['chunks_done']), (2, 2, 0))
+
+        team_ids = prewarm.region_teams('eu')
+        prewarm_loot_chunk('eu', team_ids)
+        run = prewarm.progress('eu')
+        self.assertTupleEqual((run['chunks_done'], run['warmed'], run['built'], run['failed']), (1, 2, 6, 0))
+        before = response_cache.stats()
+        for team_id in team_ids:
+            obj = Team.objects.get(pk=team_id)
+            for kind, variant in [('loot', 'all:all'), ('solver', 'standard'), ('solver', 'greedy')]:
+                self.assertFalse(response_cache.warm(obj, kind, dict, variant, 60))
+        self.assertDictEqual(response_cache.stats(), before)
+
+        prewarm_loot_chunk('eu', team_ids)
+        run = prewarm.progress('eu')
+        self.assertTupleEqual((run['chunks_done'], run['warmed'], run['built'], run['failed']), (2, 4, 6, 0))
+
+        for chunk in [team_ids[:1], team_ids]:
+            cache.clear()
+            with self.assertNumQueries(12):
+                prewarm_loot_chunk('eu', chunk)
+
+        view = LootCollection()
+        for team_id in team_ids:
+            obj = Team.objects.select_related('tier').get(pk=team_id)
+            self.assertDictEqual(response_cache.get_or_build(obj, 'loot', dict, 'all:all'), view._build_payload(obj))
+            for greedy, variant in [(False, 'standard'), (True, 'greedy')]:
+                self.assertDictEqual(
+                    response_cache.get_or_build(obj, 'solver', dict, variant),
+                    LootSolver._build_payload(obj, greedy, shared=False),
+                )
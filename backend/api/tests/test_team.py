@@ -1,11 +1,12 @@
 # stdlib
 from io import StringIO
+from unittest.mock import patch
 # lib
 from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
 # local
-from api.models import BISList, Character, Gear, Notification, Job, Team, TeamMember, Tier
+from api.models import BISList, Character, Gear, LootRequirement, Notification, Job, Team, TeamMember, Tier
 from api.serializers import TeamSerializer
 from .test_base import SavageAimTestCase
 
@@ -355,6 +356,51 @@ class TeamResource(SavageAimTestCase):
         self.assertIn('members', content)
         self.assertEqual(len(content['members']), 1)
 
+    def test_read_etag(self):
+        """
+        Read the Team, then read it again with the ETag to get a 304.
+        Any change to data shown for the Team should give a new ETag, while changes to other Teams should not.
+        """
+        user = self._get_user()
+        self.client.force_authenticate(user)
+        url = reverse('api:team_resource', kwargs={'pk': self.team.id})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        # An unrelated Team changing shouldn't affect anything
+        Team.objects.create(invite_code=Team.generate_invite_code(), name='Other Team', tier=Tier.objects.first())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Changing any of the Team, Characters or BIS Lists should each give a new ETag
+        seen = {etag}
+        self.char.alias = 'Charmander'
+        self.char.save()
+        self.bis.name = 'Renamed'
+        self.bis.save()
+        for change in [self.char.save, self.bis.save, self.tm.save, self.team.save]:
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn(response['ETag'], seen)
+            etag = response['ETag']
+            seen.add(etag)
+
+        # Saving a stale instance of the Team shouldn't roll the version back
+        stale = Team.objects.get(pk=self.team.pk)
+        self.tm.save()
+        stale.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(response['ETag'], seen)
+
     def test_regenerate_token(self):
         """
         Send a PATCH request to the endpoint, and ensure the team's invite code has changed
@@ -447,6 +493,29 @@ class TeamResource(SavageAimTestCase):
             self.assertEqual(notif.text, note_map[notif.type])
             self.assertFalse(notif.read)
 
+    def test_update_requirements(self):
+        """
+        Save the Team without changing its Tier and ensure the loot requirements aren't rebuilt, then change the Tier
+        and ensure they are
+        """
+        new_tier = Tier.objects.create(name='Memes', max_item_level=900, raid_gear_name='The End')
+        team = Team.objects.get(pk=self.team.pk)
+        with patch.object(LootRequirement, 'rebuild') as rebuild:
+            team.name = 'Renamed'
+            team.solver_sort_overrides = {'PLD': 1}
+            team.save()
+            rebuild.assert_not_called()
+
+            team.tier = new_tier
+            team.save()
+            rebuild.assert_called_once()
+
+            team.name = 'Renamed Again'
+            team.save()
+            rebuild.assert_called_once()
+        team.refresh_from_db()
+        self.assertEqual((team.name, team.tier_id), ('Renamed Again', new_tier.pk))
+
     def test_update_400(self):
         """
         Send invalid update requests and ensure the right errors are returned from each request
@@ -36,11 +36,17 @@ urlpatterns = [
 
     # Loot
     path('team/<str:team_id>/loot/', views.LootCollection.as_view(), name='loot_collection'),
+    path('team/<str:team_id>/loot/clear/', views.LootClear.as_view(), name='loot_clear'),
     path('team/<str:team_id>/loot/delete/', views.LootDelete.as_view(), name='loot_delete'),
+    path('team/<str:team_id>/loot/history/', views.LootHistory.as_view(), name='loot_history'),
+    path('team/<str:team_id>/loot/received/', views.LootReceived.as_view(), name='loot_received'),
     path('team/<str:team_id>/loot/bis/', views.LootWithBIS.as_view(), name='loot_with_bis'),
 
     # LootSolver
     path('team/<str:team_id>/loot/solver/', views.LootSolver.as_view(), name='loot_solver'),
+    path('team/<str:team_id>/loot/solver/jobs/<str:job_id>/', views.LootSolverJob.as_view(), name='loot_solver_job'),
+    path('team/<str:team_id>/loot/solver/projection/', views.LootSolverProjection.as_view(), name='loot_solver_projection'),
+    path('team/<str:team_id>/loot/solver/what-if/', views.LootSolverWhatIf.as_view(), name='loot_solver_what_if'),
 
     # Notifications
     path('notifications/', views.NotificationCollection.as_view(), name='notification_collection'),
@@ -73,4 +79,5 @@ urlpatterns = [
     # UserView
     path('me/', views.UserView.as_view(), name='user'),
     path('me/token/', views.UserTokenView.as_view(), name='user_token'),
+    path('me/loot/', views.LootOverview.as_view(), name='user_loot'),
 ]
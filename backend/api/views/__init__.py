@@ -4,8 +4,8 @@ from .etro import EtroImport
 from .gear import GearCollection, ItemLevels
 from .job import JobCollection, JobSolverSortCollection
 from .lodestone import LodestoneGearImport, LodestoneResource
-from .loot import LootCollection, LootDelete, LootWithBIS
-from .loot_solver import LootSolver
+from .loot import LootClear, LootCollection, LootDelete, LootHistory, LootOverview, LootReceived, LootWithBIS
+from .loot_solver import LootSolver, LootSolverJob, LootSolverProjection, LootSolverWhatIf
 from .notification import NotificationCollection, NotificationResource
 from .plugin import PluginImport
 from .team import TeamCollection, TeamResource, TeamInvite
@@ -36,11 +36,18 @@ __all__ = [
     'LodestoneGearImport',
     'LodestoneResource',
 
+    'LootClear',
     'LootCollection',
     'LootDelete',
+    'LootHistory',
+    'LootOverview',
+    'LootReceived',
     'LootWithBIS',
 
     'LootSolver',
+    'LootSolverJob',
+    'LootSolverProjection',
+    'LootSolverWhatIf',
 
     'NotificationCollection',
     'NotificationResource',
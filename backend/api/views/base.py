@@ -1,18 +1,17 @@
 from typing import Any, Dict, Optional
 # lib
 import jellyfish
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.utils.http import parse_etags, quote_etag
 from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.views import APIView as RFView
 # local
+from api import broadcast, response_cache
 from api.errors import InvalidMemberPermissionsError
 from api.models import Team, TeamMember
 
-CHANNEL_LAYER = get_channel_layer()
-
 
 class APIView(RFView):
     """
@@ -73,16 +72,42 @@ class APIView(RFView):
 
         return team
 
+    @staticmethod
+    def _get_team_etag(team: Team, *extra: Any) -> str:
+        """
+        Build an ETag for a Team's data from its version counter, plus any extra values the response depends on.
+        """
+        return quote_etag('-'.join(str(part) for part in [team.pk, team.data_version, *extra]))
+
+    @staticmethod
+    def _etag_matches(request: Request, etag: str) -> bool:
+        """
+        Check the If-None-Match header of the request against the given ETag.
+        Weak comparison is used, as compression middleware in front of us may have weakened the ETag we sent.
+        """
+        header = request.headers.get('If-None-Match')
+        if header is None:
+            return False
+        tags = {tag.removeprefix('W/') for tag in parse_etags(header)}
+        return '*' in tags or etag in tags
+
+    @staticmethod
+    def _not_modified(etag: str) -> Response:
+        """
+        The response to send when the client's copy of the data is still up to date.
+        """
+        return Response(status=304, headers={'ETag': etag})
+
     def _send_to_user(self, user: Optional[User], event: Dict[str, Any]):
         if user is None:
             return
 
-        if CHANNEL_LAYER is not None:
-            async_to_sync(CHANNEL_LAYER.group_send)(f'user-updates-{user.id}', event)
+        broadcast.send_to_user(user.id, event)
 
     def _send_to_team(self, team: Team, event: Dict[str, Any]):
-        if CHANNEL_LAYER is not None:
-            async_to_sync(CHANNEL_LAYER.group_send)(f'team-updates-{team.id}', event)
+        # Anything worth telling the Team about also means their cached Loot and Solver payloads are out of date
+        response_cache.invalidate([team.pk])
+        broadcast.send_to_team(team.id, event)
 
 
 class ImportAPIView(APIView):
@@ -5,28 +5,35 @@ Get the loot history and required for a Team.
 Record new loot and update BIS Lists accordingly.
 """
 # stdlib
-from datetime import datetime
-from typing import Dict, List
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
 # lib
 from django.core.exceptions import ValidationError
-from django.db.models import QuerySet
-from drf_spectacular.utils import inline_serializer, OpenApiResponse
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, prefetch_related_objects, Q, QuerySet
+from drf_spectacular.utils import inline_serializer, OpenApiParameter, OpenApiResponse
 from drf_spectacular.views import extend_schema
 from rest_framework import serializers
 from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from .base import APIView
-from api import notifier
-from api.models import BISList, Loot, Team
+from .loot_solver import LootSolver
+from api import gear_masks, notifier, response_cache
+from api.models import BISList, Loot, LootRequirement, Team, TeamMember, Tier
+from api.models.bis_list import bis_list_ring_swap
 from api.serializers import (
     LootSerializer,
+    LootClearSerializer,
     LootCreateSerializer,
     LootCreateWithBISSerializer,
     TeamSerializer,
 )
 
 PERMISSION_NAME = 'loot_manager'
+# How much of the Loot history can be included with the loot page
+HISTORY_OPTIONS = ['all', 'latest', 'none']
 
 
 # Define Serializers for the response info.
@@ -75,6 +82,29 @@ class TomeGreedGearSerializer(serializers.Serializer):
     greed_lists = serializers.ListField(child=TomeGreedItemSerializer(many=True))
 
 
+ReceivedSerializer = inline_serializer(
+    'LootReceived',
+    {
+        '[member_name: str]': inline_serializer(
+            'LootReceivedEntry',
+            {
+                'need': serializers.IntegerField(),
+                'greed': serializers.IntegerField(),
+            },
+        ),
+    },
+)
+
+
+class TeamLootData(NamedTuple):
+    """
+    What the loot page reads for a Team besides the Team itself, when it has been loaded for a batch of Teams
+    """
+    outstanding: List[LootRequirement]
+    history: List[Loot]
+    received: Dict[str, Dict[str, int]]
+
+
 class LootCollection(APIView):
     """
     Management of Team Loot
@@ -104,69 +134,128 @@ class LootCollection(APIView):
         'tome-weapon-augment',
         'tome-weapon-token',
     ]
+    ALL_SLOTS = AUTOMATED_SLOTS + NON_AUTOMATED_SLOTS + HISTORY_SLOTS
+    # The slots that drop from each fight, following the floors used by the Loot Solver
+    FIGHT_SLOTS = {
+        'first': LootSolver.FIRST_FLOOR_SLOTS,
+        'second': LootSolver.SECOND_FLOOR_SLOTS + ['tome-weapon-token'],
+        'third': LootSolver.THIRD_FLOOR_SLOTS + ['tome-weapon-augment'],
+        'fourth': ['mainhand', 'mount'],
+    }
+
+    @staticmethod
+    def _get_team(request: Request, team_id: str) -> Team:
+        """
+        Load a Team for the loot page, without any of its related data.
+        """
+        return Team.objects.select_related('tier').distinct().get(pk=team_id, members__character__user=request.user)
 
-    def _get_gear_data(self, obj: Team) -> Dict[str, List[Dict[str, str]]]:
+    @staticmethod
+    def _prefetch_team(obj: Team):
         """
-        An attempt at improving the original loot response with less DB hits + waiting required.
+        Load everything the loot page needs for a Team.
         """
-        # Set up the whole response dictionary at once
-        response = {slot: {'need': [], 'greed': []} for slot in self.AUTOMATED_SLOTS}
-        for slot in self.NON_AUTOMATED_SLOTS:
-            response[slot] = {'need': [], 'greed': []}
+        LootCollection._prefetch_teams([obj])
 
-        # Maintain a mapping of character greed lists
-        greed_lists = {}
+    @staticmethod
+    def _prefetch_teams(teams: List[Team]):
+        """
+        Load everything the loot page needs for the given Teams.
+        Every BIS List owned by every Member's Character is fetched in a single query, and all of their Gear in another,
+        so the amount of queries stays the same no matter how many Teams there are, how big they are,
+        or how many greed lists each Character has.
+        """
+        bis_lists = BISList.objects.select_related('job')
+        prefetch_related_objects(
+            teams,
+            'members',
+            'members__character',
+            'members__character__user',
+            Prefetch('members__character__bis_lists', queryset=bis_lists),
+            Prefetch('members__bis_list', queryset=bis_lists),
+        )
+
+        lists = []
+        for team in teams:
+            for member in team.members.all():
+                lists.append(member.bis_list)
+                lists.extend(member.character.bis_lists.all())
+        BISList.prefetch_gear(lists)
+
+    @staticmethod
+    def _load_teams(teams: List[Team]) -> Dict[str, TeamLootData]:
+        """
+        Prefetch the given Teams and load the rest of what the loot page needs for them, keyed by Team id.
+        Every Team is loaded together, so the number of queries doesn't grow with the number of Teams.
+        """
+        LootCollection._prefetch_teams(teams)
+
+        outstanding: Dict[str, List[LootRequirement]] = {team.pk: [] for team in teams}
+        for requirement in LootRequirement.objects.filter(team__in=teams, outstanding=True):
+            outstanding[requirement.team_id].append(requirement)
+
+        history: Dict[str, List[Loot]] = {team.pk: [] for team in teams}
+        entries = Loot.objects.filter(team__in=teams, tier_id=F('team__tier_id')).select_related('member', 'member__character')
+        for entry in entries:
+            history[entry.team_id].append(entry)
+
+        received = LootCollection._get_received_by_team(teams)
+        return {team.pk: TeamLootData(outstanding[team.pk], history[team.pk], received.get(team.pk, {})) for team in teams}
+
+    def _get_gear_data(
+        self,
+        obj: Team,
+        slots: List[str],
+        outstanding: Optional[List[LootRequirement]] = None,
+    ) -> Dict[str, List[Dict[str, str]]]:
+        """
+        An attempt at improving the original loot response with less DB hits + waiting required.
+        Reads the outstanding LootRequirement rows for the Team, so the cost doesn't depend on how many BIS Lists each Member owns.
+        Only the requested slots are evaluated.
 
-        # Store the name of the gear from the raid tier
-        raid_gear_name = obj.tier.raid_gear_name
+        The outstanding rows can be passed in if they have already been loaded for a batch of Teams.
+        """
+        # Set up the whole response dictionary at once
+        response = {
+            slot: {'need': [], 'greed': []}
+            for slot in self.AUTOMATED_SLOTS + self.NON_AUTOMATED_SLOTS
+            if slot in slots
+        }
+        if len(response) == 0:
+            return response
+
+        # Group the outstanding requirements by Member and BIS List, rows are already in slot order
+        requirements: Dict[Tuple[int, int], List[LootRequirement]] = {}
+        if outstanding is None:
+            outstanding = LootRequirement.objects.filter(team=obj, outstanding=True, item__in=list(response))
+        for requirement in outstanding:
+            if requirement.item not in response:
+                continue
+            requirements.setdefault((requirement.member_id, requirement.bis_list_id), []).append(requirement)
 
         # Loop through every member of the team.
         for member in obj.members.all():
-            greed_lists[member.id] = {}
-            # Loop through the member's greed BIS Lists
-            for bis_list in BISList.objects.filter(owner=member.character):
-                for slot in self.AUTOMATED_SLOTS:
-                    greed_lists[member.id].setdefault(slot, [])
-
-                    list_is_need = bis_list.id == member.bis_list_id
-                    bis = getattr(bis_list, f'bis_{slot}')
-                    current = getattr(bis_list, f'current_{slot}')
-
-                    if bis.name == raid_gear_name and current.name != raid_gear_name:
-                        if list_is_need:
-                            response[slot]['need'].append({
-                                'member_id': member.id,
-                                'character_name': member.character.display_name,
-                                'current_gear_name': current.name,
-                                'current_gear_il': current.item_level,
-                                'job_icon_name': bis_list.job.id,
-                                'job_role': bis_list.job.role,
-                            })
-                        else:
-                            greed_lists[member.id][slot].append({
-                                'bis_list_name': bis_list.display_name,
-                                'bis_list_id': bis_list.id,
-                                'current_gear_name': current.name,
-                                'current_gear_il': current.item_level,
-                                'job_icon_name': bis_list.job.id,
-                                'job_role': bis_list.job.role,
-                            })
-
-                # For non-automated slots we have to do stuff more manually
-                slot = 'ring'
-                greed_lists[member.id].setdefault(slot, [])
-
-                bis_ring_check = [
-                    bis_list.bis_right_ring.name == raid_gear_name,
-                    bis_list.bis_left_ring.name == raid_gear_name,
-                ]
-                current_ring_check = [
-                    bis_list.current_right_ring.name != raid_gear_name,
-                    bis_list.current_left_ring.name != raid_gear_name,
-                ]
-                if any(bis_ring_check) and all(current_ring_check):
+            greed_lists = {slot: [] for slot in response}
+
+            # The BIS Lists are already in memory for the Team serializer, and iterating them keeps the Character page ordering
+            for bis_list in member.character.bis_lists.all():
+                rows = requirements.get((member.id, bis_list.id), [])
+                list_is_need = bis_list.id == member.bis_list_id
+                augments = {'tome-accessory-augment': 0, 'tome-armour-augment': 0}
+                added = set()
+
+                for row in rows:
+                    if row.item in augments:
+                        augments[row.item] += 1
+                        continue
+                    # Either ring filling the requirement is enough, so only add one entry per list
+                    if row.item in added:
+                        continue
+                    added.add(row.item)
+                    current = getattr(bis_list, f'current_{row.slot}')
+
                     if list_is_need:
-                        response[slot]['need'].append({
+                        response[row.item]['need'].append({
                             'member_id': member.id,
                             'character_name': member.character.display_name,
                             'current_gear_name': current.name,
@@ -175,7 +264,7 @@ class LootCollection(APIView):
                             'job_role': bis_list.job.role,
                         })
                     else:
-                        greed_lists[member.id][slot].append({
+                        greed_lists[row.item].append({
                             'bis_list_name': bis_list.display_name,
                             'bis_list_id': bis_list.id,
                             'current_gear_name': current.name,
@@ -184,41 +273,20 @@ class LootCollection(APIView):
                             'job_role': bis_list.job.role,
                         })
 
-                slot = 'tome-accessory-augment'
-                greed_lists[member.id].setdefault(slot, [])
-                required = bis_list.accessory_augments_required(obj.tier.tome_gear_name)
-                if required > 0:
+                for slot, required in augments.items():
+                    if required == 0:
+                        continue
+
                     if list_is_need:
                         response[slot]['need'].append({
                             'member_id': member.id,
                             'character_name': member.character.display_name,
-                            'job_icon_name': member.bis_list.job.id,
-                            'job_role': member.bis_list.job.role,
-                            'requires': required,
-                        })
-                    else:
-                        greed_lists[member.id][slot].append({
-                            'bis_list_name': bis_list.display_name,
-                            'bis_list_id': bis_list.id,
                             'job_icon_name': bis_list.job.id,
                             'job_role': bis_list.job.role,
                             'requires': required,
                         })
-
-                slot = 'tome-armour-augment'
-                greed_lists[member.id].setdefault(slot, [])
-                required = bis_list.armour_augments_required(obj.tier.tome_gear_name)
-                if required > 0:
-                    if list_is_need:
-                        response[slot]['need'].append({
-                            'member_id': member.id,
-                            'character_name': member.character.display_name,
-                            'job_icon_name': member.bis_list.job.id,
-                            'job_role': member.bis_list.job.role,
-                            'requires': required,
-                        })
                     else:
-                        greed_lists[member.id][slot].append({
+                        greed_lists[slot].append({
                             'bis_list_name': bis_list.display_name,
                             'bis_list_id': bis_list.id,
                             'job_icon_name': bis_list.job.id,
@@ -226,30 +294,36 @@ class LootCollection(APIView):
                             'requires': required,
                         })
 
-        # Lastly, consolidate the two storages of items into one
-        for member in obj.members.all():
-            for slot in greed_lists[member.id]:
+            # Lastly, add the Member's greed lists to the response
+            for slot, lists in greed_lists.items():
                 response[slot]['greed'].append({
                     'member_id': member.id,
                     'character_name': member.character.display_name,
-                    'greed_lists': greed_lists[member.id][slot],
+                    'greed_lists': lists,
                 })
 
         return response
 
-    def _get_history_loot_data(self, obj: Team, loot: QuerySet) -> Dict[str, List[Dict[str, str]]]:
+    def _get_history_loot_data(self, obj: Team, loot: QuerySet, slots: List[str]) -> Dict[str, List[Dict[str, str]]]:
         """
         A method for retrieving the loot items that are checked purely by the history data
+        Only the requested slots are evaluated.
         """
         response = {}
+        history_slots = [slot for slot in self.HISTORY_SLOTS if slot in slots]
+        if len(history_slots) == 0:
+            return response
 
         # Maintain a mapping of member_id to a set of slots they have already needed
+        # The history has already been loaded by this point, so filter it in memory rather than sending another query
         already_given = {}
-        for entry in loot.filter(item__in=self.HISTORY_SLOTS, greed=False):
+        for entry in loot:
+            if entry.greed or entry.item not in self.HISTORY_SLOTS:
+                continue
             already_given.setdefault(entry.member_id, set())
             already_given[entry.member_id].add(entry.item)
 
-        for slot in self.HISTORY_SLOTS:
+        for slot in history_slots:
             slot_data = {'need': [], 'greed': []}
 
             for member in obj.members.all():
@@ -276,6 +350,103 @@ class LootCollection(APIView):
             response[slot] = slot_data
         return response
 
+    @staticmethod
+    def _get_received_data(obj: Team) -> Dict[str, Dict[str, int]]:
+        """
+        Count the need and greed Loot each Member of the Team has received in the current Tier.
+        """
+        return LootCollection._get_received_by_team([obj]).get(obj.pk, {})
+
+    @staticmethod
+    def _get_received_by_team(teams: List[Team]) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """
+        Count the need and greed Loot each Member of the given Teams has received in their Team's current Tier.
+        Counted by the DB in one grouped query, joined to the Characters for their names.
+        """
+        in_tier = Q(loot__team_id=F('team_id'), loot__tier_id=F('team__tier_id'))
+        members = TeamMember.objects.filter(team__in=teams).select_related('character').annotate(
+            need=Count('loot', filter=in_tier & Q(loot__greed=False)),
+            greed=Count('loot', filter=in_tier & Q(loot__greed=True)),
+        ).filter(Q(need__gt=0) | Q(greed__gt=0))
+
+        received = {}
+        for member in members:
+            team_received = received.setdefault(member.team_id, {})
+            counts = team_received.setdefault(member.character.display_name, {'need': 0, 'greed': 0})
+            counts['need'] += member.need
+            counts['greed'] += member.greed
+        return received
+
+    def _get_requested_slots(self, request: Request) -> Tuple[Optional[List[str]], Dict[str, List[str]]]:
+        """
+        Read the `fight` and `slots` parameters from the request.
+        Returns the list of slots to evaluate (None for all of them), and a dict of errors if either parameter was invalid.
+        """
+        errors = {}
+        requested = set()
+        fight = request.query_params.get('fight', None)
+        if fight is not None:
+            if fight not in self.FIGHT_SLOTS:
+                errors['fight'] = [f'Please choose one of: {", ".join(self.FIGHT_SLOTS)}.']
+            else:
+                requested.update(self.FIGHT_SLOTS[fight])
+
+        slots = request.query_params.get('slots', None)
+        if slots is not None:
+            chosen = {slot for slot in slots.split(',') if slot != ''}
+            if len(chosen) == 0 or not chosen.issubset(self.ALL_SLOTS):
+                errors['slots'] = [f'Please choose a comma separated list from: {", ".join(self.ALL_SLOTS)}.']
+            requested.update(chosen)
+
+        if fight is None and slots is None:
+            return None, errors
+        return [slot for slot in self.ALL_SLOTS if slot in requested], errors
+
+    def _build_payload(
+        self,
+        obj: Team,
+        history: str = 'all',
+        slots: Optional[List[str]] = None,
+        loaded: Optional[TeamLootData] = None,
+    ) -> Dict:
+        """
+        Build the full loot page response for a Team.
+        Doesn't depend on the requesting User, so the result can be cached and shared between every Member of the Team.
+
+        `history` controls how much of the Loot history is included; 'all' of it, the 'latest' page, or 'none'.
+        `slots` limits the gear data to only the given slots, defaulting to all of them.
+        `loaded` can be given if the Team was already loaded by _load_teams, so nothing else needs to be read.
+        """
+        if slots is None:
+            slots = self.ALL_SLOTS
+
+        if loaded is None:
+            self._prefetch_team(obj)
+            # Getting the list of Loot for the current tier is easy
+            objs = Loot.objects.filter(team=obj, tier=obj.tier).select_related('member', 'member__character')
+            outstanding = None
+            received = self._get_received_data(obj)
+        else:
+            objs, outstanding, received = loaded.history, loaded.outstanding, loaded.received
+
+        # Get the gear information from the above hidden function
+        gear = self._get_gear_data(obj, slots, outstanding)
+        gear.update(self._get_history_loot_data(obj, objs, slots))
+
+        # Build and return the response
+        loot_data = {'gear': gear, 'received': received}
+        if history == 'all':
+            loot_data['history'] = LootSerializer(objs, many=True).data
+        elif history == 'latest':
+            # The history is already loaded in the right order, so there's no need to go back to the DB for the page
+            entries = list(objs)
+            page = entries[:LootHistory.DEFAULT_LIMIT]
+            loot_data['history'] = LootSerializer(page, many=True).data
+            loot_data['history_next'] = LootHistory._encode_cursor(page[-1]) if len(entries) > len(page) else None
+
+        team_data = TeamSerializer(obj).data
+        return {'team': team_data, 'loot': loot_data}
+
     @extend_schema(
         tags=['team_loot'],
         responses={
@@ -283,18 +454,7 @@ class LootCollection(APIView):
                 'LootListResponse',
                 {
                     'history': LootSerializer(many=True),
-                    'received': inline_serializer(
-                        'LootReceived',
-                        {
-                            '[member_name: str]': inline_serializer(
-                                'LootReceivedEntry',
-                                {
-                                    'need': serializers.IntegerField(),
-                                    'greed': serializers.IntegerField(),
-                                },
-                            ),
-                        },
-                    ),
+                    'received': ReceivedSerializer,
                     'gear': inline_serializer(
                         'LootGearRequiredResponse',
                         {
@@ -414,74 +574,66 @@ class LootCollection(APIView):
                     )
                 }
             ),
+            304: OpenApiResponse(description='The Team has not changed since the ETag sent in `If-None-Match`.'),
             404: OpenApiResponse(description='The provided Team ID does not refer to a valid Team that the User has a Character in.'),
         },
         operation_id='loot_list',
+        parameters=[
+            OpenApiParameter(
+                'history',
+                str,
+                enum=HISTORY_OPTIONS,
+                description=(
+                    'How much Loot history to include. Defaults to `all`. '
+                    '`latest` includes the first page along with a `history_next` cursor for the history endpoint.'
+                ),
+            ),
+            OpenApiParameter(
+                'fight',
+                str,
+                enum=list(FIGHT_SLOTS),
+                description='Only include gear data for the slots that drop from the given fight.',
+            ),
+            OpenApiParameter(
+                'slots',
+                str,
+                description='Comma separated list of slots to include gear data for. Combined with `fight` if both are sent.',
+            ),
+        ],
     )
     def get(self, request: Request, team_id: str) -> Response:
         """
         Get Loot history and current need/greed status for a team
+
+        Responses include an ETag; sending it back in `If-None-Match` returns a 304 if nothing has changed since.
+        Send `fight` or `slots` to only evaluate the gear data for some slots, which is much cheaper for the per fight view.
         """
         try:
-            obj = Team.objects.select_related(
-                'tier',
-            ).prefetch_related(
-                'members',
-                'members__character',
-                'members__character__bis_lists',
-                'members__bis_list',
-                'members__bis_list__bis_body',
-                'members__bis_list__bis_bracelet',
-                'members__bis_list__bis_earrings',
-                'members__bis_list__bis_feet',
-                'members__bis_list__bis_hands',
-                'members__bis_list__bis_head',
-                'members__bis_list__bis_left_ring',
-                'members__bis_list__bis_legs',
-                'members__bis_list__bis_mainhand',
-                'members__bis_list__bis_necklace',
-                'members__bis_list__bis_offhand',
-                'members__bis_list__bis_right_ring',
-                'members__bis_list__current_body',
-                'members__bis_list__current_bracelet',
-                'members__bis_list__current_earrings',
-                'members__bis_list__current_feet',
-                'members__bis_list__current_hands',
-                'members__bis_list__current_head',
-                'members__bis_list__current_left_ring',
-                'members__bis_list__current_legs',
-                'members__bis_list__current_mainhand',
-                'members__bis_list__current_necklace',
-                'members__bis_list__current_offhand',
-                'members__bis_list__current_right_ring',
-                'members__bis_list__job',
-            ).distinct().get(pk=team_id, members__character__user=request.user)
+            obj = self._get_team(request, team_id)
         except (Team.DoesNotExist, ValidationError):
             return Response(status=404)
 
-        # Getting the list of Loot for the current tier is easy
-        objs = Loot.objects.filter(team=obj, tier=obj.tier)
-        history = LootSerializer(objs, many=True).data
+        history = request.query_params.get('history', 'all')
+        if history not in HISTORY_OPTIONS:
+            history = 'all'
 
-        # Get the gear information from the above hidden function
-        gear = self._get_gear_data(obj)
-        gear.update(self._get_history_loot_data(obj, objs))
-
-        # Calculate the received amounts for users here
-        received = {}
-        for item in objs:
-            if item.member is None:
-                continue
+        slots, errors = self._get_requested_slots(request)
+        if len(errors) > 0:
+            return Response(errors, status=400)
+        selection = 'all' if slots is None else ','.join(slots)
 
-            char_name = item.member.character.display_name
-            received.setdefault(char_name, {'need': 0, 'greed': 0})
-            key = 'greed' if item.greed else 'need'
-            received[char_name][key] += 1
+        # Skip building the page entirely if the client already has the latest version of the data
+        etag = self._get_team_etag(obj, history, selection)
+        if self._etag_matches(request, etag):
+            return self._not_modified(etag)
 
-        # Build and return the response
-        loot_data = {'gear': gear, 'history': history, 'received': received}
-        team_data = TeamSerializer(obj).data
-        return Response({'team': team_data, 'loot': loot_data})
+        # Only the full page and the per fight pages are cached, any other selection of slots is built on demand
+        fight = request.query_params.get('fight', 'all')
+        if 'slots' in request.query_params:
+            payload = self._build_payload(obj, history, slots)
+        else:
+            payload = response_cache.get_or_build(obj, 'loot', lambda: self._build_payload(obj, history, slots), f'{history}:{fight}')
+        return Response(payload, headers={'ETag': etag})
 
     @extend_schema(
         tags=['team_loot'],
@@ -516,6 +668,195 @@ class LootCollection(APIView):
         return Response({'id': serializer.instance.pk}, status=201)
 
 
+class LootHistory(APIView):
+    """
+    Paginated Loot history for the current Tier of a Team
+    """
+
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+
+    @staticmethod
+    def _encode_cursor(loot: Loot) -> str:
+        """
+        Turn the last Loot entry of a page into an opaque cursor pointing at the entries after it
+        """
+        return urlsafe_b64encode(f'{loot.obtained.isoformat()}|{loot.pk}'.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[date, int]:
+        """
+        Turn a cursor back into the (obtained, id) pair it was made from.
+        Raises a ValueError if the cursor wasn't made by `_encode_cursor`.
+        """
+        obtained, pk = urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return date.fromisoformat(obtained), int(pk)
+
+    @staticmethod
+    def _get_page(history: QuerySet, cursor: Optional[str], limit: int) -> Tuple[List[Loot], Optional[str]]:
+        """
+        Get a page of the given history, starting after the given cursor.
+        Filtering on (obtained, id) instead of using an offset keeps every page as cheap as the first one.
+        Returns the page and the cursor for the next one, or None if this is the last page.
+        """
+        if cursor is not None:
+            obtained, pk = LootHistory._decode_cursor(cursor)
+            history = history.filter(Q(obtained__lt=obtained) | Q(obtained=obtained, pk__lt=pk))
+
+        page = list(history.order_by('-obtained', '-id')[:limit + 1])
+        if len(page) <= limit:
+            return page, None
+        page = page[:limit]
+        return page, LootHistory._encode_cursor(page[-1])
+
+    @extend_schema(
+        tags=['team_loot'],
+        parameters=[
+            OpenApiParameter('cursor', str, description='The `next` value from a previous page.'),
+            OpenApiParameter('limit', int, description=f'How many entries to return, up to {MAX_LIMIT}. Defaults to {DEFAULT_LIMIT}.'),
+        ],
+        responses={
+            200: inline_serializer(
+                'LootHistoryResponse',
+                {
+                    'results': LootSerializer(many=True),
+                    'next': serializers.CharField(allow_null=True),
+                },
+            ),
+            304: OpenApiResponse(description='The Team has not changed since the ETag sent in `If-None-Match`.'),
+            400: OpenApiResponse(description='The `cursor` or `limit` parameters were invalid.'),
+            404: OpenApiResponse(description='The provided Team ID does not refer to a valid Team that the User has a Character in.'),
+        },
+        operation_id='loot_history',
+    )
+    def get(self, request: Request, team_id: str) -> Response:
+        """
+        Get a page of the Loot history for the Team's current Tier, newest first.
+
+        Pass the returned `next` value as the `cursor` parameter to get the following page. `next` is null on the last page.
+        """
+        try:
+            obj = Team.objects.select_related('tier').distinct().get(pk=team_id, members__character__user=request.user)
+        except (Team.DoesNotExist, ValidationError):
+            return Response(status=404)
+
+        cursor = request.query_params.get('cursor', None)
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({'limit': ['Please provide a positive whole number.']}, status=400)
+        limit = min(limit, self.MAX_LIMIT)
+
+        etag = self._get_team_etag(obj, 'history', cursor, limit)
+        if self._etag_matches(request, etag):
+            return self._not_modified(etag)
+
+        history = Loot.objects.filter(team=obj, tier=obj.tier).select_related('member', 'member__character')
+        try:
+            page, next_cursor = self._get_page(history, cursor, limit)
+        except ValueError:
+            return Response({'cursor': ['Invalid cursor.']}, status=400)
+
+        data = LootSerializer(page, many=True).data
+        return Response({'results': data, 'next': next_cursor}, headers={'ETag': etag})
+
+
+class LootReceived(APIView):
+    """
+    Just the need / greed counts from the Loot page, without the cost of building the rest of it
+    """
+
+    @extend_schema(
+        tags=['team_loot'],
+        responses={
+            200: ReceivedSerializer,
+            304: OpenApiResponse(description='The Team has not changed since the ETag sent in `If-None-Match`.'),
+            404: OpenApiResponse(description='The provided Team ID does not refer to a valid Team that the User has a Character in.'),
+        },
+        operation_id='loot_received',
+    )
+    def get(self, request: Request, team_id: str) -> Response:
+        """
+        Get the number of need and greed items each Member of the Team has received in the current Tier.
+        """
+        try:
+            obj = Team.objects.select_related('tier').distinct().get(pk=team_id, members__character__user=request.user)
+        except (Team.DoesNotExist, ValidationError):
+            return Response(status=404)
+
+        etag = self._get_team_etag(obj, 'received')
+        if self._etag_matches(request, etag):
+            return self._not_modified(etag)
+
+        return Response(LootCollection._get_received_data(obj), headers={'ETag': etag})
+
+
+class LootOverview(APIView):
+    """
+    Need / greed status for every Team the requesting User has a Character in
+    """
+
+    @extend_schema(
+        tags=['team_loot'],
+        parameters=[
+            OpenApiParameter(
+                'fight',
+                str,
+                enum=list(LootCollection.FIGHT_SLOTS),
+                description='Only include gear data for the slots that drop from the given fight.',
+            ),
+            OpenApiParameter(
+                'slots',
+                str,
+                description='Comma separated list of slots to include gear data for. Combined with `fight` if both are sent.',
+            ),
+        ],
+        responses={
+            200: inline_serializer(
+                'LootOverviewResponse',
+                {
+                    'id': serializers.UUIDField(),
+                    'name': serializers.CharField(),
+                    'gear': serializers.DictField(),
+                    'received': ReceivedSerializer,
+                },
+                many=True,
+            ),
+        },
+        operation_id='loot_overview',
+    )
+    def get(self, request: Request) -> Response:
+        """
+        Get the gear and received data from the loot page for every Team the User is in, in one request.
+        Every Team is loaded together, so the number of queries doesn't grow with the number of Teams.
+        """
+        collection = LootCollection()
+        slots, errors = collection._get_requested_slots(request)
+        if len(errors) > 0:
+            return Response(errors, status=400)
+        if slots is None:
+            slots = LootCollection.ALL_SLOTS
+
+        teams = list(
+            Team.objects.filter(members__character__user=request.user).select_related('tier').order_by('name').distinct(),
+        )
+        loaded = LootCollection._load_teams(teams)
+
+        data = []
+        for team in teams:
+            gear = collection._get_gear_data(team, slots, loaded[team.pk].outstanding)
+            gear.update(collection._get_history_loot_data(team, loaded[team.pk].history, slots))
+            data.append({
+                'id': team.pk,
+                'name': team.name,
+                'gear': gear,
+                'received': loaded[team.pk].received,
+            })
+        return Response(data)
+
+
 class LootDelete(APIView):
 
     @extend_schema(
@@ -555,6 +896,24 @@ class LootWithBIS(APIView):
     Has stricter serializer since it affects two models instead of one
     """
 
+    @staticmethod
+    def _equip_drop(bis: BISList, item: str, tier: Tier):
+        """
+        Update the current gear of the BIS List for the item that dropped, without saving it
+        """
+        # If it's ring, figure out which ring needs to be updated
+        if item == 'ring':
+            if bis.bis_right_ring.name == tier.raid_gear_name:
+                item = 'right_ring'
+            else:
+                item = 'left_ring'
+        # If we just copy bis_item onto current_item that will avoid any checking we have to do :D
+        bis_item = getattr(bis, f'bis_{item}')
+        setattr(bis, f'current_{item}', bis_item)
+        if item == 'mainhand':
+            # Set the offhand as well
+            bis.current_offhand = bis_item
+
     @extend_schema(
         tags=['team_loot'],
         responses={
@@ -601,20 +960,8 @@ class LootWithBIS(APIView):
         else:
             list_id = team.members.get(pk=serializer.validated_data['member_id']).bis_list_id
 
-        item = serializer.validated_data['item']
         bis = BISList.objects.get(pk=list_id)
-        # If it's ring, figure out which ring needs to be updated
-        if item == 'ring':
-            if bis.bis_right_ring.name == team.tier.raid_gear_name:
-                item = 'right_ring'
-            else:
-                item = 'left_ring'
-        # If we just copy bis_item onto current_item that will avoid any checking we have to do :D
-        bis_item = getattr(bis, f'bis_{item}')
-        setattr(bis, f'current_{item}', bis_item)
-        if item == 'mainhand':
-            # Set the offhand as well
-            bis.current_offhand = bis_item
+        self._equip_drop(bis, serializer.validated_data['item'], team.tier)
         bis.save()
 
         # Send a notification
@@ -624,3 +971,83 @@ class LootWithBIS(APIView):
         self._send_to_team(team, {'type': 'loot', 'id': str(team.id)})
 
         return Response({'id': loot.pk}, status=201)
+
+
+class LootClear(APIView):
+    """
+    Record every drop from a single clear at once
+    """
+
+    @extend_schema(
+        tags=['team_loot'],
+        responses={
+            201: OpenApiResponse(
+                response=inline_serializer('LootClearResponse', {'ids': serializers.ListField(child=serializers.IntegerField())}),
+                description='The IDs of the created Loot records, in the same order as the sent drops',
+            ),
+            400: OpenApiResponse(description='One or more of the drops were invalid, errors are returned for each drop.'),
+            404: OpenApiResponse(description='The provided Team ID does not refer to a valid Team that the User has a Character in.'),
+        },
+        request=LootClearSerializer(),
+        operation_id='loot_clear',
+    )
+    def post(self, request: Request, team_id: str) -> Response:
+        """
+        Record every drop from a clear, updating the BIS Lists the same way as sending each drop to the `loot/bis/` endpoint.
+
+        Everything is saved in a single transaction, and once it commits, the Notifications are sent together and the Team
+        receives a single websocket update, instead of one per drop.
+        """
+        team = self._get_team_with_permission(request, team_id, PERMISSION_NAME)
+        if team is None:
+            return Response(status=404)
+
+        serializer = LootClearSerializer(data=request.data, context={'team': team})
+        serializer.is_valid(raise_exception=True)
+        drops = serializer.validated_data['drops']
+
+        # Load every BIS List involved at once, then apply the drops in order as if they were sent one at a time
+        members = team.members.in_bulk({drop['member_id'] for drop in drops})
+        list_ids = [
+            drop['greed_bis_id'] if drop['greed'] else members[drop['member_id']].bis_list_id
+            for drop in drops
+        ]
+        bis_lists = BISList.objects.select_related('owner', 'owner__user', 'owner__user__settings').in_bulk(list_ids)
+        BISList.prefetch_gear(bis_lists.values())
+
+        obtained = datetime.today()
+        loot = []
+        for drop, list_id in zip(drops, list_ids):
+            LootWithBIS._equip_drop(bis_lists[list_id], drop['item'], team.tier)
+            loot.append(Loot(
+                greed=drop['greed'],
+                item=drop['item'],
+                member_id=drop['member_id'],
+                obtained=obtained,
+                team=team,
+                tier=team.tier,
+            ))
+        for bis in bis_lists.values():
+            # Bulk updates skip the pre_save signal, so run the ring check here instead
+            bis_list_ring_swap(BISList, bis)
+
+        owners = {bis.owner_id for bis in bis_lists.values()}
+        with transaction.atomic():
+            created = Loot.objects.bulk_create(loot)
+            BISList.objects.bulk_update(bis_lists.values(), [f'current_{slot}' for slot in gear_masks.SLOTS])
+
+            # Bulk writes also skip the post_save signals that keep the requirements and versions of every affected Team in sync
+            affected = TeamMember.objects.filter(character_id__in=owners)
+            LootRequirement.rebuild(affected, bis_lists.keys())
+            Team.bump_version(set(affected.values_list('team_id', flat=True)) | {team.pk})
+
+            transaction.on_commit(lambda: self._send_clear_updates(team, list(bis_lists.values())))
+
+        return Response({'ids': [obj.pk for obj in created]}, status=201)
+
+    def _send_clear_updates(self, team: Team, bis_lists: List[BISList]):
+        """
+        Send the Notifications for every updated BIS List in one batch, and one update to the Team
+        """
+        notifier.loot_tracker_updates(bis_lists, team)
+        self._send_to_team(team, {'type': 'loot', 'id': str(team.id)})
@@ -6,74 +6,63 @@ Record new loot and update BIS Lists accordingly.
 """
 # stdlib
 from collections import defaultdict, deque
-from copy import deepcopy
-from typing import Dict, List, Tuple, Union
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple, Union
 # lib
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import QuerySet
-from drf_spectacular.utils import inline_serializer
+from django.db.models import F, prefetch_related_objects, QuerySet
+from drf_spectacular.utils import inline_serializer, OpenApiParameter, OpenApiResponse
 from drf_spectacular.views import extend_schema
 from rest_framework import serializers
 from rest_framework.request import Request
 from rest_framework.response import Response
 # local
 from .base import APIView
-from api.models import Gear, Job, Loot, Settings, Team, TeamMember, Tier
+from api import response_cache, solver_checkpoints, solver_jobs
+from api.models import Job, Loot, LootRequirement, Settings, Team, TeamMember
+from api.profiling import profile, profile_requested, Timings
+from api.serializers import LootSolverWhatIfSerializer
+from api.solver import core, History, project, SolverInputs, solve, solve_many
+from api.solver.core import HandoutData, NonLootGear, Payload, PrioBrackets, Projection, Requirements
+from api.tasks import run_loot_solver
 
-Requirements = Dict[str, List[int]]
-PrioBrackets = Dict[int, List[int]]
-HandoutData = Dict[str, Union[str, bool, None]]
-NonLootGear = Dict[int, List[str]]
+JobSerializer = inline_serializer('LootSolverJob', {
+    'job_id': serializers.CharField(),
+    'status': serializers.ChoiceField(choices=solver_jobs.STATUSES),
+})
 
 
 class LootSolver(APIView):
     """
     Solve loot distribution to manage getting through a fight completely as fast as possible.
-    """
 
-    SLOTS = [
-        'mainhand',
-        'head',
-        'body',
-        'hands',
-        'legs',
-        'feet',
-        'earrings',
-        'necklace',
-        'bracelet',
-        'left_ring',
-        'right_ring',
-    ]
-
-    ACCESSORIES = {'earrings', 'necklace', 'bracelet', 'right_ring', 'left_ring'}
-
-    ARMOUR = {'head', 'body', 'hands', 'legs', 'feet'}
-
-    FIRST_FLOOR_SLOTS = ['earrings', 'necklace', 'bracelet', 'ring']
-    SECOND_FLOOR_SLOTS = ['head', 'hands', 'feet', 'tome-accessory-augment']
-    THIRD_FLOOR_SLOTS = ['body', 'legs', 'tome-armour-augment', ]
-    FIRST_FLOOR_TOKENS = 3
-    SECOND_FLOOR_TOKENS = 3
-    THIRD_FLOOR_TOKENS = 4
+    The algorithm itself lives in api.solver.core and works on plain values, this view reads a Team into those values.
+    """
 
-    @staticmethod
-    def _get_current_member_priority(prio_brackets: PrioBrackets, member_id: int) -> int:
-        """
-        Find what priority the given member has in the given prio brackets.
-        Returns 0 if they are not in the prio brackets
-        """
-        for prio, members in prio_brackets.items():
-            if member_id in members:
-                return prio
-        return 0
+    FIRST_FLOOR_SLOTS = core.FIRST_FLOOR_SLOTS
+    SECOND_FLOOR_SLOTS = core.SECOND_FLOOR_SLOTS
+    THIRD_FLOOR_SLOTS = core.THIRD_FLOOR_SLOTS
+    FIRST_FLOOR_TOKENS = core.FIRST_FLOOR_TOKENS
+    SECOND_FLOOR_TOKENS = core.SECOND_FLOOR_TOKENS
+    THIRD_FLOOR_TOKENS = core.THIRD_FLOOR_TOKENS
 
     @staticmethod
-    def _get_team_solver_sort_order(team: Team) -> List[int]:
+    def _get_team_solver_sort_order(
+        team: Team,
+        overrides: Optional[Dict[str, int]] = None,
+        default_order: Optional[List[str]] = None,
+    ) -> List[int]:
         """
         Given a Team, apply their solver sort overrides to the default list, then turn that new list into a list of member IDs.
+        Other overrides can be given to see what order they would produce, without changing the Team.
+        The default Job order can be passed in if it has already been read for a batch of Teams.
         """
-        overrides = team.solver_sort_overrides
-        remaining_default_order = deque(Job.get_in_solver_order().exclude(id__in=overrides).values_list('id', flat=True))
+        if overrides is None:
+            overrides = team.solver_sort_overrides
+        if default_order is None:
+            remaining_default_order = deque(Job.get_in_solver_order().exclude(id__in=overrides).values_list('id', flat=True))
+        else:
+            remaining_default_order = deque(job_id for job_id in default_order if job_id not in overrides)
         positions = {v - 1: k for k, v in overrides.items()}
         total_jobs = len(overrides) + len(remaining_default_order)
         job_order = deque()
@@ -91,97 +80,44 @@ class LootSolver(APIView):
         return sorted(member_jobs, key=lambda member_id: job_order.index(member_jobs[member_id]))
 
     @staticmethod
-    def _get_requirements_map(team: Team) -> Requirements:
+    def _get_requirements_map(team: Team, rows: Optional[List[Tuple[int, str]]] = None) -> Requirements:
         """
-        Scan the team's loot info and build a map of { item: [ids, of, people, who, need, it] }
+        Read the team's stored loot requirements and build a map of { item: [ids, of, people, who, need, it] }
         Note that this method builds up the overall map. The items already handed out are filtered out by _get_floor_data!
+        The (member_id, item) rows can be passed in if they have already been read for a batch of Teams.
         """
-        # Build the mapping of who needs what so we can pass that to the functions
-        tier: Tier = team.tier
+        # Rows come back in slot order per member, so a stable sort by the team's member order is all that is needed
+        member_order = {member.id: index for index, member in enumerate(team.members.all())}
+        if rows is None:
+            rows = LootRequirement.objects.filter(team=team, need=True).exclude(item='').values_list('member_id', 'item')
+
         requirements: Requirements = defaultdict(list)
-        for member in team.members.all():
-            for slot_name in LootSolver.SLOTS:
-                required_slot = slot_name if '_ring' not in slot_name else 'ring'
-                bis_slot: Gear = getattr(member.bis_list, f'bis_{slot_name}')
-
-                if bis_slot.name == tier.raid_gear_name:
-                    requirements[required_slot].append(member.id)
-                elif bis_slot.name == tier.tome_gear_name:
-                    # Check what augment item is needed
-                    if slot_name in LootSolver.ARMOUR:
-                        token = 'tome-armour-augment'
-                    elif slot_name in LootSolver.ACCESSORIES:
-                        token = 'tome-accessory-augment'
-                    else:
-                        # Shouldn't happen since mainhand bis will ALWAYS be raid weapon
-                        continue
-                    requirements[token].append(member.id)
+        for member_id, item in sorted(rows, key=lambda row: member_order[row[0]]):
+            requirements[item].append(member_id)
         return requirements
 
     @staticmethod
-    def _generate_priority_brackets(requirements: Requirements, id_ordering: List[int]) -> PrioBrackets:
+    def _get_history(history: QuerySet[Loot]) -> History:
         """
-        Given the requirements found by the above function, generate a new dictionary that gives priority brackets for items.
-        This will be used by the individual floor functions that will want to use it on subsets of the overall requirements map.
+        Load a Loot history QuerySet into the columns the solver reads from, with a single query
         """
-        # Firstly, turn data into map of ids to how many items they need
-        items_needed = defaultdict(int)
-        for ids in requirements.values():
-            for id in ids:
-                items_needed[id] += 1
-
-        # Turn this into our prio bracket: name list with names sorted in required order
-        prio_brackets = defaultdict(list)
-        ordered_ids = sorted(items_needed, key=lambda id: id_ordering.index(id))
-        for ids in ordered_ids:
-            needed = items_needed[ids]
-            prio_brackets[needed].append(ids)
+        return History.from_rows(history.order_by('obtained', 'id').values_list('obtained', 'item', 'member_id', 'greed'))
 
-        return dict(prio_brackets)
+    @staticmethod
+    def _generate_priority_brackets(requirements: Requirements, id_ordering: List[int]) -> PrioBrackets:
+        return core.generate_priority_brackets(requirements, id_ordering)
 
     @staticmethod
-    def _get_gear_not_obtained_from_drops(tier: Tier, members: List[TeamMember], history: QuerySet[Loot]) -> NonLootGear:
+    def _get_gear_not_obtained_from_drops(members: List[TeamMember], history: Union[QuerySet[Loot], History]) -> NonLootGear:
         """
         Check for each Member in the Team for any loot they received that wasn't through drops
         """
-        history_info = history.values_list('member_id', 'item')
-        loot_gear = defaultdict(list)
-        for (member_id, item) in history_info:
-            loot_gear[member_id].append(item)
-
-        non_loot_gear: Dict[int, List[str]] = {}
-        for member in members:
-            member_bis_gear = []
-            for slot_name in LootSolver.SLOTS:
-                required_slot = slot_name if '_ring' not in slot_name else 'ring'
-                bis_slot: Gear = getattr(member.bis_list, f'bis_{slot_name}')
-                current_slot: Gear = getattr(member.bis_list, f'current_{slot_name}')
-
-                if bis_slot.id != current_slot.id:
-                    continue
-
-                if bis_slot.name == tier.raid_gear_name:
-                    member_bis_gear.append(required_slot)
-                elif bis_slot.name == tier.tome_gear_name:
-                    # Check what augment item is needed
-                    if slot_name in LootSolver.ARMOUR:
-                        token = 'tome-armour-augment'
-                    elif slot_name in LootSolver.ACCESSORIES:
-                        token = 'tome-accessory-augment'
-                    else:
-                        # Shouldn't happen since mainhand bis will ALWAYS be raid weapon
-                        continue
-                    member_bis_gear.append(token)
-
-            # Remove the stuff they got through the history
-            for history_item in loot_gear[member.id]:
-                try:
-                    member_bis_gear.remove(history_item)
-                except ValueError:
-                    # They haven't updated their list ;-;
-                    pass
-            non_loot_gear[member.id] = member_bis_gear
-        return non_loot_gear
+        if isinstance(history, QuerySet):
+            history = LootSolver._get_history(history)
+
+        # Any requirement where the BIS item is already equipped has been obtained one way or another
+        obtained = LootRequirement.objects.filter(member__in=members, need=True, bis_equipped=True).exclude(item='')
+        return core.non_loot_gear([member.id for member in members], history, obtained.values_list('member_id', 'item'))
 
     @staticmethod
     def _get_floor_data(
@@ -191,369 +127,137 @@ class LootSolver(APIView):
         id_order: List[int],
         non_loot_gear: NonLootGear,
     ) -> Tuple[int, PrioBrackets, Requirements]:
-        """
-        Turn a requirements map and history into the priority bracket information, along with how many clears have already been recorded for the fight.
-        Also generate and return the updated Requirements from the Loot History
-        """
-        # Limit floor requirements to the items that were important, then remove from this list as we update the prios below
-        floor_requirements = {
-            slot: deepcopy(requirements.get(slot, []))
-            for slot in slots
-        }
-        relevant_history = history.filter(item__in=slots).order_by('obtained')
-        clears = len({item.obtained for item in relevant_history})
-        prio_brackets = LootSolver._generate_priority_brackets(floor_requirements, id_order)
-
-        # Sim through the existing clear data and update prio brackets with how things have evolved in the past
-        history_data: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
-        for item in relevant_history:
-            # Use a list so we can potentially handle split clears?
-            history_data[item.obtained][item.item].append(item.member_id)
-
-        for obtained in history_data:
-            for slot in slots:
-                for member_id in history_data[obtained].get(slot, []):
-                    # move the receiver of the item down one bracket, making a new one if you have to
-                    for priority in sorted(prio_brackets, reverse=True):
-                        try:
-                            prio_brackets[priority].remove(member_id)
-                            try:
-                                floor_requirements[slot].remove(member_id)
-                            except ValueError:
-                                pass
-                            if prio_brackets[priority] == []:
-                                prio_brackets.pop(priority)
-
-                            # Sanity Check; don't add 0 prio (or anything lower) to the list
-                            new_prio = priority - 1
-                            if new_prio <= 0:
-                                continue
-
-                            if new_prio not in prio_brackets:
-                                prio_brackets[new_prio] = [member_id]
-                            else:
-                                prio_brackets[new_prio].append(member_id)
-                            break
-                        except ValueError:
-                            # If they're not in the prio bracket at this prio just keep going
-                            continue
-
-        # Also check loot not tracked in the history
-        for member_id in id_order:
-            # Go through the slots, if they're in the requirements map, remove the user from them and move them down a prio
-            for non_loot_item in non_loot_gear.get(member_id, []):
-                if non_loot_item not in floor_requirements:
-                    continue
-
-                for priority in sorted(prio_brackets, reverse=True):
-                    try:
-                        prio_brackets[priority].remove(member_id)
-                        try:
-                            floor_requirements[non_loot_item].remove(member_id)
-                        except ValueError:
-                            pass
-
-                        if prio_brackets[priority] == []:
-                            prio_brackets.pop(priority)
-
-                        # Sanity Check; don't add 0 prio (or anything lower) to the list
-                        new_prio = priority - 1
-                        if new_prio <= 0:
-                            continue
-
-                        if new_prio not in prio_brackets:
-                            prio_brackets[new_prio] = [member_id]
-                        else:
-                            prio_brackets[new_prio].append(member_id)
-                        break
-                    except ValueError:
-                        # If they're not in the prio bracket at this prio just keep going
-                        continue
-
-        # Remove the 0 key
-        prio_brackets.pop(0, None)
-        return clears, prio_brackets, floor_requirements
+        return core.floor_data(requirements, LootSolver._get_history(history), slots, id_order, non_loot_gear)
 
     @staticmethod
-    def _get_output_slot_name(slot: str) -> str:
-        return slot.replace('-', ' ').title()
+    def _get_handout_data(slots: List[str], requirements: Requirements, prio_brackets: PrioBrackets, weeks_per_token: int, weeks: int, greedy: bool = False) -> List[HandoutData]:
+        return core.handout_data(slots, requirements, prio_brackets, weeks_per_token, weeks, greedy, settings.LOOT_SOLVER_KERNEL)
 
     @staticmethod
-    def _get_handout_data(slots: List[str], requirements: Requirements, prio_brackets: PrioBrackets, weeks_per_token: int, weeks: int, greedy: bool = False) -> List[HandoutData]:
-        """
-        Do the algorithm for gathering handout information
-        """
-        handouts = []
-        remove_slots = slots.copy()
-
-        # Deepcopy passed dicts for Sentry debugging
-        prio_brackets = deepcopy(prio_brackets)
-        requirements = deepcopy(requirements)
-
-        if 'augment' in slots[-1]:
-            remove_slots = [remove_slots[-1]]
-        while len(prio_brackets) > 0:
-            weeks += 1
-            week_data = {}
-
-            # Check what items we no longer need this week and add them to the handout info
-            for slot, needs in requirements.items():
-                if len(needs) == 0:
-                    week_data[LootSolver._get_output_slot_name(slot)] = None
-
-            # Build up a map of who is needed to sort every required item for the week
-            required_slots_for_week = set(slot for slot in requirements if LootSolver._get_output_slot_name(slot) not in week_data)
-            needed_item_count = len(required_slots_for_week)
-
-            # Loop through the people in priority order, populating a map of who needs what until all of the required items for the week are covered
-            # This ensures each item is given to the person with the highest priority of getting it
-            done = False
-            potential_loot_members: Dict[int, List[str]] = {}
-            # Skip repeated single item lists
-            single_item_entries = set()
-            for priority in sorted(prio_brackets, reverse=True):
-                for member_id in prio_brackets[priority]:
-                    required = [slot for slot in requirements if member_id in requirements[slot]]
-
-                    if len(required) == 1:
-                        if required[0] in single_item_entries:
-                            continue
-                        single_item_entries.add(required[0])
-
-                    potential_loot_members[member_id] = required
-                    # Subtract from the set of things needed this week
-                    required_slots_for_week -= set(required)
-
-                    # Check that we have enough potential members to cover each available item
-                    if len(potential_loot_members) >= needed_item_count and len(required_slots_for_week) == 0:
-                        done = True
-                        break
-                if done:
-                    break
-
-            # If we have less characters than items, we can re-add people back to the dictionary after we remove them to cycle around properly
-            re_insert = len(potential_loot_members) < needed_item_count
-
-            # At this point, we have a mapping of potential member_ids to the items they still need this week.
-            # It has the minimum required amount of people such that every Need item can be handed out to someone.
-            # Now we determine who actually gets what
-            # There is a 3 step priority system to sorting out handouts;
-            # 1 - Anyone who has only one potential item
-            # 2 - Anyone who is the only person who needs a given item
-            # 3 - Go down the list from highest to lowest priority and just give them one of the needed items
-            # Whenever we give someone an item, we remove them from the potential list, remove their item from everyone elses'
-            # If anyone gets reduced to 1 item left, they get added to the queue
-            handout_queue = deque()
-
-            # Handle the two special cases first
-            # 1 - Anyone who only has 1 item they can get
-            for member_id, member_items in potential_loot_members.items():
-                if len(member_items) == 1:
-                    handout_queue.append((member_id, member_items[0]))
-
-            # 2 - Anyone who has a unique item in their list
-            for member_id, member_items in potential_loot_members.items():
-                member_items_set = set(member_items)
-                other_set = set()
-                for other_member_id, other_member_items in potential_loot_members.items():
-                    if member_id == other_member_id:
-                        continue
-                    other_set |= set(other_member_items)
-
-                uniques = member_items_set - other_set
-                for unique_item in uniques:
-                    handout_queue.append((member_id, unique_item))
-
-            # Loop until we get all the requirements
-            while len(week_data) < len(requirements) and (len(potential_loot_members) > 0 or len(handout_queue) > 0):
-                # Check if we've already had someone in the handout queue, if not we get the first id and item
-                if len(handout_queue) > 0:
-                    member_id, item = handout_queue.popleft()
-                else:
-                    member_id = list(potential_loot_members)[0]
-                    member_items = potential_loot_members.get(member_id, [])
-                    if len(member_items) == 0:
-                        # Remove the member and re-loop
-                        potential_loot_members.pop(member_id, None)
-                        continue
-                    item = member_items[0]
-
-                # Attempt to give this item to the chosen member, if it's not already in the week's data
-                output_item_name = LootSolver._get_output_slot_name(item)
-                if output_item_name in week_data:
-                    continue
-
-                # Check if we're already at the end of needing to assign loot
-                member_items_left = LootSolver._get_current_member_priority(prio_brackets, member_id)
-                if greedy and weeks % weeks_per_token == 0 and item in remove_slots and member_items_left <= 1:
-                    week_data[output_item_name] = None
-                    continue
-
-                # At this point, the item is guaranteed to go to this person
-                week_data[output_item_name] = member_id
-                requirements[item].remove(member_id)
-
-                # Reduce the requirement number of the person and add them to the end of the list
-                prio = None
-                for check_prio, names in prio_brackets.items():
-                    if member_id in names:
-                        prio = check_prio
-                        break
-                new_prio = prio - 1
-                prio_brackets[prio].remove(member_id)
-                if prio_brackets[prio] == []:
-                    # If this empties the list, destroy it
-                    prio_brackets.pop(check_prio, None)
-                if new_prio > 0:
-                    # If the assignee's new prio (number of items they need) isn't 0, add them to the lower prio
-                    if new_prio not in prio_brackets:
-                        prio_brackets[new_prio] = []
-                    prio_brackets[new_prio].append(member_id)
-
-                # Now we need to remove the member_id from potentials and remove the item from the popped list in case we need to re-insert
-                removed = potential_loot_members.pop(member_id, [])
-                try:
-                    removed.remove(item)
-                except ValueError:
-                    pass
-
-                # Now remove the item from everyone else, and check for any now-unique items
-                for other_member_id, other_member_items in potential_loot_members.items():
-                    try:
-                        other_member_items.remove(item)
-                        if len(other_member_items) == 1:
-                            # Put the person and their item into the queue
-                            handout_queue.append((other_member_id, other_member_items[0]))
-                    except ValueError:
-                        # If the item isn't in the list, that's fine
-                        pass
-
-                    # Also recalc if someone now has a unique item that they should get
-                    member_items_set = set(other_member_items)
-                    other_set = set()
-                    for other_other_member_id, other_other_member_items in potential_loot_members.items():
-                        if other_member_id == other_other_member_id:
-                            continue
-                        other_set |= set(other_other_member_items)
-                    uniques = member_items_set - other_set
-                    for unique_item in uniques:
-                        handout_queue.append((other_member_id, unique_item))
-
-                # Then do some checking if we need to re_insert the popped member
-                if re_insert:
-                    # Put them back in the dictionary because dictionary keys are ordered by insertion time
-                    potential_loot_members[member_id] = removed
-
-            # Add the week data to the handouts list
-            handouts.append(week_data)
-
-            # Lastly, if weeks % token_count == 0, reduce everyone's requirement by 1 if they can buy an item
-            if weeks % weeks_per_token == 0:
-                # Find the members that can buy something and track what they can buy
-                member_purchases = {}
-                for remove_prio in sorted(prio_brackets, reverse=True):
-                    member_ids = prio_brackets[remove_prio]
-                    for member_id in member_ids:
-                        for slot in remove_slots:
-                            if member_id in requirements[slot] and member_id not in member_purchases:
-                                member_purchases[member_id] = slot
-
-                for purchaser_id, slot in member_purchases.items():
-                    # Remove the purchaser_id from the item requirements, reduce their priority by one
-                    requirements[slot].remove(purchaser_id)
-                    for remove_prio in sorted(prio_brackets):
-                        if purchaser_id in prio_brackets[remove_prio]:
-                            prio_brackets[remove_prio].remove(purchaser_id)
-                            try:
-                                prio_brackets[remove_prio - 1].append(purchaser_id)
-                            except KeyError:
-                                prio_brackets[remove_prio - 1] = [purchaser_id]
-                            break
-
-                # Remove 0 key, and any empty lists
-                prio_brackets.pop(0, None)
-                for priority in list(prio_brackets.keys()):
-                    if prio_brackets[priority] == []:
-                        prio_brackets.pop(priority, None)
-                week_data['token'] = True
-            else:
-                week_data['token'] = False
+    def _get_first_floor_data(requirements: Requirements, history: QuerySet[Loot], id_order: List[int], non_loot_gear_obtained: NonLootGear, greedy: bool = False) -> List[HandoutData]:
+        return core.floor_handouts(
+            'first_floor', requirements, LootSolver._get_history(history), id_order, non_loot_gear_obtained, greedy, kernel=settings.LOOT_SOLVER_KERNEL,
+        )
 
-        return handouts
+    @staticmethod
+    def _get_second_floor_data(requirements: Requirements, history: QuerySet[Loot], id_order: List[int], non_loot_gear_obtained: NonLootGear, greedy: bool = False) -> List[HandoutData]:
+        return core.floor_handouts(
+            'second_floor', requirements, LootSolver._get_history(history), id_order, non_loot_gear_obtained, greedy, kernel=settings.LOOT_SOLVER_KERNEL,
+        )
 
     @staticmethod
-    def _get_first_floor_data(
-        requirements: Requirements,
-        history: QuerySet[Loot],
-        id_order: List[int],
-        non_loot_gear_obtained: NonLootGear,
-        greedy: bool = False,
-    ) -> List[HandoutData]:
-        """
-        Simulate handing out the loot for a first floor clear.
-        """
-        weeks, prio_brackets, floor_requirements = LootSolver._get_floor_data(
-            requirements,
-            history,
-            LootSolver.FIRST_FLOOR_SLOTS,
-            id_order,
-            non_loot_gear_obtained,
+    def _get_third_floor_data(requirements: Requirements, history: QuerySet[Loot], id_order: List[int], non_loot_gear_obtained: NonLootGear, greedy: bool = False) -> List[HandoutData]:
+        return core.floor_handouts(
+            'third_floor', requirements, LootSolver._get_history(history), id_order, non_loot_gear_obtained, greedy, kernel=settings.LOOT_SOLVER_KERNEL,
         )
-        return LootSolver._get_handout_data(LootSolver.FIRST_FLOOR_SLOTS, floor_requirements, prio_brackets, LootSolver.FIRST_FLOOR_TOKENS, weeks, greedy)
 
     @staticmethod
-    def _get_second_floor_data(
-        requirements: Requirements,
-        history: QuerySet[Loot],
-        id_order: List[int],
-        non_loot_gear_obtained: NonLootGear,
-        greedy: bool = False,
-    ) -> List[HandoutData]:
+    def _get_inputs(obj: Team, greedy: bool, phase: Callable[[str], ContextManager] = core.untimed) -> SolverInputs:
         """
-        Simulate handing out the loot for a second floor clear.
+        Read everything the solver needs to know about a Team, with each part read inside `phase(name)`
         """
-        weeks, prio_brackets, floor_requirements = LootSolver._get_floor_data(
-            requirements,
-            history,
-            LootSolver.SECOND_FLOOR_SLOTS,
-            id_order,
-            non_loot_gear_obtained,
+        with phase('members'):
+            prefetch_related_objects([obj], 'members', 'members__bis_list', 'members__bis_list__job')
+
+        # Gather the loot details for the Team so far so we can calculate things like mounts needed or how many clears have already happened
+        with phase('history'):
+            history = LootSolver._get_history(Loot.objects.filter(team=obj, tier=obj.tier))
+        with phase('requirements'):
+            requirements = LootSolver._get_requirements_map(obj)
+        with phase('sort_order'):
+            id_order = LootSolver._get_team_solver_sort_order(obj)
+        # Determine what items were obtained by each member outside of drops from a fight (purchased / obtained elsewhere)
+        with phase('non_loot_gear'):
+            non_loot_gear = LootSolver._get_gear_not_obtained_from_drops(obj.members.all(), history)
+
+        return SolverInputs(
+            requirements=requirements,
+            history=history,
+            id_order=id_order,
+            non_loot_gear=non_loot_gear,
+            greedy=greedy,
+            tier_id=obj.tier_id,
         )
-        return LootSolver._get_handout_data(LootSolver.SECOND_FLOOR_SLOTS, floor_requirements, prio_brackets, LootSolver.SECOND_FLOOR_TOKENS, weeks, greedy)
 
     @staticmethod
-    def _get_third_floor_data(
-        requirements: Requirements,
-        history: QuerySet[Loot],
-        id_order: List[int],
-        non_loot_gear_obtained: NonLootGear,
-        greedy: bool = False,
-    ) -> List[HandoutData]:
+    def _get_inputs_for_teams(teams: List[Team], greedy: bool) -> Dict[str, SolverInputs]:
         """
-        Simulate handing out the loot for a third floor clear.
+        Read the solver inputs for several Teams at once, keyed by Team id, giving the same inputs as _get_inputs.
+        Every Team is read together, so the number of queries doesn't grow with the number of Teams.
         """
-        weeks, prio_brackets, floor_requirements = LootSolver._get_floor_data(
-            requirements,
-            history,
-            LootSolver.THIRD_FLOOR_SLOTS,
-            id_order,
-            non_loot_gear_obtained,
-        )
-        return LootSolver._get_handout_data(LootSolver.THIRD_FLOOR_SLOTS, floor_requirements, prio_brackets, LootSolver.THIRD_FLOOR_TOKENS, weeks, greedy)
+        prefetch_related_objects(teams, 'members', 'members__bis_list', 'members__bis_list__job')
+        default_order = list(Job.get_in_solver_order().values_list('id', flat=True))
+
+        history_rows: Dict[str, list] = {team.pk: [] for team in teams}
+        history = Loot.objects.filter(team__in=teams, tier_id=F('team__tier_id')).order_by('obtained', 'id')
+        for team_id, *row in history.values_list('team_id', 'obtained', 'item', 'member_id', 'greed'):
+            history_rows[team_id].append(row)
+
+        # Both the requirements and the gear obtained outside of drops come from the needed rows
+        requirement_rows: Dict[str, List[Tuple[int, str]]] = {team.pk: [] for team in teams}
+        obtained_rows: Dict[str, List[Tuple[int, str]]] = {team.pk: [] for team in teams}
+        rows = LootRequirement.objects.filter(team__in=teams, need=True).exclude(item='')
+        for team_id, member_id, item, bis_equipped in rows.values_list('team_id', 'member_id', 'item', 'bis_equipped'):
+            requirement_rows[team_id].append((member_id, item))
+            if bis_equipped:
+                obtained_rows[team_id].append((member_id, item))
+
+        inputs = {}
+        for team in teams:
+            team_history = History.from_rows(history_rows[team.pk])
+            member_ids = [member.id for member in team.members.all()]
+            inputs[team.pk] = SolverInputs(
+                requirements=LootSolver._get_requirements_map(team, requirement_rows[team.pk]),
+                history=team_history,
+                id_order=LootSolver._get_team_solver_sort_order(team, default_order=default_order),
+                non_loot_gear=core.non_loot_gear(member_ids, team_history, obtained_rows[team.pk]),
+                greedy=greedy,
+                tier_id=team.tier_id,
+            )
+        return inputs
 
     @staticmethod
-    def _get_fourth_floor_data(history: QuerySet[Loot], team_size: int, non_loot_gear_obtained: NonLootGear) -> HandoutData:
+    def _build_payload(
+        obj: Team,
+        greedy: bool,
+        phase: Callable[[str], ContextManager] = core.untimed,
+        shared: bool = True,
+        inputs: Optional[SolverInputs] = None,
+    ) -> Payload:
         """
-        Simulate handing out the loot for a fourth floor clear.
-        Different from how the others are handled, because we just check how many people already have bis weapon, and also how many mounts have been obtained.
+        Run the full Loot Solver for a Team.
+        Only depends on the Team and the greed setting, so the result can be cached and shared between Members with the same setting.
+        Each part of the solve runs inside `phase(name)`, and `shared=False` solves again even if the result is already cached.
+        `inputs` can be given if they have already been read for the Team.
         """
-        weapons_obtained = history.filter(item='mainhand', greed=False).count()
-        non_loot_weapons = len([member_id for member_id in non_loot_gear_obtained if 'mainhand' in non_loot_gear_obtained[member_id]])
-        mounts_obtained = history.filter(item='mount').count()
-        return {
-            'weapons': team_size - weapons_obtained - non_loot_weapons,
-            'mounts': team_size - mounts_obtained,
-        }
+        if inputs is None:
+            inputs = LootSolver._get_inputs(obj, greedy, phase)
+
+        def build() -> Payload:
+            # Only replay the history recorded since the Team's last checkpoint on each floor
+            with phase('checkpoints'):
+                checkpoints = solver_checkpoints.get(obj.pk)
+            payload = solve(inputs, checkpoints, settings.LOOT_SOLVER_KERNEL, phase)
+            with phase('checkpoints'):
+                solver_checkpoints.save(obj.pk, checkpoints)
+            return payload
+
+        if not shared:
+            return build()
+
+        # Skipped entirely if any Team has already run the solver with exactly the same inputs
+        return response_cache.get_or_build_shared('solver_inputs', inputs.fingerprint(), build)
+
+    def _start_job(self, obj: Team, greedy: bool) -> Response:
+        """
+        Start a background run of the solver for the Team's current inputs, unless one is already running or done
+        """
+        job_id = self._get_inputs(obj, greedy).fingerprint()
+        if solver_jobs.start(obj.pk, job_id):
+            run_loot_solver.delay(str(obj.pk), greedy, job_id)
+
+        job = solver_jobs.get(obj.pk, job_id) or {'status': solver_jobs.PENDING}
+        return Response({'job_id': job_id, 'status': job['status']}, status=202)
 
     @extend_schema(
         tags=['team_loot'],
@@ -593,8 +297,24 @@ class LootSolver(APIView):
                         },
                     ),
                 }
-            )
+            ),
+            202: JobSerializer,
+            304: OpenApiResponse(description='The Team has not changed since the ETag sent in `If-None-Match`.'),
         },
+        parameters=[
+            OpenApiParameter(
+                'async',
+                int,
+                enum=[1],
+                description='Run the solver in the background, returning a job to poll instead of the result.',
+            ),
+            OpenApiParameter(
+                'profile',
+                int,
+                enum=[1],
+                description='Staff only. Solve without the caches and save a cProfile of the solve on the server.',
+            ),
+        ],
         operation_id='run_loot_solver',
     )
     def get(self, request: Request, team_id: str) -> Response:
@@ -606,70 +326,237 @@ class LootSolver(APIView):
 
         For the first three floors, each slot will have a list of TeamMember IDs in the order you should hand them out.
         For the final fight, it simply returns the number of Weapons and Mounts required.
+
+        Responses include an ETag; sending it back in `If-None-Match` returns a 304 if nothing has changed since.
+        They also include a Server-Timing header with the time taken and queries made by each phase of the solve.
+        Staff can send `profile=1` to skip the caches and write a cProfile of the solve to the server's profile
+        directory, with the file named in the `X-Solver-Profile` header.
+
+        Sending `async=1` runs the solver in the background instead, returning a 202 with the job's id.
+        Asking again while the same job exists returns that job rather than starting another.
+        The Team's websocket group is told when it finishes, and the result can be polled from the job endpoint.
         """
         try:
-            obj = Team.objects.select_related(
-                'tier',
-            ).prefetch_related(
-                'members',
-                'members__bis_list',
-                'members__bis_list__bis_body',
-                'members__bis_list__bis_bracelet',
-                'members__bis_list__bis_earrings',
-                'members__bis_list__bis_feet',
-                'members__bis_list__bis_hands',
-                'members__bis_list__bis_head',
-                'members__bis_list__bis_left_ring',
-                'members__bis_list__bis_legs',
-                'members__bis_list__bis_mainhand',
-                'members__bis_list__bis_necklace',
-                'members__bis_list__bis_offhand',
-                'members__bis_list__bis_right_ring',
-                'members__bis_list__current_body',
-                'members__bis_list__current_bracelet',
-                'members__bis_list__current_earrings',
-                'members__bis_list__current_feet',
-                'members__bis_list__current_hands',
-                'members__bis_list__current_head',
-                'members__bis_list__current_left_ring',
-                'members__bis_list__current_legs',
-                'members__bis_list__current_mainhand',
-                'members__bis_list__current_necklace',
-                'members__bis_list__current_offhand',
-                'members__bis_list__current_right_ring',
-                'members__bis_list__job',
-            ).distinct().get(pk=team_id, members__character__user=request.user)
+            obj = Team.objects.select_related('tier').distinct().get(pk=team_id, members__character__user=request.user)
         except (Team.DoesNotExist, ValidationError):
             return Response(status=404)
 
-        id_ordering = self._get_team_solver_sort_order(obj)
+        try:
+            greedy = request.user.settings.loot_solver_greed
+        except Settings.DoesNotExist:
+            greedy = False
 
-        # Generate the requirements map for the Team
-        requirements = self._get_requirements_map(obj)
+        # The greed setting changes the output, so it is part of the ETag alongside the Team's version
+        etag = self._get_team_etag(obj, int(greedy))
+        if self._etag_matches(request, etag):
+            return self._not_modified(etag)
 
-        # Gather the loot details for the Team so far so we can calculate things like mounts needed or how many clears have already happened
-        history = Loot.objects.filter(team=obj, tier=obj.tier)
+        if request.query_params.get('async') == '1':
+            return self._start_job(obj, greedy)
+
+        variant = 'greedy' if greedy else 'standard'
+        timings = Timings()
+        profiling = profile_requested(request)
+        headers = {'ETag': etag}
+        try:
+            with timings.phase('total'):
+                if profiling:
+                    # Profiles are only useful if the solver actually runs, so skip the caches
+                    with profile(f'solver-{obj.pk}') as profiled:
+                        payload = self._build_payload(obj, greedy, timings.phase, shared=False)
+                else:
+                    payload = response_cache.get_or_build(obj, 'solver', lambda: self._build_payload(obj, greedy, timings.phase), variant)
+        except TypeError:
+            return Response(status=400)
+
+        headers['Server-Timing'] = timings.header()
+        if profiling:
+            headers['X-Solver-Profile'] = profiled['file']
+        return Response(payload, headers=headers)
 
-        # Determine what items were obtained by each member outside of drops from a fight (purchased / obtained elsewhere)
-        non_loot_gear_obtained = self._get_gear_not_obtained_from_drops(obj.tier, obj.members.all(), history)
 
-        # Run the four functions  gather them all up and build up a map for the response
+class LootSolverJob(APIView):
+    """
+    Poll a background run of the Loot Solver
+    """
+
+    @extend_schema(
+        tags=['team_loot'],
+        responses={
+            200: inline_serializer('LootSolverJobResult', {
+                'job_id': serializers.CharField(),
+                'status': serializers.ChoiceField(choices=solver_jobs.STATUSES),
+                'payload': serializers.DictField(required=False),
+            }),
+        },
+        operation_id='get_loot_solver_job',
+    )
+    def get(self, request: Request, team_id: str, job_id: str) -> Response:
+        """
+        Get the status of a background Loot Solver run for the specified Team.
+        Once it's done, `payload` holds the same result the Loot Solver returns.
+        """
+        try:
+            obj = Team.objects.distinct().get(pk=team_id, members__character__user=request.user)
+        except (Team.DoesNotExist, ValidationError):
+            return Response(status=404)
+
+        job = solver_jobs.get(obj.pk, job_id)
+        if job is None:
+            return Response(status=404)
+        return Response({'job_id': job_id, **job})
+
+
+class LootSolverProjection(APIView):
+    """
+    Project the week each Member of a Team finishes gearing
+    """
+
+    @extend_schema(
+        tags=['team_loot'],
+        responses={
+            200: inline_serializer('LootSolverProjection', {
+                'weeks_to_finish': serializers.IntegerField(),
+                'floors': inline_serializer('LootSolverProjectionFloors', {
+                    'first_floor': serializers.IntegerField(),
+                    'second_floor': serializers.IntegerField(),
+                    'third_floor': serializers.IntegerField(),
+                    'fourth_floor': serializers.IntegerField(),
+                }),
+                'members': inline_serializer(
+                    'LootSolverProjectionMember',
+                    {
+                        'member_id': serializers.IntegerField(),
+                        'weeks': serializers.DictField(child=serializers.IntegerField()),
+                        'finished_week': serializers.IntegerField(),
+                    },
+                    many=True,
+                ),
+            }),
+            304: OpenApiResponse(description='The Team has not changed since the ETag sent in `If-None-Match`.'),
+        },
+        operation_id='project_loot_solver',
+    )
+    def get(self, request: Request, team_id: str) -> Response:
+        """
+        Run the Loot Solver for the specified Team until every Member has everything they need.
+
+        Every floor is simulated forward, including augments bought with tokens, and one weapon is handed out from the
+        fourth floor each week to whoever is next in the sort order that still needs it.
+        Weeks count from the next clear; `floors` is how many weeks each floor needs, and each Member's `weeks` is the
+        week they get the last thing they need from each floor, 0 if there is nothing left.
+        The requesting User's greed setting is used, the same as the solver.
+
+        Responses include an ETag; sending it back in `If-None-Match` returns a 304 if nothing has changed since.
+        """
+        try:
+            obj = Team.objects.select_related('tier').distinct().get(pk=team_id, members__character__user=request.user)
+        except (Team.DoesNotExist, ValidationError):
+            return Response(status=404)
+
         try:
             greedy = request.user.settings.loot_solver_greed
         except Settings.DoesNotExist:
             greedy = False
+
+        etag = self._get_team_etag(obj, int(greedy), 'projection')
+        if self._etag_matches(request, etag):
+            return self._not_modified(etag)
+
+        inputs = LootSolver._get_inputs(obj, greedy)
+
+        def build() -> Projection:
+            # Floors whose state hasn't changed since any earlier projection reuse its result
+            checkpoints = solver_checkpoints.get(obj.pk)
+            projection = project(
+                inputs, checkpoints, settings.LOOT_SOLVER_KERNEL, response_cache.SharedMemo('solver_floor_projection'),
+            )
+            solver_checkpoints.save(obj.pk, checkpoints)
+            return projection
+
+        payload = response_cache.get_or_build_shared('solver_projection', inputs.fingerprint(), build)
+        return Response(payload, headers={'ETag': etag})
+
+
+class LootSolverWhatIf(APIView):
+    """
+    Compare Loot Solver results for different sort orders and greed settings, without changing anything
+    """
+
+    @staticmethod
+    def _get_weeks(payload: Payload) -> Dict[str, int]:
+        """
+        Count the weeks each floor takes to hand out everything that is needed.
+        The fourth floor drops one weapon a week, so it takes a week for each weapon still left to hand out.
+        """
+        weeks = {floor: len(payload[floor]) for floor in core.FLOORS}
+        weeks['fourth_floor'] = max(payload['fourth_floor']['weapons'], 0)
+        return weeks
+
+    @extend_schema(
+        tags=['team_loot'],
+        request=LootSolverWhatIfSerializer,
+        responses={
+            200: inline_serializer('LootSolverWhatIfResponse', {
+                'candidates': inline_serializer(
+                    'LootSolverWhatIfCandidate',
+                    {
+                        'greedy': serializers.BooleanField(),
+                        'solver_sort_overrides': serializers.DictField(child=serializers.IntegerField()),
+                        'weeks': serializers.DictField(child=serializers.IntegerField()),
+                        'weeks_to_finish': serializers.IntegerField(),
+                        'payload': serializers.DictField(),
+                    },
+                    many=True,
+                ),
+            }),
+        },
+        operation_id='compare_loot_solver_candidates',
+    )
+    def post(self, request: Request, team_id: str) -> Response:
+        """
+        Run the Loot Solver for the specified Team once per candidate, each with its own sort overrides and greed setting.
+
+        The Team's requirements and history are read once and shared by every candidate, and the candidates are solved
+        in parallel. Each candidate's result includes the full solver payload, the number of weeks each floor takes,
+        including the weapons from the fourth floor, and the number of weeks until everything is handed out.
+        """
         try:
-            first = self._get_first_floor_data(requirements, history, id_ordering, non_loot_gear_obtained, greedy)
-            second = self._get_second_floor_data(requirements, history, id_ordering, non_loot_gear_obtained, greedy)
-            third = self._get_third_floor_data(requirements, history, id_ordering, non_loot_gear_obtained, greedy)
-            fourth = self._get_fourth_floor_data(history, obj.members.count(), non_loot_gear_obtained)
-        except TypeError:
-            return Response(status=400)
+            obj = Team.objects.select_related('tier').distinct().get(pk=team_id, members__character__user=request.user)
+        except (Team.DoesNotExist, ValidationError):
+            return Response(status=404)
+
+        serializer = LootSolverWhatIfSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        candidates = serializer.validated_data['candidates']
 
-        # Build and return the response
-        return Response({
-            'first_floor': first,
-            'second_floor': second,
-            'third_floor': third,
-            'fourth_floor': fourth,
-        })
+        # Everything but the sort order and greed is the same for each candidate
+        shared = LootSolver._get_inputs(obj, False)
+        inputs = [
+            shared._replace(
+                id_order=LootSolver._get_team_solver_sort_order(obj, candidate['solver_sort_overrides']),
+                greedy=candidate['greedy'],
+            )
+            for candidate in candidates
+        ]
+
+        # Reuse any results already stored against the same inputs, and solve the rest together
+        fingerprints = [item.fingerprint() for item in inputs]
+        payloads = [response_cache.get_shared('solver_inputs', fingerprint) for fingerprint in fingerprints]
+        missing = [index for index, payload in enumerate(payloads) if payload is None]
+        solved = solve_many([inputs[index] for index in missing], settings.LOOT_SOLVER_PROCESSES, settings.LOOT_SOLVER_KERNEL)
+        for index, payload in zip(missing, solved):
+            response_cache.set_shared('solver_inputs', fingerprints[index], payload)
+            payloads[index] = payload
+
+        results = []
+        for candidate, payload in zip(candidates, payloads):
+            weeks = self._get_weeks(payload)
+            results.append({
+                'greedy': candidate['greedy'],
+                'solver_sort_overrides': candidate['solver_sort_overrides'],
+                'weeks': weeks,
+                'weeks_to_finish': max(weeks.values()),
+                'payload': payload,
+            })
+        return Response({'candidates': results})
@@ -108,6 +108,7 @@ class TeamResource(APIView):
     @extend_schema(
         responses={
             200: TeamSerializer,
+            304: OpenApiResponse(description='The Team has not changed since the ETag sent in `If-None-Match`.'),
             404: OpenApiResponse(
                 description='Team ID is invalid, or the requesting User has no Characters in the Team.',
             ),
@@ -117,14 +118,21 @@ class TeamResource(APIView):
         """
         Read the data of a specified Team.
         The requesting User must have a Character in the Team to be able to read it.
+
+        Responses include an ETag; sending it back in `If-None-Match` returns a 304 if nothing has changed since.
         """
         try:
             obj = Team.objects.filter(members__character__user=request.user).distinct().get(pk=pk)
         except (Team.DoesNotExist, ValidationError):
             return Response(status=404)
 
+        # Skip serializing entirely if the client already has the latest version of the data
+        etag = self._get_team_etag(obj)
+        if self._etag_matches(request, etag):
+            return self._not_modified(etag)
+
         data = TeamSerializer(instance=obj).data
-        return Response(data)
+        return Response(data, headers={'ETag': etag})
 
     @extend_schema(
         request=TeamUpdateSerializer,
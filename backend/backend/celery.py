@@ -31,3 +31,17 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=0, minute=0),
     }
 }
+
+
+@app.on_after_finalize.connect
+def setup_prewarm_schedule(sender, **kwargs):
+    """
+    Warm the Loot and Solver caches for each region just after the weekly reset.
+    Added once the app is finalized, as the settings aren't loaded yet when this module is imported.
+    """
+    for region, config in settings.LOOT_PREWARM_REGIONS.items():
+        sender.add_periodic_task(
+            crontab(**config['schedule']),
+            sender.signature('prewarm_loot_caches', args=(region,)),
+            name=f'prewarm_loot_caches_{region}',
+        )
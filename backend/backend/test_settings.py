@@ -58,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.broadcast.BroadcastMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -163,6 +164,35 @@ LOGIN_REDIRECT_URL = 'http://localhost:8080/'
 LOGOUT_REDIRECT_URL = '/'
 SOCIALACCOUNT_LOGIN_ON_GET = True
 
+# Cache for rendered Loot and Solver payloads
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+LOOT_CACHE_TTL = 60 * 60
+# Weekly Loot Solver checkpoints only change when new Loot is added, so they're kept for the length of a long reset
+LOOT_CHECKPOINT_TTL = 60 * 60 * 24 * 14
+# Worker processes for running several Loot Solver simulations at once, 0 runs them in the request's process
+LOOT_SOLVER_PROCESSES = 0
+# Implementation of the Loot Solver's handout simulation, one of api.solver.core.KERNELS
+LOOT_SOLVER_KERNEL = 'lists'
+# Where staff requests for the Loot Solver with ?profile=1 write their pstats files, profiling is off when None
+LOOT_SOLVER_PROFILE_DIR = None
+# Regions to warm the Loot and Solver caches for after the weekly reset, picked by the data centre of each Team's leader.
+# Schedules are crontab arguments in CELERY_TIMEZONE, staggered so the regions don't all warm at once.
+LOOT_PREWARM_REGIONS = {
+    'eu': {'data_centres': ['Chaos', 'Light', 'Shadow'], 'schedule': {'day_of_week': 'tue', 'hour': 9, 'minute': 5}},
+    'na': {'data_centres': ['Aether', 'Crystal', 'Dynamis', 'Primal'], 'schedule': {'day_of_week': 'tue', 'hour': 9, 'minute': 10}},
+    'jp': {'data_centres': ['Elemental', 'Gaia', 'Mana', 'Meteor'], 'schedule': {'day_of_week': 'tue', 'hour': 9, 'minute': 15}},
+    'oce': {'data_centres': ['Materia'], 'schedule': {'day_of_week': 'tue', 'hour': 9, 'minute': 20}},
+}
+# Teams warmed by each task, and how many of those tasks run at once
+LOOT_PREWARM_CHUNK_SIZE = 50
+LOOT_PREWARM_CONCURRENCY = 2
+# Warmed payloads are kept longer than usual, to last until the Team's first visit of the week
+LOOT_PREWARM_TTL = 60 * 60 * 24
+
 # Celery settings
 BROKER_URL = 'redis://localhost:6379'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379'